@@ -16,9 +16,11 @@ from .cw_op import *
 from .cw_folder_op import *
 from .cw_export import *
 from .cw_utils import *
+from .cw_hierarchy import register_handlers as register_hierarchy, unregister_handlers as unregister_hierarchy
 from .cw_updater import check_for_updates  # Importing only the necessary functions from cw_updater
 from .external.ZorakExtensions.color_harmony import *
 from .external.ZorakExtensions.prefab_manager import *
+from .external.ZorakExtensions.prefab_index import register_handlers as register_prefab_index, unregister_handlers as unregister_prefab_index
 from .external.VertexColorTools.init import register as reg, unregister as unreg
 
 # When bpy is already in local, we know this is not the initial import...
@@ -33,6 +35,22 @@ if "bpy" in locals():
         importlib.reload(cw_folder_op)
     if "cw_export" in locals():
         importlib.reload(cw_export)
+    if "cw_glb" in locals():
+        importlib.reload(cw_glb)
+    if "cw_upload" in locals():
+        importlib.reload(cw_upload)
+    if "cw_cache" in locals():
+        importlib.reload(cw_cache)
+    if "cw_size" in locals():
+        importlib.reload(cw_size)
+    if "cw_compact" in locals():
+        importlib.reload(cw_compact)
+    if "cw_copies" in locals():
+        importlib.reload(cw_copies)
+    if "cw_hierarchy" in locals():
+        importlib.reload(cw_hierarchy)
+    if "cw_profile" in locals():
+        importlib.reload(cw_profile)
     if "cw_utils" in locals():
         importlib.reload(cw_utils)
     if "cw_updater" in locals():
@@ -101,6 +119,7 @@ classes = (
     PREFABMANAGER_UL_List,
     PREFABMANAGER_OT_Popover,
     PREFABMANAGER_OT_RemoveInstances,
+    PREFABMANAGER_OT_ClearLibrary,
     PREFABMANAGER_OT_ToggleVisibility,
     OBJECT_OT_InstantiateObjects,
     CUBIO_OT_UpdateAddon,  # Include the update operator here
@@ -110,11 +129,39 @@ classes = (
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
+    bpy.types.Scene.cw_force_full_export = BoolProperty(
+        name="Force Full Export",
+        description="Export and upload all objects, including the ones that didn't change since their last upload",
+        default=False
+    )
+    bpy.types.Scene.cw_non_destructive_export = BoolProperty(
+        name="Non-Destructive Export",
+        description="Export from temporary copies of the objects instead of centering, selecting and removing attributes in the scene",
+        default=False
+    )
+    bpy.types.Scene.cw_export_profile = BoolProperty(
+        name="Profile Export",
+        description="Time every export stage and write a JSON/CSV report next to the blend file",
+        default=False
+    )
+    bpy.types.Scene.cw_auto_compact = BoolProperty(
+        name="Compact Oversized Objects",
+        description="Weld vertices and strip attributes, UVs and normals of objects over the size limit until they fit",
+        default=False
+    )
+    register_hierarchy()
+    register_prefab_index()
     reg()
 
 def unregister():
     for cls in classes:
         bpy.utils.unregister_class(cls)
+    del bpy.types.Scene.cw_force_full_export
+    del bpy.types.Scene.cw_auto_compact
+    del bpy.types.Scene.cw_non_destructive_export
+    del bpy.types.Scene.cw_export_profile
+    unregister_hierarchy()
+    unregister_prefab_index()
     unreg()
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+# Headless batch export
+#
+#   blender -b district.blend --python cw_batch.py -- --workers 4 --summary summary.json
+#
+# The coordinator splits the numbered root objects of every file over background Blender worker processes.
+# Each worker exports its share with CW_GLTF_Export and writes the GLB payloads to a temporary directory.
+# The coordinator then uploads all payloads, over one connection per server, and writes a JSON summary of every object.
+# Every file is uploaded to the server of its own scene settings, unless --address/--port override them.
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import bpy
+
+WORKER_RESULTS = "results.json"
+# Seconds between checks of the running workers
+POLL_INTERVAL = 0.1
+
+def _import_addon():
+  # Run as a script, so the add-on package has to be imported by its folder name
+  addon_dir = os.path.dirname(os.path.abspath(__file__))
+  if os.path.dirname(addon_dir) not in sys.path:
+    sys.path.insert(0, os.path.dirname(addon_dir))
+  addon = importlib.import_module(os.path.basename(addon_dir))
+  if not hasattr(bpy.types.Scene, "cw_force_full_export"):
+    addon.register()
+  return addon
+
+def _parse_args(argv):
+  argv = argv[argv.index("--") + 1:] if "--" in argv else []
+  parser = argparse.ArgumentParser(prog="cw_batch", description="Export and upload numbered objects of .blend files")
+  parser.add_argument("--files", nargs="*", default=[], help="Files to export, defaults to the opened file")
+  parser.add_argument("--workers", type=int, default=max((os.cpu_count() or 2) - 1, 1), help="Number of Blender worker processes")
+  parser.add_argument("--address", help="Server address, defaults to the scene setting")
+  parser.add_argument("--port", type=int, help="Server port, defaults to the scene setting")
+  parser.add_argument("--player", type=int, help="Player ID, defaults to the scene setting")
+  parser.add_argument("--summary", help="Path of the JSON summary, printed to stdout if not set")
+  parser.add_argument("--no-upload", action="store_true", help="Only export, e.g. to check sizes")
+  # Set by the coordinator for its workers
+  parser.add_argument("--worker-index", type=int, help=argparse.SUPPRESS)
+  parser.add_argument("--output", help=argparse.SUPPRESS)
+  return parser.parse_args(argv)
+
+def _apply_scene_settings(scene, args):
+  if args.address is not None:
+    scene.CW_Address = args.address
+  if args.port is not None:
+    scene.CW_Port = args.port
+  if args.player is not None:
+    scene.CW_PlayerId = args.player
+
+def _root_objects(scene):
+  objects = [ob for ob in scene.objects if ob.parent is None and ob.name.split("_")[0].isnumeric()]
+  return sorted(objects, key=lambda ob: ob.name)
+
+class _Reporter:
+  """
+  Stands in for the operator CW_GLTF_Export reports to
+  """
+
+  def __init__(self):
+    self.messages = []
+
+  def report(self, type, message):
+    level = next(iter(type))
+    self.messages.append({"level": level, "message": message})
+    print(level + ": " + message)
+
+class _ExportContext:
+
+  def __init__(self, scene, objects):
+    self.scene = scene
+    self.selected_objects = objects
+
+# Worker
+
+def run_worker(args):
+  addon = _import_addon()
+  scene = bpy.context.scene
+  _apply_scene_settings(scene, args)
+
+  objects = _root_objects(scene)[args.worker_index::args.workers]
+  reporter = _Reporter()
+  export = addon.cw_export.CW_GLTF_Export(reporter, _ExportContext(scene, objects))
+
+  results = []
+  exporter = export.export_objects()
+  try:
+    for index, objectId, data in exporter:
+      obj = objects[index]
+      result = {"name": obj.name, "id": objectId, "status": export.status.get(obj.name)}
+      if data is not None:
+        payload = os.path.join(args.output, str(objectId) + ".glb")
+        with open(payload, "wb") as file:
+          file.write(data)
+        result["size"] = len(data)
+        result["payload"] = payload
+      results.append(result)
+  finally:
+    exporter.close()
+
+  with open(os.path.join(args.output, WORKER_RESULTS), "w") as file:
+    json.dump({"address": scene.CW_Address, "port": scene.CW_Port, "player": scene.CW_PlayerId,
+               "objects": results, "reports": reporter.messages}, file)
+
+# Coordinator
+
+def _spawn_worker(blend_file, index, args, output):
+  # Without --python-exit-code Blender exits with 0 even if the script raised
+  command = [bpy.app.binary_path, "-b", blend_file, "--python-exit-code", "1", "--python", os.path.abspath(__file__), "--",
+             "--workers", str(args.workers), "--worker-index", str(index), "--output", output]
+  for name in ("address", "port", "player"):
+    value = getattr(args, name)
+    if value is not None:
+      command += ["--" + name, str(value)]
+  return subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+def run_coordinator(args):
+  addon = _import_addon()
+  files = [os.path.abspath(path) for path in args.files] or [bpy.data.filepath]
+  if not all(files):
+    print("ERROR: No .blend file given")
+    return 2
+
+  summary = {"files": files, "workers": args.workers, "objects": [], "errors": []}
+  start = time.perf_counter()
+
+  with tempfile.TemporaryDirectory(prefix="cw_batch_") as temp_dir:
+    jobs = []
+    for file_index, blend_file in enumerate(files):
+      for index in range(args.workers):
+        output = os.path.join(temp_dir, str(file_index) + "-" + str(index))
+        os.makedirs(output)
+        jobs.append((blend_file, index, output))
+
+    # At most `workers` Blender processes at a time, a slot is refilled as soon as any worker is done
+    running = []
+    pending = list(jobs)
+    while pending or running:
+      while pending and len(running) < args.workers:
+        blend_file, index, output = pending.pop(0)
+        running.append((_spawn_worker(blend_file, index, args, output), blend_file, index))
+      time.sleep(POLL_INTERVAL)
+      for job in [job for job in running if job[0].poll() is not None]:
+        process, blend_file, index = job
+        running.remove(job)
+        if process.returncode != 0:
+          summary["errors"].append("Worker " + str(index) + " for " + blend_file + " exited with code " +
+                                   str(process.returncode))
+
+    # One client per server, files may point at different ones
+    uploaders = {}
+    try:
+      for blend_file, index, output in jobs:
+        results_path = os.path.join(output, WORKER_RESULTS)
+        if not os.path.exists(results_path):
+          summary["errors"].append("Worker " + str(index) + " for " + blend_file +
+                                   " wrote no results, its objects were not exported")
+          continue
+        with open(results_path) as file:
+          results = json.load(file)
+
+        summary["errors"] += [report["message"] for report in results["reports"] if report["level"] == 'ERROR']
+        target = (results["address"], results["port"])
+        for result in results["objects"]:
+          result["file"] = blend_file
+          payload = result.pop("payload", None)
+          if payload is not None and not args.no_upload:
+            if target not in uploaders:
+              uploaders[target] = addon.cw_upload.UploadClient(*target)
+            with open(payload, "rb") as file:
+              uploaders[target].send_object(result["id"], results["player"], file.read(), result["name"])
+            result["status"] = "uploaded"
+          summary["objects"].append(result)
+
+      for uploader in uploaders.values():
+        uploader.flush()
+    except OSError as err:
+      summary["errors"].append("Upload failed: " + str(err))
+      for result in summary["objects"]:
+        if result["status"] == "uploaded":
+          result["status"] = addon.cw_export.STATUS_EXPORTED
+    finally:
+      for uploader in uploaders.values():
+        uploader.close()
+
+  counts = {}
+  for result in summary["objects"]:
+    counts[result["status"]] = counts.get(result["status"], 0) + 1
+  summary["counts"] = counts
+  summary["bytes"] = sum(result.get("size", 0) for result in summary["objects"])
+  summary["seconds"] = round(time.perf_counter() - start, 2)
+
+  if args.summary:
+    with open(args.summary, "w") as file:
+      json.dump(summary, file, indent=2)
+  else:
+    print(json.dumps(summary, indent=2))
+  return 1 if summary["errors"] else 0
+
+def main():
+  args = _parse_args(sys.argv)
+  if args.worker_index is not None:
+    run_worker(args)
+    return 0
+  return run_coordinator(args)
+
+if __name__ == "__main__":
+  sys.exit(main())
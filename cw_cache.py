@@ -0,0 +1,110 @@
+import bpy
+import hashlib
+import json
+from array import array
+
+from . cw_utils import get_children
+
+# Scene ID property holding the cache as JSON, so it is saved with the .blend file
+CACHE_PROPERTY = "cw_export_cache"
+
+# foreach_get attribute and array type code of the hashed attribute types
+ATTRIBUTE_FIELDS = {
+  'FLOAT': ("value", 'f'),
+  'INT': ("value", 'i'),
+  'FLOAT_VECTOR': ("vector", 'f'),
+  'FLOAT2': ("vector", 'f'),
+  'FLOAT_COLOR': ("color", 'f'),
+  'BYTE_COLOR': ("color", 'f'),
+}
+
+def _hash_buffer(digest, collection, field, typecode, size):
+  values = array(typecode, bytes(array(typecode).itemsize * size))
+  collection.foreach_get(field, values)
+  digest.update(values.tobytes())
+
+def _hash_mesh(digest, mesh):
+  _hash_buffer(digest, mesh.vertices, "co", 'f', len(mesh.vertices) * 3)
+  _hash_buffer(digest, mesh.loops, "vertex_index", 'i', len(mesh.loops))
+  _hash_buffer(digest, mesh.polygons, "loop_total", 'i', len(mesh.polygons))
+
+  active_color = mesh.color_attributes.active_color
+  digest.update(repr(active_color.name if active_color else None).encode())
+
+  for attr in sorted(mesh.attributes, key=lambda attr: attr.name):
+    # Internal attributes (selection, hidden state...) aren't exported
+    if attr.name.startswith(".") or attr.data_type not in ATTRIBUTE_FIELDS:
+      continue
+    field, typecode = ATTRIBUTE_FIELDS[attr.data_type]
+    components = {"value": 1, "vector": 3 if attr.data_type == 'FLOAT_VECTOR' else 2, "color": 4}[field]
+    digest.update(repr((attr.name, attr.domain, attr.data_type)).encode())
+    _hash_buffer(digest, attr.data, field, typecode, len(attr.data) * components)
+
+def _hash_object(digest, obj, depsgraph):
+  digest.update(repr((obj.name, obj.type)).encode())
+  digest.update(repr([tuple(row) for row in obj.matrix_basis]).encode())
+  digest.update(repr([tuple(row) for row in obj.matrix_parent_inverse]).encode())
+  # Custom properties end up in the glTF extras
+  digest.update(repr(sorted((key, repr(obj[key])) for key in obj.keys())).encode())
+
+  if obj.type == 'MESH':
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+      _hash_mesh(digest, mesh)
+    finally:
+      obj_eval.to_mesh_clear()
+
+# Hash of everything that ends up in the exported GLB of `obj`: evaluated mesh data, vertex colors,
+# transform and children
+def object_content_hash(obj, depsgraph):
+  digest = hashlib.blake2b(digest_size=16)
+  _hash_object(digest, obj, depsgraph)
+  for child in get_children(obj):
+    _hash_object(digest, child, depsgraph)
+  return digest.hexdigest()
+
+class ExportCache:
+  """
+  Content hash and size of the last upload of each object ID, per export target (address, port, player) and
+  export settings that change the GLB (center transform, non-destructive export, auto compact).
+  Objects are only recorded once their upload succeeded.
+  """
+
+  def __init__(self, scene):
+    self.__scene = scene
+    # Changing any of these makes every entry stale, the same content exports to a different GLB
+    settings = (scene.cw_center_transform, scene.cw_non_destructive_export, scene.cw_auto_compact)
+    self.__target = ":".join(str(value) for value in (scene.CW_Address, scene.CW_Port, scene.CW_PlayerId) + settings)
+    self.__entries = {}
+    self.__pending = {}
+    try:
+      stored = json.loads(scene.get(CACHE_PROPERTY, "{}"))
+    except ValueError:
+      stored = {}
+    if stored.get("target") == self.__target:
+      self.__entries = stored.get("objects", {})
+
+  def is_unchanged(self, object_id, content_hash):
+    entry = self.__entries.get(str(object_id))
+    return entry is not None and entry[0] == content_hash
+
+  def cached_size(self, object_id):
+    entry = self.__entries.get(str(object_id))
+    return entry[1] if entry is not None else 0
+
+  def add_pending(self, object_id, content_hash, size):
+    self.__pending[str(object_id)] = [content_hash, size]
+
+  def commit(self, object_ids):
+    for object_id in object_ids:
+      entry = self.__pending.pop(str(object_id), None)
+      if entry is not None:
+        self.__entries[str(object_id)] = entry
+    self.__scene[CACHE_PROPERTY] = json.dumps({"target": self.__target, "objects": self.__entries})
+
+  def clear(self):
+    self.__entries = {}
+    self.__pending = {}
+    if CACHE_PROPERTY in self.__scene:
+      del self.__scene[CACHE_PROPERTY]
@@ -0,0 +1,169 @@
+import bpy
+import bmesh
+import json
+import numpy as np
+
+from . cw_size import GLB_HEADER_SIZE, JSON_BASE_SIZE, JSON_NODE_SIZE, mesh_size
+
+# Distance under which vertices are merged by the weld stage
+WELD_DISTANCE = 1e-5
+# Corner colors closer than this are considered equal (one step of a byte color)
+COLOR_TOLERANCE = 1.0 / 255.0
+
+def strip_unused_attributes(mesh):
+  active_color = mesh.color_attributes.active_color
+  keep = {layer.name for layer in mesh.uv_layers}
+  if active_color is not None:
+    keep.add(active_color.name)
+
+  names = [attr.name for attr in mesh.attributes
+           if not attr.name.startswith(".") and attr.name != "position" and attr.name not in keep]
+  removed = 0
+  for name in names:
+    # Built-in attributes can't be removed
+    try:
+      mesh.attributes.remove(mesh.attributes[name])
+      removed += 1
+    except RuntimeError:
+      pass
+  return removed > 0
+
+def corner_colors_to_points(mesh):
+  active_color = mesh.color_attributes.active_color
+  if active_color is None or active_color.domain != 'CORNER' or len(mesh.loops) == 0:
+    return False
+
+  colors = np.empty(len(mesh.loops) * 4, dtype=np.float32)
+  active_color.data.foreach_get("color", colors)
+  colors = colors.reshape(-1, 4)
+  loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+  mesh.loops.foreach_get("vertex_index", loop_verts)
+
+  vert_colors = np.zeros((len(mesh.vertices), 4), dtype=np.float32)
+  vert_colors[loop_verts] = colors
+  if np.abs(vert_colors[loop_verts] - colors).max() > COLOR_TOLERANCE:
+    return False
+
+  # Byte colors are enough once the colors are known to fit in one step
+  name = active_color.name
+  mesh.color_attributes.remove(active_color)
+  point_color = mesh.color_attributes.new(name, 'BYTE_COLOR', 'POINT')
+  point_color.data.foreach_set("color", vert_colors.ravel())
+  mesh.color_attributes.active_color = point_color
+  mesh.color_attributes.render_color_index = mesh.color_attributes.active_color_index
+  return True
+
+def weld_vertices(mesh):
+  bm = bmesh.new()
+  try:
+    bm.from_mesh(mesh)
+    vert_count = len(bm.verts)
+    bmesh.ops.remove_doubles(bm, verts=bm.verts[:], dist=WELD_DISTANCE)
+    if len(bm.verts) == vert_count:
+      return False
+    bm.to_mesh(mesh)
+  finally:
+    bm.free()
+  return True
+
+def strip_uvs(mesh):
+  if len(mesh.uv_layers) == 0:
+    return False
+  while mesh.uv_layers:
+    mesh.uv_layers.remove(mesh.uv_layers[0])
+  return True
+
+# Normals are left out of the export, which also stops vertices from being split along sharp edges
+def strip_normals(export_params):
+  if not export_params.get("export_normals", True):
+    return False
+  export_params["export_normals"] = False
+  return True
+
+# Mesh stages run on every compacted mesh, export stages once on the export parameters
+MESH_STAGE = "mesh"
+EXPORT_STAGE = "export"
+
+# Stages in order of cost, the ones losing the least information first
+STAGES = (
+  ("unused attributes", strip_unused_attributes, MESH_STAGE),
+  ("vertex colors to points", corner_colors_to_points, MESH_STAGE),
+  ("weld vertices", weld_vertices, MESH_STAGE),
+  ("strip UVs", strip_uvs, MESH_STAGE),
+  ("strip normals", strip_normals, EXPORT_STAGE),
+)
+
+class CompactExport:
+  """
+  Shrinks the meshes of the exported objects (an object and its children) stage by stage until the predicted
+  GLB fits. Both export modes compact the same meshes, the objects' own `data`, once per distinct mesh.
+  The meshes are swapped for temporary copies that are removed on exit, unless `in_place` is set because the
+  objects are temporary copies already (see cw_copies.ExportCopies).
+  """
+
+  def __init__(self, objects, predictor, in_place=False):
+    self.__objects = objects
+    self.__predictor = predictor
+    self.__in_place = in_place
+    self.__originals = []
+    self.__meshes = []
+    self.export_params = {}
+    self.steps = []
+
+  def __enter__(self):
+    # Meshes shared by several objects are compacted once and stay shared
+    meshes = {}
+    for ob in self.__objects:
+      if ob.type != 'MESH':
+        continue
+      mesh = meshes.get(ob.data.as_pointer())
+      if mesh is None:
+        mesh = meshes[ob.data.as_pointer()] = ob.data if self.__in_place else ob.data.copy()
+        self.__meshes.append(mesh)
+      if not self.__in_place:
+        self.__originals.append((ob, ob.data))
+        ob.data = mesh
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    for ob, mesh in self.__originals:
+      ob.data = mesh
+    if not self.__in_place:
+      for mesh in self.__meshes:
+        bpy.data.meshes.remove(mesh)
+    self.__originals = []
+    self.__meshes = []
+
+  def predicted_size(self):
+    normals = self.export_params.get("export_normals", True)
+    size = GLB_HEADER_SIZE + JSON_BASE_SIZE
+    # The exporter writes a mesh used by several objects once
+    meshes = set()
+    for ob in self.__objects:
+      size += len(json.dumps({key: str(ob[key]) for key in ob.keys()}))
+      if ob.type != 'MESH' or ob.data.as_pointer() in meshes:
+        size += JSON_NODE_SIZE
+        continue
+      meshes.add(ob.data.as_pointer())
+      size += mesh_size(ob.data, normals)
+    return size
+
+  def fits(self, max_size):
+    return self.__predictor.factor * self.predicted_size() <= max_size
+
+  def run(self, max_size):
+    """
+    Applies the stages in order until the prediction fits, returns whether it does
+    """
+    for name, stage, scope in STAGES:
+      if self.fits(max_size):
+        return True
+      if scope == EXPORT_STAGE:
+        changed = stage(self.export_params)
+      else:
+        changed = False
+        for mesh in self.__meshes:
+          changed |= stage(mesh)
+      if changed:
+        self.steps.append(name)
+    return self.fits(max_size)
@@ -0,0 +1,112 @@
+import bpy
+
+from . cw_utils import get_children
+from . cw_hierarchy import invalidate_hierarchy
+from . cw_profile import stage
+
+# Attributes removed from the exported meshes
+STRIPPED_ATTRIBUTES = ("sharp_face", "sharp_edge")
+TEMP_COLLECTION_NAME = "CW Export"
+
+class ExportCollection:
+  """
+  Temporary collection for the copies of a whole export, linked to the scene and made the active collection
+  once. Every ExportCopies of the export links its copies into it and removes them again.
+  """
+
+  def __init__(self):
+    self.collection = None
+    self.__saved_layer_collection = None
+
+  def __enter__(self):
+    view_layer = bpy.context.view_layer
+    self.collection = bpy.data.collections.new(TEMP_COLLECTION_NAME)
+    bpy.context.scene.collection.children.link(self.collection)
+    self.__saved_layer_collection = view_layer.active_layer_collection
+    view_layer.active_layer_collection = view_layer.layer_collection.children[self.collection.name]
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    bpy.data.collections.remove(self.collection)
+    bpy.context.view_layer.active_layer_collection = self.__saved_layer_collection
+    self.collection = None
+
+class ExportCopies:
+  """
+  Temporary copies of an object and its children, with copies of their meshes with the attributes stripped
+  and the root transform centered if requested. Modifiers are copied, not applied, so the copies export the
+  same geometry as the originals. The copies are the only objects of the active ExportCollection, so
+  exporting with `EXPORT_PARAMS` only sees them and the user's objects, selection, names and attributes
+  stay untouched.
+  `names` maps the names of the copies to the originals' ones, for `cw_glb.rename_glb`.
+  """
+
+  EXPORT_PARAMS = {"use_selection": False, "use_active_collection": True}
+
+  def __init__(self, obj, center, export_collection):
+    self.__obj = obj
+    self.__center = center
+    self.__collection = export_collection.collection
+    self.__copies = []
+    self.__meshes = []
+    self.root = None
+    self.objects = []
+    self.names = {"nodes": {}, "meshes": {}}
+
+  def __enter__(self):
+    try:
+      with stage("copies"):
+        self.__make_copies()
+    except Exception:
+      self.__exit__(None, None, None)
+      raise
+    return self
+
+  def __make_copies(self):
+    copies = {}
+    # Meshes shared by several objects stay shared between their copies
+    meshes = {}
+    for ob in [self.__obj] + get_children(self.__obj):
+      copy = ob.copy()
+      if ob.type == 'MESH':
+        mesh = meshes.get(ob.data.as_pointer())
+        if mesh is None:
+          mesh = meshes[ob.data.as_pointer()] = ob.data.copy()
+          self.__meshes.append(mesh)
+          self.names["meshes"][mesh.name] = ob.data.name
+          for name in STRIPPED_ATTRIBUTES:
+            attr = mesh.attributes.get(name)
+            if attr is not None:
+              mesh.attributes.remove(attr)
+        copy.data = mesh
+      self.__collection.objects.link(copy)
+      self.__copies.append(copy)
+      self.names["nodes"][copy.name] = ob.name
+      copies[ob] = copy
+
+    for ob, copy in copies.items():
+      if ob.parent in copies:
+        copy.parent = copies[ob.parent]
+
+    self.root = copies[self.__obj]
+    self.objects = self.__copies
+    matrix = self.__obj.matrix_world.copy()
+    if self.__center:
+      matrix.translation = (0.0, 0.0, 0.0)
+    self.root.parent = None
+    self.root.constraints.clear()
+    self.root.matrix_world = matrix
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    for copy in self.__copies:
+      bpy.data.objects.remove(copy)
+    for mesh in self.__meshes:
+      bpy.data.meshes.remove(mesh)
+
+    self.__copies = []
+    self.__meshes = []
+    self.root = None
+    self.names = {"nodes": {}, "meshes": {}}
+    self.objects = []
+    # The copies may have been indexed while they existed
+    invalidate_hierarchy()
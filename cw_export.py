@@ -1,9 +1,23 @@
 import bpy
-import socket
 import sys
+from contextlib import contextmanager
 from ftplib import FTP_TLS
 
 from . cw_utils import *
+from . cw_glb import export_glb, rename_glb
+from . cw_upload import UploadClient
+from . cw_cache import ExportCache, object_content_hash
+from . cw_size import SizePredictor, MAX_GLB_SIZE
+from . cw_compact import CompactExport
+from . cw_copies import ExportCopies, ExportCollection
+from . cw_hierarchy import frozen_hierarchy
+from . cw_profile import ExportProfiler, stage, start_profiling, stop_profiling, set_current_object
+
+STATUS_EXPORTED = "exported"
+STATUS_CHILD = "child"
+STATUS_INVALID_ID = "invalid_id"
+STATUS_UNCHANGED = "unchanged"
+STATUS_OVER_BUDGET = "over_budget"
 
 class CW_GLTF_Export:
 
@@ -14,7 +28,28 @@ class CW_GLTF_Export:
     self.__center_transform = context.scene.cw_center_transform
     #self.__apply_transform = context.scene.apply_transform
     self.__export_objects = context.selected_objects
-  
+    self.__force_full_export = context.scene.cw_force_full_export
+    self.__auto_compact = context.scene.cw_auto_compact
+    self.__non_destructive = context.scene.cw_non_destructive_export
+    # Collection of the temporary copies of a non-destructive export, see export_objects
+    self.__export_collection = None
+    self.cache = ExportCache(context.scene)
+    self.predictor = SizePredictor(context.scene)
+    self.__predictions = {}
+    self.__oversized = set()
+    self.skipped = 0
+    self.bytes_saved = 0
+    # Outcome of each exported object by name, one of the STATUS_ values
+    self.status = {}
+    self.profiler = ExportProfiler() if context.scene.cw_export_profile else None
+
+  @property
+  def object_count(self):
+    return len(self.__export_objects)
+
+  def object_name(self, index):
+    return self.__export_objects[index].name
+
   def do_center(self, obj):
     if self.__center_transform:
       loc = get_object_loc(obj)
@@ -22,16 +57,48 @@ class CW_GLTF_Export:
       return loc
 
     return None
-    
-  def do_export(self):
-  
-    def int_to_bytes(x: int) -> bytes:
-      return x.to_bytes(4, 'little')
-    
-    def int_from_bytes(xbytes: bytes) -> int:
-      return int.from_bytes(xbytes, 'big')
+
+  def preflight(self):
+    """
+    Predicts the GLB size of every exported object and warns about the ones clearly over the limit.
+    They are still exported, the real size decides, so a wrong prediction never blocks an object and
+    every export calibrates the predictor.
+    """
+    for obj in self.__export_objects:
+      if obj.parent is not None or not obj.name.split("_")[0].isnumeric():
+        continue
+
+      predicted = self.predictor.predict_raw(obj)
+      self.__predictions[obj.name] = predicted
+      if self.predictor.is_over_budget(predicted):
+        self.__oversized.add(obj.name)
+        sizeInMb = round(predicted * self.predictor.factor/1000000, 2)
+        self.__op_panel.report({'WARNING'}, "Object "+obj.name+" is predicted at "+str(sizeInMb)+"mb/0.25mb"+
+                               (", it will be compacted if needed" if self.__auto_compact else ""))
+
+    return len(self.__oversized)
+
+  def export_objects(self):
+    """
+    Exports the selected objects one by one, yielding (index, objectId, data) for each object ready to upload
+    and (index, objectId or None, None) for skipped ones. Selection and active object are restored when the
+    generator finishes or is closed, so the caller can run it in steps (e.g. from a modal operator).
+    """
 
     bpy.ops.object.mode_set(mode='OBJECT')
+
+    # Objects are exported from temporary copies, the scene isn't changed
+    if self.__non_destructive:
+      # The copies don't belong to the hierarchy of the originals, one index serves the whole export
+      with frozen_hierarchy(), ExportCollection() as self.__export_collection:
+        with stage("preflight"):
+          self.preflight()
+        for index, obj in enumerate(self.__export_objects):
+          set_current_object(obj.name)
+          objectId, data = self.__export_object(obj)
+          yield index, objectId, data
+      return
+
     saved_active = bpy.context.view_layer.objects.active
     def removeAttr(el):
         try:
@@ -46,120 +113,204 @@ class CW_GLTF_Export:
         except Exception as err:
           print(err)
 
-    for obj in bpy.data.objects:
-        removeAttr(obj)
+    with stage("strip_attributes"):
+      for obj in bpy.data.objects:
+          removeAttr(obj)
+
+    # The hierarchy of the exported objects doesn't change, moving them doesn't rebuild the index
+    with frozen_hierarchy():
+      with stage("preflight"):
+        self.preflight()
+
+      try:
+        for index, obj in enumerate(self.__export_objects):
+          set_current_object(obj.name)
+          with stage("select_children"):
+            bpy.ops.object.select_all(action='DESELECT')
+            obj.select_set(state=True)
+
+          # Center selected object
+          with stage("center"):
+            old_pos = self.do_center(obj)
+          try:
+            objectId, data = self.__export_object(obj)
+          finally:
+            if old_pos is not None:
+              set_object_to_loc(obj, old_pos)
+
+          yield index, objectId, data
+      finally:
+        bpy.ops.object.select_all(action='DESELECT')
+        for obj in self.__export_objects:
+            obj.select_set(state=True)
+
+        bpy.context.view_layer.objects.active = saved_active
+
+  def __export_object(self, obj):
+
+    def int_to_bytes(x: int) -> bytes:
+      return x.to_bytes(4, 'little')
+
+    # Select children if exist
+    if not self.__non_destructive:
+      with stage("select_children"):
+        for child in get_children(obj):
+          child.select_set(state=True)
+
+    if obj.parent is not None:
+      self.status[obj.name] = STATUS_CHILD
+      return None, None
+
+    nameArr = obj.name.split("_")
+
+    # Check the id before doing any export work
+    if not nameArr[0].isnumeric():
+      self.__op_panel.report({'ERROR'}, "Error "+nameArr[0]+" is not a number")
+      self.status[obj.name] = STATUS_INVALID_ID
+      return None, None
+
+    objectId = int(nameArr[0])
+    objectIdArr = int_to_bytes(objectId)
+
+    #printing debug stuff here
+    print(", ".join(hex(b) for b in objectIdArr))
+    print("id: "+str(objectId))
+    print("playerId: "+str(bpy.context.scene.CW_PlayerId))
+
+    # Skip objects whose content didn't change since their last upload
+    with stage("content_hash"):
+      contentHash = object_content_hash(obj, bpy.context.evaluated_depsgraph_get())
+    if not self.__force_full_export and self.cache.is_unchanged(objectId, contentHash):
+      self.skipped += 1
+      self.bytes_saved += self.cache.cached_size(objectId)
+      self.status[obj.name] = STATUS_UNCHANGED
+      return objectId, None
+
+    # The temp file is only written if the exporter can't be captured in memory
+    filepath = bpy.app.tempdir + "/" + nameArr[0] + ".glb"
+    maxLen = MAX_GLB_SIZE
+
+    # Always a real export first, the prediction is only an estimate
+    with self.__export_root(obj) as (objects, params, names):
+      data = rename_glb(export_glb(filepath, **params), names)
+    if obj.name in self.__predictions:
+      self.predictor.calibrate(self.__predictions[obj.name], len(data))
+    if len(data) > maxLen and self.__auto_compact:
+      data = self.__export_compacted(obj, objectId, filepath)
+
+    #playerNameBytes = bpy.context.scene.CW_PlayerId.encode()
+    #playerNameLen = len(playerNameBytes).to_bytes(1, 'little')
+
+    #number_of_bytes = (bpy.context.scene.CW_PlayerId.bit_length() + 7)
+
+    dataLen = len(data)
+    sizeInMb = round(dataLen/1000000, 2)
+
+    if dataLen > maxLen:
+      sizeOver = round((dataLen-maxLen)/1000000, 2)
+      self.__op_panel.report({'ERROR'}, "Error MAX SIZE EXCEEDED | Reduce Object #"+str(objectId)+" of "+str(sizeOver)+"mb. "+str(sizeInMb)+"mb/0.25mb")
+      self.status[obj.name] = STATUS_OVER_BUDGET
+      return objectId, None
+
+    self.cache.add_pending(objectId, contentHash, dataLen)
+    self.status[obj.name] = STATUS_EXPORTED
+    return objectId, data
+
+  @contextmanager
+  def __export_root(self, obj):
+    """
+    Yields the objects to export (the object and its children), the matching export parameters and the
+    names to put back on the exported nodes and meshes (see rename_glb), copies of the objects in
+    non-destructive mode
+    """
+    if not self.__non_destructive:
+      yield [obj] + get_children(obj), {}, {}
+      return
+
+    with ExportCopies(obj, self.__center_transform, self.__export_collection) as copies:
+      yield copies.objects, ExportCopies.EXPORT_PARAMS, copies.names
+
+  def __export_compacted(self, obj, objectId, filepath):
+    """
+    Exports the object from temporary copies of its meshes, compacted until the predicted size fits.
+    The copies of a non-destructive export are compacted as they are.
+    """
+    with self.__export_root(obj) as (objects, params, names), \
+         CompactExport(objects, self.predictor, in_place=self.__non_destructive) as compact:
+      with stage("compact"):
+        compact.run(MAX_GLB_SIZE)
+      data = rename_glb(export_glb(filepath, **params, **compact.export_params), names)
+
+    steps = ", ".join(compact.steps) if compact.steps else "none"
+    self.__op_panel.report({'INFO'}, "Compacted #"+str(objectId)+" ("+steps+"), size: "+str(round(len(data)/1000000, 2))+"mb/0.25mb")
+    return data
+
+  def start_profile(self):
+    if self.profiler is not None:
+      start_profiling(self.profiler)
+
+  def finish_profile(self):
+    """
+    Stops the profiler, writes its report next to the blend file and reports the summary
+    """
+    if self.profiler is None:
+      return
+    stop_profiling()
+    try:
+      path = self.profiler.write_next_to_blend()
+    except OSError as err:
+      self.__op_panel.report({'WARNING'}, "Could not write the export profile: "+str(err))
+      path = None
+    self.__op_panel.report({'INFO'}, self.profiler.summary() + (" | "+path if path else ""))
+
+  def report_skipped(self):
+    if self.skipped > 0:
+      self.__op_panel.report({'INFO'}, "Skipped "+str(self.skipped)+" unchanged objects, saved "+str(round(self.bytes_saved/1000000, 2))+"mb")
+
+  def do_export(self):
+    self.start_profile()
     incr = 0
-    for obj in self.__export_objects:
-      bpy.ops.object.select_all(action='DESELECT') 
-      obj.select_set(state=True)
-
-      # Center selected object
-      old_pos = self.do_center(obj)
-
-      # Select children if exist
-      for child in get_children(obj):
-        child.select_set(state=True)
-        
-      if obj.parent is not None:
-        if old_pos is not None:
-          set_object_to_loc(obj, old_pos)
-        continue
+    uploaded = []
+    # Objects handed to the uploader, only reported once they are flushed
+    unflushed = []
+    # One connection for the whole batch, frames are pipelined and flushed at the end
+    uploader = UploadClient(bpy.context.scene.CW_Address, bpy.context.scene.CW_Port)
+    exporter = self.export_objects()
+    # Only the upload is handled here, errors of the exporter are raised with their own message
+    try:
+      for index, objectId, data in exporter:
+        if data is None:
+          continue
+
+        try:
+          uploader.send_object(objectId, bpy.context.scene.CW_PlayerId, data, self.object_name(index))
+        except OSError as err:
+          self.__op_panel.report({'ERROR'}, "Error while uploading #"+str(objectId)+": "+str(err))
+          break
 
-      nameArr = obj.name.split("_")
-      
-      # Common parameters
-      export_params = {
-        "export_format": 'GLB',
-        "filter_glob": "*.glb;*.gltf",
-        "filepath": bpy.app.tempdir + "/" + nameArr[0] + ".glb",
-        "use_selection": True,
-        "check_existing": False,
-        "export_materials": 'NONE',
-        "export_nla_strips": False,
-        "export_extras": True,
-        "export_draco_mesh_compression_enable": False,
-      }
-
-      # Check Blender version
-      blender_version = bpy.app.version
-
-      if blender_version >= (4, 2, 0):
-        # New parameters for Blender 4.2 and above
-        export_params["export_vertex_color"] = 'ACTIVE'
-        #export_params["export_active_vertex_color_when_no_material"] = False
-        #export_params["export_all_vertex_colors"] = False
+        unflushed.append((objectId, len(data)))
       else:
-        # Old parameter for versions below 4.2
-        export_params["export_colors"] = True
-
-      if blender_version >= (4, 0, 0):
-        # Add export_try_sparse_sk only if Blender version is 3.3 or newer
-        export_params["export_try_sparse_sk"] = False
-        
-      # Use the expanded parameters in the function call
-      bpy.ops.export_scene.gltf(**export_params)
-      
-      if not nameArr[0].isnumeric():
-        self.__op_panel.report({'ERROR'}, "Error "+nameArr[0]+" is not a number")
-        continue
+        try:
+          uploader.flush()
+        except OSError as err:
+          self.__op_panel.report({'ERROR'}, "Error while uploading: "+str(err))
+          unflushed = []
+
+        for objectId, size in unflushed:
+          incr += 1
+          uploaded.append(objectId)
+          sizeInMb = round(size/1000000, 2)
+          self.__op_panel.report({'INFO'}, "Exported #"+str(objectId)+", total size: " + str(sizeInMb)+"mb/0.25mb")
+    finally:
+      exporter.close()
+      uploader.close()
+
+    self.cache.commit(uploaded)
+    self.report_skipped()
+    self.finish_profile()
 
-      objectId = int(nameArr[0])
-      objectIdArr = int_to_bytes(objectId)
-      delimiter = bytearray([75,120,246,143])
-      
-      #printing debug stuff here
-      print(", ".join(hex(b) for b in objectIdArr))
-      print("id: "+str(objectId))
-      print("playerId: "+str(bpy.context.scene.CW_PlayerId))
-      
-      filename = bpy.app.tempdir + "/" + nameArr[0] + ".glb"
-      glbFile = open(filename, "rb")
-      data = glbFile.read()
-      glbFile.close()
-      
-      #playerNameBytes = bpy.context.scene.CW_PlayerId.encode()
-      #playerNameLen = len(playerNameBytes).to_bytes(1, 'little')
-      
-      #number_of_bytes = (bpy.context.scene.CW_PlayerId.bit_length() + 7)
-      playerIdBytes = int_to_bytes(bpy.context.scene.CW_PlayerId)
-      
-      dataLen = len(data)
-      dataLenBytes = int_to_bytes(dataLen)
-      maxLen = 249000
-      sizeInMb = round(dataLen/1000000, 2)
-      
-      if dataLen > maxLen:
-        sizeOver = round((dataLen-maxLen)/1000000, 2)
-        self.__op_panel.report({'ERROR'}, "Error MAX SIZE EXCEEDED | Reduce Object #"+str(objectId)+" of "+str(sizeOver)+"mb. "+str(sizeInMb)+"mb/0.25mb")
-        incr += 1
-        continue
-      
-      s = socket.socket()
-      s.connect((bpy.context.scene.CW_Address, bpy.context.scene.CW_Port))
-      
-      packet = bytearray()
-      packet.append(11)
-      
-      packet = packet + objectIdArr + playerIdBytes + dataLenBytes + data + delimiter
-      
-      s.send(packet)
-      s.close()
-      
-      incr += 1
-      
-      self.__op_panel.report({'INFO'}, "Exported #"+str(objectId)+", total size: " + str(sizeInMb)+"mb/0.25mb")
-
-      if old_pos is not None:
-        set_object_to_loc(obj, old_pos)
-    
     if incr < 0:
       self.__op_panel.report({'ERROR'}, "Error while exporting, No Objects found")
-      
+
     #self.__op_panel.report({'INFO'}, "Exported " + str(incr) + " glb to " + self.__export_folder)
     #else:
-    
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in self.__export_objects:
-        obj.select_set(state=True)
-    
-    bpy.context.view_layer.objects.active = saved_active
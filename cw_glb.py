@@ -0,0 +1,147 @@
+import bpy
+import builtins
+import importlib
+import io
+import json
+import os
+import struct
+
+from . cw_profile import stage
+
+# Modules of the glTF add-on that write the final file (save_gltf), newest first
+GLTF_WRITER_MODULES = (
+  "io_scene_gltf2.io.exp.export",
+  "io_scene_gltf2.io.exp.gltf2_io_export",
+)
+
+class _CaptureFile(io.BytesIO):
+
+  def __init__(self, on_close):
+    super().__init__()
+    self.__on_close = on_close
+
+  def close(self):
+    if not self.closed:
+      self.__on_close(self.getvalue())
+    super().close()
+
+class GLBCapture:
+  """
+  Redirects the file the glTF exporter writes to `filepath` into memory.
+  `data` stays None if the exporter could not be hooked, the file is then written to disk as usual.
+  """
+
+  def __init__(self, filepath):
+    self.filepath = self.__normalize(filepath)
+    self.data = None
+    self.__module = None
+    self.__saved_open = None
+
+  @staticmethod
+  def __normalize(path):
+    return os.path.normcase(os.path.abspath(path))
+
+  def __store(self, data):
+    self.data = data
+
+  def __open(self, file, mode='r', *args, **kwargs):
+    if 'w' in mode and isinstance(file, (str, os.PathLike)) and self.__normalize(file) == self.filepath:
+      return _CaptureFile(self.__store)
+    return builtins.open(file, mode, *args, **kwargs)
+
+  def __enter__(self):
+    for name in GLTF_WRITER_MODULES:
+      try:
+        module = importlib.import_module(name)
+      except ImportError:
+        continue
+      if hasattr(module, "save_gltf"):
+        self.__module = module
+        self.__saved_open = module.__dict__.get("open")
+        module.open = self.__open
+        break
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    if self.__module is None:
+      return
+    if self.__saved_open is None:
+      del self.__module.open
+    else:
+      self.__module.open = self.__saved_open
+    self.__module = None
+
+def get_export_params(filepath, **overrides):
+  # Common parameters
+  export_params = {
+    "export_format": 'GLB',
+    "filter_glob": "*.glb;*.gltf",
+    "filepath": filepath,
+    "use_selection": True,
+    "check_existing": False,
+    "export_materials": 'NONE',
+    "export_nla_strips": False,
+    "export_extras": True,
+    "export_draco_mesh_compression_enable": False,
+  }
+
+  # Check Blender version
+  blender_version = bpy.app.version
+
+  if blender_version >= (4, 2, 0):
+    # New parameters for Blender 4.2 and above
+    export_params["export_vertex_color"] = 'ACTIVE'
+  else:
+    # Old parameter for versions below 4.2
+    export_params["export_colors"] = True
+
+  if blender_version >= (4, 0, 0):
+    export_params["export_try_sparse_sk"] = False
+
+  export_params.update(overrides)
+  return export_params
+
+# Export the selection as GLB and return its bytes.
+# The file is kept in memory when the exporter can be hooked, otherwise it goes through `filepath`.
+# `overrides` replace the default export parameters.
+def export_glb(filepath, **overrides):
+  with stage("gltf_export") as info, GLBCapture(filepath) as capture:
+    bpy.ops.export_scene.gltf(**get_export_params(filepath, **overrides))
+    info["bytes"] = len(capture.data or b"")
+
+  if capture.data is not None:
+    return capture.data
+
+  with stage("file_read") as info, open(filepath, "rb") as glbFile:
+    data = glbFile.read()
+    info["bytes"] = len(data)
+  return data
+
+GLB_HEADER = struct.Struct("<III")
+GLB_CHUNK_HEADER = struct.Struct("<II")
+GLB_CHUNK_JSON = 0x4E4F534A
+
+# Renames nodes and meshes of a GLB, `names` maps "nodes" and "meshes" to {exported name: new name}.
+# Only the JSON chunk is rewritten, the binary chunk is copied as is.
+def rename_glb(data, names):
+  if not any(names.values()):
+    return data
+
+  magic, version, length = GLB_HEADER.unpack_from(data)
+  json_length, json_type = GLB_CHUNK_HEADER.unpack_from(data, GLB_HEADER.size)
+  if json_type != GLB_CHUNK_JSON:
+    raise ValueError("GLB doesn't start with a JSON chunk")
+  json_start = GLB_HEADER.size + GLB_CHUNK_HEADER.size
+  document = json.loads(data[json_start:json_start + json_length])
+
+  for key, renamed in names.items():
+    for item in document.get(key, ()):
+      if item.get("name") in renamed:
+        item["name"] = renamed[item["name"]]
+
+  json_chunk = json.dumps(document, separators=(",", ":")).encode()
+  # Chunks are 4 byte aligned, the JSON chunk is padded with spaces
+  json_chunk += b" " * (-len(json_chunk) % 4)
+  rest = data[json_start + json_length:]
+  return (GLB_HEADER.pack(magic, version, GLB_HEADER.size + GLB_CHUNK_HEADER.size + len(json_chunk) + len(rest))
+          + GLB_CHUNK_HEADER.pack(len(json_chunk), GLB_CHUNK_JSON) + json_chunk + rest)
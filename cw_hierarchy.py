@@ -0,0 +1,103 @@
+import bpy
+from bpy.app.handlers import persistent
+from contextlib import contextmanager
+
+class HierarchyIndex:
+  """
+  Parent to children map of all objects, built with a single pass over bpy.data.objects.
+  Children are listed in the order of bpy.data.objects, like the recursive scan it replaces.
+  """
+
+  def __init__(self):
+    self.__children = {}
+    self.__parents = {}
+    for ob in bpy.data.objects:
+      parent = ob.parent.as_pointer() if ob.parent is not None else None
+      self.__parents[ob.as_pointer()] = parent
+      if parent is not None:
+        self.__children.setdefault(parent, []).append(ob)
+    self.object_count = len(self.__parents)
+
+  def parent_changed(self, obj):
+    """
+    Whether the object was added or reparented since the index was built
+    """
+    pointer = obj.as_pointer()
+    if pointer not in self.__parents:
+      return True
+    parent = obj.parent.as_pointer() if obj.parent is not None else None
+    return self.__parents[pointer] != parent
+
+  def children(self, obj):
+    return list(self.__children.get(obj.as_pointer(), ()))
+
+  def descendants(self, obj):
+    """
+    All children of the object, depth first with every child followed by its own children
+    """
+    result = []
+    stack = [iter(self.__children.get(obj.as_pointer(), ()))]
+    while stack:
+      child = next(stack[-1], None)
+      if child is None:
+        stack.pop()
+        continue
+      result.append(child)
+      stack.append(iter(self.__children.get(child.as_pointer(), ())))
+    return result
+
+_index = None
+# While above 0 the index is kept, see frozen_hierarchy
+_frozen = 0
+
+def get_hierarchy():
+  """
+  Returns the hierarchy index, rebuilt if objects changed since it was built
+  """
+  global _index
+  if _index is None:
+    _index = HierarchyIndex()
+  return _index
+
+def invalidate_hierarchy():
+  global _index
+  if not _frozen:
+    _index = None
+
+@contextmanager
+def frozen_hierarchy():
+  """
+  Keeps one hierarchy index for the duration, e.g. a whole export whose temporary objects and moves don't
+  change the hierarchy of the exported objects. It's rebuilt on the next use afterwards.
+  """
+  global _frozen
+  get_hierarchy()
+  _frozen += 1
+  try:
+    yield
+  finally:
+    _frozen -= 1
+    invalidate_hierarchy()
+
+@persistent
+def _depsgraph_update_handler(scene, depsgraph):
+  # Only added, removed or reparented objects change the hierarchy, transforms and data don't
+  if _index is None or _frozen or not depsgraph.id_type_updated('OBJECT'):
+    return
+  if len(bpy.data.objects) != _index.object_count or any(
+      _index.parent_changed(update.id.original) for update in depsgraph.updates
+      if isinstance(update.id, bpy.types.Object)):
+    invalidate_hierarchy()
+
+@persistent
+def _load_post_handler(_):
+  invalidate_hierarchy()
+
+def register_handlers():
+  bpy.app.handlers.depsgraph_update_post.append(_depsgraph_update_handler)
+  bpy.app.handlers.load_post.append(_load_post_handler)
+
+def unregister_handlers():
+  bpy.app.handlers.load_post.remove(_load_post_handler)
+  bpy.app.handlers.depsgraph_update_post.remove(_depsgraph_update_handler)
+  invalidate_hierarchy()
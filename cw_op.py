@@ -8,6 +8,7 @@ from bpy.types import Operator
 from bpy.props import BoolProperty, FloatProperty, EnumProperty, StringProperty, IntProperty, FloatVectorProperty
 
 from .cw_export import CW_GLTF_Export
+from .cw_upload import UploadWorker
 
 # Existing operators
 class PALETTE_OT_add_color(bpy.types.Operator):
@@ -104,17 +105,109 @@ class PALETTE_OT_import_from_json(bpy.types.Operator):
 
 # Existing Operators
 
+# Events passed to the viewport while exporting, everything else is blocked so the exported objects
+# can't be deleted, undone or switched to another mode under the running export
+NAVIGATION_EVENTS = {
+    'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'WHEELINMOUSE', 'WHEELOUTMOUSE',
+    'TRACKPADPAN', 'TRACKPADZOOM', 'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'NDOF_MOTION',
+}
+
 class GLTF_OT_Operator(Operator):
     bl_idname = "object.cw_gltf_ot_operator"
     bl_label = "Batch Export"
     bl_description = "Export selected objects as glb" 
     bl_options = {'REGISTER'}
     
+    # Objects are exported on the main thread one per timer event, uploads run on a worker thread meanwhile
+    def invoke(self, context, event):
+        self._export = CW_GLTF_Export(self, context)
+        self._export.start_profile()
+        self._exporter = self._export.export_objects()
+        self._worker = UploadWorker(context.scene.CW_Address, context.scene.CW_Port)
+        self._worker.start()
+        self._exported = 0
+        self._queued = 0
+        self._done_exporting = False
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.progress_begin(0, self._export.object_count)
+        wm.modal_handler_add(self)
+        self.update_status(context)
+        return {'RUNNING_MODAL'}
+
     def execute(self, context):
         gltf_export = CW_GLTF_Export(self, context)
         gltf_export.do_export()
         return {'FINISHED'}
 
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.report({'WARNING'}, "Export cancelled")
+            return self.finish(context, cancelled=True)
+
+        if event.type != 'TIMER':
+            if event.type in NAVIGATION_EVENTS or event.type.startswith('NUMPAD_'):
+                return {'PASS_THROUGH'}
+            return {'RUNNING_MODAL'}
+
+        if self._worker.error is not None:
+            self.report({'ERROR'}, "Error while uploading: " + str(self._worker.error))
+            return self.finish(context, cancelled=True)
+
+        if not self._done_exporting:
+            try:
+                index, objectId, data = next(self._exporter)
+            except StopIteration:
+                self._done_exporting = True
+                self._worker.finish()
+            except Exception:
+                self.finish(context, cancelled=True)
+                raise
+            else:
+                self._exported = index + 1
+                context.window_manager.progress_update(self._exported)
+                if data is not None and self._worker.put(objectId, context.scene.CW_PlayerId, data,
+                                                         self._export.object_name(index)):
+                    self._queued += 1
+        elif not self._worker.is_alive:
+            return self.finish(context)
+
+        self.update_status(context)
+        return {'RUNNING_MODAL'}
+
+    def update_status(self, context):
+        worker = self._worker
+        context.workspace.status_text_set(
+            "Exported " + str(self._exported) + "/" + str(self._export.object_count)
+            + " | Uploaded " + str(worker.objects_done) + "/" + str(self._queued)
+            + ", " + str(round(worker.bytes_done/1000000, 2)) + "mb"
+            + " at " + str(round(worker.throughput/1000000, 2)) + "mb/s"
+            + " | ESC to cancel")
+
+    def finish(self, context, cancelled=False):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+        # Restores the selection
+        self._exporter.close()
+        if cancelled:
+            self._worker.cancel()
+        else:
+            self._worker.finish()
+        self._worker.join()
+        self._export.cache.commit(self._worker.uploaded)
+        self._export.report_skipped()
+        self._export.finish_profile()
+
+        if not cancelled:
+            self.report({'INFO'}, "Uploaded " + str(self._worker.objects_done) + " objects, "
+                        + str(round(self._worker.bytes_done/1000000, 2)) + "mb at "
+                        + str(round(self._worker.throughput/1000000, 2)) + "mb/s")
+        return {'CANCELLED'} if cancelled else {'FINISHED'}
+
 class GLTF_OT_Vertex_Alpha(Operator):
     bl_idname = "object.cw_gltf_ot_vertex_alpha"
     bl_label = "Color Vertex Alpha"
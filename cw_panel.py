@@ -55,6 +55,18 @@ class CWS_GLTF_PT_Panel(bpy.types.Panel):
         row = layout.row()
         row.prop(context.scene, "cw_center_transform", text="Center transform")
 
+        row = layout.row()
+        row.prop(context.scene, "cw_non_destructive_export", text="Non-destructive export")
+
+        row = layout.row()
+        row.prop(context.scene, "cw_force_full_export", text="Force full export")
+
+        row = layout.row()
+        row.prop(context.scene, "cw_auto_compact", text="Compact oversized objects")
+
+        row = layout.row()
+        row.prop(context.scene, "cw_export_profile", text="Profile export")
+
         row = layout.row()
         row.operator('object.cw_gltf_ot_operator', text='Export', icon='EXPORT')
 
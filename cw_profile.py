@@ -0,0 +1,126 @@
+import bpy
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+REPORT_SUFFIX = "_export_profile"
+CSV_FIELDS = ("object", "stage", "seconds", "bytes")
+
+class ExportProfiler:
+  """
+  Collects the duration and byte count of every export stage, per object.
+  Stages can be recorded from any thread, the ones without an explicit object are attributed to
+  the object currently exported on the main thread.
+  """
+
+  def __init__(self):
+    self.records = []
+    self.current_object = None
+    self.__lock = threading.Lock()
+    self.__start = time.perf_counter()
+    self.__end = None
+
+  def add(self, stage, seconds, object_name=None, size=0):
+    with self.__lock:
+      self.records.append({
+        "object": object_name if object_name is not None else self.current_object,
+        "stage": stage,
+        "seconds": seconds,
+        "bytes": size,
+      })
+
+  def finish(self):
+    self.__end = time.perf_counter()
+
+  @property
+  def total_seconds(self):
+    return (self.__end or time.perf_counter()) - self.__start
+
+  def stage_totals(self):
+    """
+    Seconds and bytes of each stage, summed over all objects, in order of first appearance
+    """
+    totals = {}
+    with self.__lock:
+      for record in self.records:
+        total = totals.setdefault(record["stage"], {"seconds": 0.0, "bytes": 0, "count": 0})
+        total["seconds"] += record["seconds"]
+        total["bytes"] += record["bytes"]
+        total["count"] += 1
+    return totals
+
+  def summary(self):
+    totals = self.stage_totals()
+    parts = [stage + " " + str(round(total["seconds"], 2)) + "s" for stage, total in
+             sorted(totals.items(), key=lambda item: item[1]["seconds"], reverse=True)]
+    return "Export took " + str(round(self.total_seconds, 2)) + "s: " + ", ".join(parts)
+
+  def write(self, directory, basename):
+    """
+    Writes the records as JSON (with the stage totals) and CSV, returns the path of the JSON report
+    """
+    path = os.path.join(directory, basename + REPORT_SUFFIX)
+    with self.__lock:
+      records = list(self.records)
+
+    with open(path + ".json", "w") as file:
+      json.dump({"seconds": self.total_seconds, "stages": self.stage_totals(), "records": records}, file, indent=2)
+
+    with open(path + ".csv", "w", newline="") as file:
+      writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+      writer.writeheader()
+      writer.writerows(records)
+
+    return path + ".json"
+
+  def write_next_to_blend(self):
+    # Unsaved files have no folder of their own
+    if bpy.data.filepath:
+      directory = os.path.dirname(bpy.data.filepath)
+      basename = os.path.splitext(os.path.basename(bpy.data.filepath))[0]
+    else:
+      directory = bpy.app.tempdir
+      basename = "untitled"
+    return self.write(directory, basename)
+
+_active = None
+
+def start_profiling(profiler):
+  global _active
+  _active = profiler
+
+def stop_profiling():
+  global _active
+  if _active is not None:
+    _active.finish()
+  _active = None
+
+def set_current_object(object_name):
+  if _active is not None:
+    _active.current_object = object_name
+
+def record(name, seconds, object_name=None, size=0):
+  """
+  Records a stage timed by the caller, e.g. when one measurement is shared by several objects
+  """
+  if _active is not None:
+    _active.add(name, seconds, object_name, size)
+
+# Times the enclosed code as `name`, does nothing while no profiler is active.
+# Yields a dict whose "bytes" can be set when the size is only known at the end of the stage.
+@contextmanager
+def stage(name, object_name=None, size=0):
+  info = {"bytes": size}
+  profiler = _active
+  if profiler is None:
+    yield info
+    return
+
+  start = time.perf_counter()
+  try:
+    yield info
+  finally:
+    profiler.add(name, time.perf_counter() - start, object_name, info["bytes"])
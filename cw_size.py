@@ -0,0 +1,132 @@
+import bpy
+import json
+import numpy as np
+
+from . cw_utils import get_children
+
+# Largest GLB accepted by the server
+MAX_GLB_SIZE = 249000
+
+# Predictions this much over the limit are rejected before export, closer ones are left to the real check
+PREFLIGHT_MARGIN = 1.1
+
+# Scene ID property holding the ratio between real and predicted sizes
+CALIBRATION_PROPERTY = "cw_size_calibration"
+# Weight of a new export in the running calibration
+CALIBRATION_WEIGHT = 0.2
+
+# GLB header, JSON and BIN chunk headers
+GLB_HEADER_SIZE = 12 + 8 + 8
+# asset, scene, buffer and sampler entries of the JSON chunk
+JSON_BASE_SIZE = 400
+# node and mesh entries
+JSON_NODE_SIZE = 160
+# accessor and buffer view entries, including min/max of positions
+JSON_ACCESSOR_SIZE = 200
+
+POSITION_SIZE = 12
+NORMAL_SIZE = 12
+TEXCOORD_SIZE = 8
+COLOR_SIZE = 16
+
+def _align4(size):
+  return (size + 3) & ~3
+
+def _foreach_get(collection, field, dtype, size):
+  values = np.empty(size, dtype=dtype)
+  collection.foreach_get(field, values)
+  return values
+
+def _corner_normals(mesh):
+  if hasattr(mesh, "corner_normals"):
+    return _foreach_get(mesh.corner_normals, "vector", np.float32, len(mesh.loops) * 3)
+  # Blender < 4.1
+  mesh.calc_normals_split()
+  return _foreach_get(mesh.loops, "normal", np.float32, len(mesh.loops) * 3)
+
+def _count_unique_rows(rows):
+  rows = np.ascontiguousarray(rows)
+  return len(np.unique(rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1])))))
+
+def mesh_size(mesh, normals=True):
+  """
+  Predicted size of the buffers and JSON of one exported mesh.
+  The exporter splits a vertex for every distinct combination of normal, UVs and color of its corners,
+  so the exported vertices are counted as the unique rows of those corner attributes.
+  """
+  loop_count = len(mesh.loops)
+  if loop_count == 0:
+    return JSON_NODE_SIZE
+
+  loop_verts = _foreach_get(mesh.loops, "vertex_index", np.int32, loop_count)
+  columns = [loop_verts.view(np.float32)[:, None]]
+  stride = POSITION_SIZE
+  accessors = 2
+  if normals:
+    columns.append(_corner_normals(mesh).reshape(-1, 3))
+    stride += NORMAL_SIZE
+    accessors += 1
+
+  for uv_layer in mesh.uv_layers:
+    columns.append(_foreach_get(uv_layer.uv, "vector", np.float32, loop_count * 2).reshape(-1, 2))
+    stride += TEXCOORD_SIZE
+    accessors += 1
+
+  color_attribute = mesh.color_attributes.active_color
+  if color_attribute is not None:
+    colors = _foreach_get(color_attribute.data, "color", np.float32, len(color_attribute.data) * 4).reshape(-1, 4)
+    columns.append(colors if color_attribute.domain == 'CORNER' else colors[loop_verts])
+    stride += COLOR_SIZE
+    accessors += 1
+
+  vertex_count = _count_unique_rows(np.hstack(columns))
+  loop_totals = _foreach_get(mesh.polygons, "loop_total", np.int32, len(mesh.polygons))
+  index_count = 3 * int(np.maximum(loop_totals - 2, 0).sum())
+  index_size = 2 if vertex_count < 65536 else 4
+
+  buffers = _align4(vertex_count * stride) + _align4(index_count * index_size)
+  return buffers + JSON_NODE_SIZE + accessors * JSON_ACCESSOR_SIZE
+
+def raw_object_size(obj):
+  """
+  Predicted GLB size of the object and its children, before calibration.
+  Modifiers aren't applied by the export, so the prediction uses the meshes as they are, not the evaluated ones.
+  """
+  size = GLB_HEADER_SIZE + JSON_BASE_SIZE
+  # The exporter writes a mesh used by several objects once
+  meshes = set()
+  for ob in [obj] + get_children(obj):
+    # Custom properties are exported as extras
+    size += len(json.dumps({key: str(ob[key]) for key in ob.keys()}))
+    if ob.type != 'MESH' or ob.data.as_pointer() in meshes:
+      size += JSON_NODE_SIZE
+      continue
+    meshes.add(ob.data.as_pointer())
+    size += mesh_size(ob.data)
+  return size
+
+class SizePredictor:
+  """
+  Predicts GLB sizes from the exported meshes, scaled by a calibration factor that follows the
+  ratio of real to predicted sizes of previous exports
+  """
+
+  def __init__(self, scene):
+    self.__scene = scene
+    self.factor = float(scene.get(CALIBRATION_PROPERTY, 1.0))
+
+  def predict_raw(self, obj):
+    return raw_object_size(obj)
+
+  def predict(self, obj):
+    return int(self.predict_raw(obj) * self.factor)
+
+  def is_over_budget(self, predicted_raw):
+    return predicted_raw * self.factor > MAX_GLB_SIZE * PREFLIGHT_MARGIN
+
+  def calibrate(self, predicted_raw, actual):
+    if predicted_raw <= 0:
+      return
+    ratio = actual / predicted_raw
+    self.factor += (ratio - self.factor) * CALIBRATION_WEIGHT
+    self.__scene[CALIBRATION_PROPERTY] = self.factor
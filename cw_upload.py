@@ -0,0 +1,305 @@
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from . cw_profile import stage, record
+
+FRAME_TYPE_GLB = 11
+FRAME_DELIMITER = bytes([75,120,246,143])
+# type, objectId, playerId, data length
+FRAME_HEADER = struct.Struct("<BIII")
+
+# Frames are coalesced until this many bytes are pending, then sent in one go
+PIPELINE_BYTES = 256 * 1024
+
+def build_frame(object_id, player_id, data):
+  return FRAME_HEADER.pack(FRAME_TYPE_GLB, object_id, player_id, len(data)) + data + FRAME_DELIMITER
+
+class UploadClient:
+  """
+  Sends frames over persistent connections to the Cubio server.
+  Frames are written back to back (pipelined) with sendall, round robin over `pool_size` connections.
+  The server doesn't acknowledge frames, so a payload is only sent again on a reopened connection (up to
+  `retries` times) if none of its bytes were written yet. Once part of it is out an error is raised,
+  resending it could deliver the same frames twice.
+  """
+
+  def __init__(self, address, port, pool_size=1, timeout=10.0, retries=2, pipeline_bytes=PIPELINE_BYTES):
+    self.address = address
+    self.port = port
+    self.timeout = timeout
+    self.retries = retries
+    self.pipeline_bytes = pipeline_bytes
+    self.frames_sent = 0
+    self.bytes_sent = 0
+    self.reconnects = 0
+    self.__sockets = [None] * max(pool_size, 1)
+    self.__next_socket = 0
+    self.__pending = []
+    self.__pending_bytes = 0
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    try:
+      if exc_type is None:
+        self.flush()
+    finally:
+      self.close()
+
+  def __connect(self, slot, object_name):
+    with stage("connect", object_name):
+      s = socket.create_connection((self.address, self.port), timeout=self.timeout)
+      s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    self.__sockets[slot] = s
+    return s
+
+  def __disconnect(self, slot):
+    s = self.__sockets[slot]
+    self.__sockets[slot] = None
+    if s is not None:
+      try:
+        s.close()
+      except OSError:
+        pass
+
+  def __sendall(self, payload, object_name):
+    slot = self.__next_socket
+    self.__next_socket = (slot + 1) % len(self.__sockets)
+
+    view = memoryview(payload)
+    sent = 0
+    for attempt in range(self.retries + 1):
+      try:
+        s = self.__sockets[slot] or self.__connect(slot, object_name)
+        while sent < len(view):
+          sent += s.send(view[sent:])
+        return
+      except OSError:
+        self.__disconnect(slot)
+        if sent > 0 or attempt == self.retries:
+          raise
+        self.reconnects += 1
+
+  def send(self, frame, object_name=None):
+    """
+    Queues the frame, `object_name` is the key its upload stages are profiled under
+    """
+    self.__pending.append((object_name, frame))
+    self.__pending_bytes += len(frame)
+    if self.__pending_bytes >= self.pipeline_bytes:
+      self.flush()
+
+  def send_object(self, object_id, player_id, data, object_name=None):
+    with stage("packet_build", object_name, len(data)):
+      frame = build_frame(object_id, player_id, data)
+    self.send(frame, object_name)
+
+  def flush(self):
+    if not self.__pending:
+      return
+    pending = self.__pending
+    self.__pending = []
+    self.__pending_bytes = 0
+
+    # A reconnect is attributed to the first object of the payload
+    payload = b"".join(frame for _, frame in pending)
+    start = time.perf_counter()
+    self.__sendall(payload, pending[0][0])
+    seconds = time.perf_counter() - start
+    self.frames_sent += len(pending)
+    self.bytes_sent += len(payload)
+
+    # The frames were sent together, each object gets the share of its bytes
+    for object_name, frame in pending:
+      record("send", seconds * len(frame) / len(payload), object_name, len(frame))
+
+  def close(self):
+    self.__pending = []
+    self.__pending_bytes = 0
+    for slot in range(len(self.__sockets)):
+      self.__disconnect(slot)
+
+class UploadWorker:
+  """
+  Uploads frames from a bounded queue on a background thread, so the next object can be exported on the
+  main thread meanwhile. `put` blocks while the queue is full. The counters are only written by the worker.
+  """
+
+  def __init__(self, address, port, queue_size=4, **client_args):
+    self.objects_done = 0
+    self.bytes_done = 0
+    self.uploaded = []
+    self.error = None
+    self.__client = UploadClient(address, port, **client_args)
+    self.__queue = queue.Queue(maxsize=queue_size)
+    self.__cancelled = threading.Event()
+    self.__thread = threading.Thread(target=self.__run, daemon=True)
+    self.__start_time = None
+    self.__end_time = None
+
+  def start(self):
+    self.__start_time = time.perf_counter()
+    self.__thread.start()
+
+  def put(self, object_id, player_id, data, object_name=None):
+    # Wake up regularly so a worker that stopped can't block the caller forever
+    while self.is_alive:
+      try:
+        self.__queue.put((object_id, player_id, data, object_name), timeout=0.1)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def finish(self):
+    """
+    Signals that no more objects follow, the worker stops once the queue is uploaded
+    """
+    while self.is_alive:
+      try:
+        self.__queue.put(None, timeout=0.1)
+        return
+      except queue.Full:
+        pass
+
+  def cancel(self):
+    self.__cancelled.set()
+
+  def join(self, timeout=None):
+    self.__thread.join(timeout)
+
+  @property
+  def is_alive(self):
+    return self.__thread.is_alive()
+
+  @property
+  def pending(self):
+    return self.__queue.qsize()
+
+  @property
+  def throughput(self):
+    """
+    Uploaded bytes per second
+    """
+    if self.__start_time is None:
+      return 0.0
+    elapsed = (self.__end_time or time.perf_counter()) - self.__start_time
+    return self.bytes_done / elapsed if elapsed > 0.0 else 0.0
+
+  def __run(self):
+    # Objects handed to the client but not flushed yet
+    unflushed = []
+    try:
+      while not self.__cancelled.is_set():
+        try:
+          item = self.__queue.get(timeout=0.1)
+        except queue.Empty:
+          continue
+        if item is None:
+          break
+        object_id, player_id, data, object_name = item
+        self.__client.send_object(object_id, player_id, data, object_name)
+        unflushed.append((object_id, len(data)))
+
+        # Frames are pipelined while more objects are waiting, flushed as soon as the queue runs dry
+        if self.__queue.empty():
+          self.__flush(unflushed)
+
+      if not self.__cancelled.is_set():
+        self.__flush(unflushed)
+    except OSError as err:
+      self.error = err
+    finally:
+      self.__client.close()
+      self.__end_time = time.perf_counter()
+
+  def __flush(self, unflushed):
+    self.__client.flush()
+    self.uploaded += [object_id for object_id, _ in unflushed]
+    self.objects_done += len(unflushed)
+    self.bytes_done += sum(size for _, size in unflushed)
+    unflushed.clear()
+
+class _ReceiverHandler(socketserver.BaseRequestHandler):
+
+  def handle(self):
+    receiver = self.server.receiver
+    receiver._on_connection()
+    buffer = bytearray()
+    while True:
+      chunk = self.request.recv(65536)
+      if not chunk:
+        break
+      buffer += chunk
+
+      while len(buffer) >= FRAME_HEADER.size:
+        frame_type, object_id, player_id, length = FRAME_HEADER.unpack_from(buffer)
+        end = FRAME_HEADER.size + length + len(FRAME_DELIMITER)
+        if len(buffer) < end:
+          break
+        if frame_type != FRAME_TYPE_GLB or buffer[end - len(FRAME_DELIMITER):end] != FRAME_DELIMITER:
+          receiver._on_error("Malformed frame")
+          return
+        receiver._on_frame(object_id, player_id, bytes(buffer[FRAME_HEADER.size:end - len(FRAME_DELIMITER)]))
+        del buffer[:end]
+
+    if buffer:
+      receiver._on_error("Connection closed in the middle of a frame")
+
+class LocalReceiver:
+  """
+  Stand-in for the Cubio server to test uploads offline.
+  Listens on localhost and collects the received frames as (objectId, playerId, data).
+  """
+
+  def __init__(self, port=0):
+    self.frames = []
+    self.errors = []
+    self.connections = 0
+    self.__condition = threading.Condition()
+    self.__server = socketserver.ThreadingTCPServer(("127.0.0.1", port), _ReceiverHandler)
+    self.__server.daemon_threads = True
+    self.__server.receiver = self
+    self.__thread = None
+
+  @property
+  def address(self):
+    return self.__server.server_address
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.stop()
+
+  def start(self):
+    self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+    self.__thread.start()
+
+  def stop(self):
+    self.__server.shutdown()
+    self.__server.server_close()
+    self.__thread.join()
+
+  def wait_for(self, count, timeout=5.0):
+    with self.__condition:
+      return self.__condition.wait_for(lambda: len(self.frames) >= count, timeout)
+
+  def _on_connection(self):
+    with self.__condition:
+      self.connections += 1
+
+  def _on_frame(self, object_id, player_id, data):
+    with self.__condition:
+      self.frames.append((object_id, player_id, data))
+      self.__condition.notify_all()
+
+  def _on_error(self, message):
+    with self.__condition:
+      self.errors.append(message)
@@ -1,5 +1,7 @@
 import bpy
 
+from . cw_hierarchy import get_hierarchy
+
 # Get a copy of an object's location
 def get_object_loc(obj):
   return obj.location.copy()
@@ -8,13 +10,9 @@ def get_object_loc(obj):
 def set_object_to_loc(obj, loc):
   obj.location = loc
 
+# All children of obj, recursively (from the hierarchy index instead of scanning bpy.data.objects)
 def get_children(obj): 
-  children = [] 
-  for ob in bpy.data.objects: 
-      if ob.parent == obj: 
-          children.append(ob)
-          children = children + get_children(ob)
-  return children
+  return get_hierarchy().descendants(obj)
 
 def get_cursor_loc(context):
   return context.scene.cursor.location.copy()
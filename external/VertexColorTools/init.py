@@ -15,6 +15,7 @@ bl_info = {
 import bpy
 
 from . import preferences, tools, operators, ui, paint_palette_compat
+from .internal import selection
 
 
 def register():
@@ -22,6 +23,7 @@ def register():
 
 	preferences.register()
 	paint_palette_compat.register()
+	selection.register()
 
 	if not bpy.app.background:
 		ui.register()
@@ -33,6 +35,7 @@ def unregister():
 		tools.unregister_tools()
 		ui.unregister()
 
+	selection.unregister()
 	paint_palette_compat.unregister()
 	preferences.unregister()
 
@@ -0,0 +1,140 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+# Element adjacency in compressed sparse row (CSR) form, built once from the flat mesh arrays
+# of `MeshArrays`, and graph traversals that work on whole arrays instead of single elements.
+#
+
+import numpy as np
+
+from .color_array import MeshArrays
+
+
+class CSRAdjacency:
+	'''
+	Symmetric adjacency of `count` elements. The neighbors of element i are `indices[offsets[i]:offsets[i + 1]]`.
+	'''
+
+	def __init__(self, offsets: np.ndarray, indices: np.ndarray):
+		self.offsets = offsets
+		self.indices = indices
+
+	@classmethod
+	def from_pairs(cls, count: int, a: np.ndarray, b: np.ndarray) -> 'CSRAdjacency':
+		'''
+		Builds the adjacency from pairs of linked elements, duplicates and self links are removed
+		'''
+		src = np.concatenate((a, b)).astype(np.int64)
+		dst = np.concatenate((b, a)).astype(np.int64)
+		linked = src != dst
+		keys = np.unique(src[linked] * count + dst[linked])
+		src, dst = np.divmod(keys, count)
+
+		offsets = np.zeros(count + 1, dtype=np.int64)
+		np.cumsum(np.bincount(src, minlength=count), out=offsets[1:])
+		return cls(offsets, dst)
+
+	def __len__(self) -> int:
+		return len(self.offsets) - 1
+
+	def neighbors(self, elem: int) -> np.ndarray:
+		return self.indices[self.offsets[elem]:self.offsets[elem + 1]]
+
+	def gather(self, elems: np.ndarray) -> np.ndarray:
+		'''
+		Returns the neighbors of all given elements, may contain duplicates
+		'''
+		starts = self.offsets[elems]
+		counts = self.offsets[elems + 1] - starts
+		return self.indices[_ranges(starts, counts)]
+
+	def pairs(self) -> tuple[np.ndarray, np.ndarray]:
+		'''
+		Returns all links as two arrays, each link is contained in both directions
+		'''
+		src = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+		return src, self.indices
+
+
+def vertex_adjacency(arrays: MeshArrays) -> CSRAdjacency:
+	'''
+	Vertices linked by an edge
+	'''
+	edge_verts = arrays.edge_verts
+	return CSRAdjacency.from_pairs(len(arrays.coords), edge_verts[:, 0], edge_verts[:, 1])
+
+
+def face_adjacency(arrays: MeshArrays, check_corners: bool = False) -> CSRAdjacency:
+	'''
+	Faces linked by an edge, or by a vertex if `check_corners` is set
+	'''
+	keys = arrays.loop_verts if check_corners else arrays.loop_edges
+	a, b = _group_pairs(keys, arrays.loop_faces)
+	return CSRAdjacency.from_pairs(len(arrays.loop_starts), a, b)
+
+
+def flood_fill(adjacency: CSRAdjacency, seed: int, mask: np.ndarray) -> np.ndarray:
+	'''
+	Returns the indices of all elements in `mask` that are connected to the seed through elements in `mask`.
+	The seed itself is not included.
+	'''
+	visited = np.zeros(len(adjacency), dtype=bool)
+	visited[seed] = True
+	frontier = np.array([seed], dtype=np.int64)
+	reached = []
+	while len(frontier):
+		candidates = np.unique(adjacency.gather(frontier))
+		frontier = candidates[mask[candidates] & ~visited[candidates]]
+		visited[frontier] = True
+		reached.append(frontier)
+	return np.concatenate(reached)
+
+
+def connected_labels(count: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+	'''
+	Labels the connected components of `count` elements linked by the pairs `a`, `b`.
+	Union-find over all links at once: each pass hooks the larger root of every link onto the smaller one,
+	followed by path compression. Elements of a component are labelled with its lowest index.
+	'''
+	parent = np.arange(count)
+	while True:
+		root_a = parent[a]
+		root_b = parent[b]
+		unmerged = root_a != root_b
+		if not unmerged.any():
+			return parent
+		np.minimum.at(parent, np.maximum(root_a, root_b)[unmerged], np.minimum(root_a, root_b)[unmerged])
+
+		# Path compression
+		while True:
+			grandparent = parent[parent]
+			if np.array_equal(grandparent, parent):
+				break
+			parent = grandparent
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+	'''
+	Concatenation of `range(start, start + count)` for all starts and counts
+	'''
+	total = counts.sum()
+	offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+	return offsets + np.arange(total)
+
+
+def _group_pairs(keys: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+	'''
+	Returns all pairs of values whose keys are equal
+	'''
+	order = np.argsort(keys, kind='stable')
+	keys = keys[order]
+	values = values[order]
+
+	group_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+	group_sizes = np.diff(np.r_[group_starts, len(keys)])
+
+	# Pair every element with every element of its group
+	sizes = np.repeat(group_sizes, group_sizes)
+	starts = np.repeat(group_starts, group_sizes)
+	src = np.repeat(np.arange(len(keys)), sizes)
+	dst = _ranges(starts, sizes)
+	return values[src], values[dst]
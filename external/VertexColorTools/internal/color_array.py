@@ -0,0 +1,250 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+# Bulk (numpy) access to mesh color attributes.
+#
+# The BMesh functions in color_attribute.py touch one element at a time from Python, which
+# gets slow on meshes with hundreds of thousands of face corners. This module reads a whole
+# color attribute into one (N,4) float32 array with `foreach_get` and writes it back with a
+# single `foreach_set`, so operations can be done as array math.
+#
+
+import bpy
+import bmesh
+from bmesh.types import BMVert, BMFace
+import numpy as np
+
+from contextlib import contextmanager
+
+
+# Color attributes with at least this many elements use the numpy backend
+BULK_ELEMENT_THRESHOLD = 20000
+
+
+def use_bulk_backend(mesh: bpy.types.Mesh, color_attribute: bpy.types.Attribute = None) -> bool:
+	'''
+	Whether the numpy backend should be used for the given color attribute (defaults to the active color)
+	'''
+	if color_attribute is None:
+		color_attribute = mesh.color_attributes.active_color
+	if color_attribute.domain == 'CORNER':
+		return len(mesh.loops) >= BULK_ELEMENT_THRESHOLD
+	return len(mesh.vertices) >= BULK_ELEMENT_THRESHOLD
+
+
+class MeshArrays:
+	'''
+	Flat numpy views of the mesh data used by the bulk backend.
+	Only valid while the mesh is out of edit mode, see `bulk_mesh_arrays`.
+	Index arrays are read lazily and cached for the lifetime of the object.
+	'''
+
+	def __init__(self, mesh: bpy.types.Mesh, active_vert: int = -1, active_face: int = -1):
+		self.mesh = mesh
+		self.active_vert = active_vert
+		self.active_face = active_face
+		self._coords: np.ndarray = None
+		self._loop_verts: np.ndarray = None
+		self._loop_edges: np.ndarray = None
+		self._loop_faces: np.ndarray = None
+		self._edge_verts: np.ndarray = None
+		self._loop_starts: np.ndarray = None
+		self._loop_totals: np.ndarray = None
+		self._vert_select: np.ndarray = None
+		self._face_select: np.ndarray = None
+
+	@property
+	def coords(self) -> np.ndarray:
+		'''Object space vertex coordinates as a (N,3) array'''
+		if self._coords is None:
+			self._coords = np.empty(len(self.mesh.vertices) * 3, dtype=np.float32)
+			self.mesh.vertices.foreach_get('co', self._coords)
+			self._coords = self._coords.reshape(-1, 3)
+		return self._coords
+
+	@property
+	def loop_verts(self) -> np.ndarray:
+		'''Vertex index of each face corner'''
+		if self._loop_verts is None:
+			self._loop_verts = np.empty(len(self.mesh.loops), dtype=np.int32)
+			self.mesh.loops.foreach_get('vertex_index', self._loop_verts)
+		return self._loop_verts
+
+	@property
+	def loop_edges(self) -> np.ndarray:
+		'''Edge index of each face corner'''
+		if self._loop_edges is None:
+			self._loop_edges = np.empty(len(self.mesh.loops), dtype=np.int32)
+			self.mesh.loops.foreach_get('edge_index', self._loop_edges)
+		return self._loop_edges
+
+	@property
+	def edge_verts(self) -> np.ndarray:
+		'''Vertex indices of each edge as a (N,2) array'''
+		if self._edge_verts is None:
+			self._edge_verts = np.empty(len(self.mesh.edges) * 2, dtype=np.int32)
+			self.mesh.edges.foreach_get('vertices', self._edge_verts)
+			self._edge_verts = self._edge_verts.reshape(-1, 2)
+		return self._edge_verts
+
+	@property
+	def loop_faces(self) -> np.ndarray:
+		'''Face index of each face corner'''
+		if self._loop_faces is None:
+			self._loop_faces = np.repeat(np.arange(len(self.loop_totals), dtype=np.int32), self.loop_totals)
+		return self._loop_faces
+
+	@property
+	def loop_starts(self) -> np.ndarray:
+		'''Index of the first face corner of each face'''
+		if self._loop_starts is None:
+			self._loop_starts = np.empty(len(self.mesh.polygons), dtype=np.int32)
+			self.mesh.polygons.foreach_get('loop_start', self._loop_starts)
+		return self._loop_starts
+
+	@property
+	def loop_totals(self) -> np.ndarray:
+		'''Number of face corners of each face'''
+		if self._loop_totals is None:
+			self._loop_totals = np.empty(len(self.mesh.polygons), dtype=np.int32)
+			self.mesh.polygons.foreach_get('loop_total', self._loop_totals)
+		return self._loop_totals
+
+	@property
+	def vert_select(self) -> np.ndarray:
+		if self._vert_select is None:
+			self._vert_select = np.empty(len(self.mesh.vertices), dtype=bool)
+			self.mesh.vertices.foreach_get('select', self._vert_select)
+		return self._vert_select
+
+	@property
+	def face_select(self) -> np.ndarray:
+		if self._face_select is None:
+			self._face_select = np.empty(len(self.mesh.polygons), dtype=bool)
+			self.mesh.polygons.foreach_get('select', self._face_select)
+		return self._face_select
+
+	def read_colors(self, attribute_name: str) -> np.ndarray:
+		'''
+		Returns the colors of the attribute as a (N,4) float32 array.
+		Byte colors are returned in sRGB space to match the values of the BMesh color layers.
+		'''
+		color_attribute = self.mesh.color_attributes[attribute_name]
+		colors = np.empty(len(color_attribute.data) * 4, dtype=np.float32)
+		color_attribute.data.foreach_get(_color_key(color_attribute), colors)
+		return colors.reshape(-1, 4)
+
+	def face_averages(self, corner_colors: np.ndarray) -> np.ndarray:
+		'''
+		Returns the average of the face corner colors of each face
+		'''
+		return np.add.reduceat(corner_colors, self.loop_starts, axis=0) / self.loop_totals[:, np.newaxis]
+
+	def write_colors(self, attribute_name: str, colors: np.ndarray):
+		color_attribute = self.mesh.color_attributes[attribute_name]
+		colors = np.ascontiguousarray(colors, dtype=np.float32).reshape(-1)
+		color_attribute.data.foreach_set(_color_key(color_attribute), colors)
+
+
+class ColorSnapshot:
+	'''
+	Copy of a color attribute in one contiguous (N,4) float32 buffer, used to undo previews in modal operators.
+	Keeps track of the range of elements changed since the last restore, so a restore only rewrites those.
+	'''
+
+	def __init__(self, attribute_name: str, colors: np.ndarray):
+		self.attribute_name = attribute_name
+		self.colors = colors
+		self.dirty_start = 0
+		self.dirty_stop = 0
+
+	@property
+	def is_dirty(self) -> bool:
+		return self.dirty_stop > self.dirty_start
+
+	def mark_dirty(self, indices: np.ndarray = None):
+		'''
+		Marks elements as changed since the snapshot was taken, or all elements if no indices are given
+		'''
+		if indices is None:
+			start, stop = 0, len(self.colors)
+		elif len(indices) == 0:
+			return
+		else:
+			start, stop = int(indices.min()), int(indices.max()) + 1
+
+		if self.is_dirty:
+			start = min(start, self.dirty_start)
+			stop = max(stop, self.dirty_stop)
+		self.dirty_start, self.dirty_stop = start, stop
+
+	def clear_dirty(self):
+		self.dirty_start = self.dirty_stop = 0
+
+	def restore(self, arrays: MeshArrays):
+		'''
+		Writes the dirty range back to the mesh data with a single bulk write
+		'''
+		if not self.is_dirty:
+			return
+		if self.dirty_start == 0 and self.dirty_stop == len(self.colors):
+			arrays.write_colors(self.attribute_name, self.colors)
+		else:
+			colors = arrays.read_colors(self.attribute_name)
+			colors[self.dirty_start:self.dirty_stop] = self.colors[self.dirty_start:self.dirty_stop]
+			arrays.write_colors(self.attribute_name, colors)
+		self.clear_dirty()
+
+
+# Meshes written by `bulk_mesh_arrays` whose depsgraph update hasn't been seen yet
+_own_updates: set[int] = set()
+
+
+def consume_own_update(mesh_pointer: int) -> bool:
+	'''
+	Whether the update of the mesh was caused by `bulk_mesh_arrays`, each write is reported once
+	'''
+	if mesh_pointer in _own_updates:
+		_own_updates.remove(mesh_pointer)
+		return True
+	return False
+
+
+@contextmanager
+def bulk_mesh_arrays(mesh: bpy.types.Mesh, arrays: MeshArrays = None):
+	'''
+	Leaves edit mode so that the mesh data reflects the edit-mesh and yields a `MeshArrays` for it.
+	Edit mode is restored on exit, which reloads the edit-mesh from the (modified) mesh data.
+	BMesh references taken before entering are invalid afterwards.
+	An existing `arrays` can be passed to reuse its cached arrays when the topology has not changed.
+	'''
+	if arrays is None:
+		bm = bmesh.from_edit_mesh(mesh)
+		arrays = MeshArrays(mesh, *_get_active_indices(bm))
+
+	bpy.ops.object.mode_set(mode='OBJECT')
+	try:
+		yield arrays
+		mesh.update()
+	finally:
+		bpy.ops.object.mode_set(mode='EDIT')
+		_own_updates.add(mesh.as_pointer())
+
+
+def _get_active_indices(bm: bmesh.types.BMesh) -> tuple[int, int]:
+	'''
+	Returns the index of the active vertex and face, -1 if there is none
+	'''
+	if not bm.select_history:
+		return (-1, -1)
+	elem = bm.select_history[-1]
+	if isinstance(elem, BMVert):
+		bm.verts.index_update()
+		return (elem.index, -1)
+	if isinstance(elem, BMFace):
+		bm.faces.index_update()
+		return (-1, elem.index)
+	return (-1, -1)
+
+
+def _color_key(color_attribute: bpy.types.Attribute) -> str:
+	return 'color_srgb' if color_attribute.data_type == 'BYTE_COLOR' else 'color'
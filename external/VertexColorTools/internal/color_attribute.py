@@ -5,19 +5,16 @@ import bl_math
 import bmesh
 from bmesh.types import BMVert, BMEdge, BMFace, BMesh, BMLayerItem, BMLoop, BMVertSeq, BMElemSeq
 from mathutils import Vector, Color
-import queue
+import numpy as np
+from collections import deque
+from itertools import islice
 
 from .types import ContextException
 
 from . import color_utils as ColorUtils
-
-from enum import Enum
-
-class FilterType(Enum):
-	ALL = 0
-	SELECTED = 1
-	ACTIVE_VERTEX = 2,
-	ACTIVE = 3
+from .color_array import MeshArrays, ColorSnapshot, bulk_mesh_arrays, use_bulk_backend, BULK_ELEMENT_THRESHOLD
+from .adjacency import CSRAdjacency, vertex_adjacency, face_adjacency, flood_fill, connected_labels
+from .selection import FilterType, get_selection_indices
 
 def merge_color_attribute(mesh: bpy.types.Mesh,
 						base_attr_name: str,
@@ -35,6 +32,14 @@ def merge_color_attribute(mesh: bpy.types.Mesh,
 	if not other_attr:
 		raise ContextException(f"Color attribute \"{other_attr_name}\" not found")
 
+	if use_bulk_backend(mesh, base_attr):
+		with bulk_mesh_arrays(mesh) as arrays:
+			base_colors = arrays.read_colors(base_attr_name)
+			other_colors = arrays.read_colors(other_attr_name)
+			other_colors = _blend_colors_array(blend_func, factor, other_colors, base_colors, clip_colors)
+			arrays.write_colors(other_attr_name, other_colors)
+		return
+
 	bm = bmesh.from_edit_mesh(mesh)
 
 	base_layer, is_corner_attribute, _ = _parse_color_attribute(bm, base_attr)
@@ -62,17 +67,8 @@ def bright_contrast_color_attribute(mesh: bpy.types.Mesh,
 	(http://visca.com/ffactory/archives/5-99/msg00021.html)
 	Extracted from blender/source/blender/compositor/realtime_compositor/shaders/library/gpu_shader_compositor_bright_contrast.glsl
 	"""
-	bm = bmesh.from_edit_mesh(mesh)
-
-	active_layer, is_corner_attribute, _ = _parse_color_attribute(bm, mesh.color_attributes.active_color)
-	
 	filter_type = FilterType.SELECTED if selected_only else FilterType.ALL
 
-	if is_corner_attribute:
-		elems = _get_face_loops(bm, filter_type)
-	else:
-		elems = _get_vertices(bm, filter_type)
-
 	brightness /= 100.0
 	delta = contrast / 200.0
 
@@ -84,7 +80,29 @@ def bright_contrast_color_attribute(mesh: bpy.types.Mesh,
 		delta *= -1.0
 		multiplier = max(1.0 - delta * 2.0, 0.0)
 		offset = multiplier * brightness + delta
-	
+
+	if use_bulk_backend(mesh):
+		with bulk_mesh_arrays(mesh) as arrays:
+			color_attribute = mesh.color_attributes.active_color
+			colors = arrays.read_colors(color_attribute.name)
+			indices = get_selection_indices(arrays).get(color_attribute.domain == 'CORNER', filter_type)
+
+			out_rgb = colors[indices, :3] * multiplier + offset
+			if clip_colors:
+				np.clip(out_rgb, 0.0, 1.0, out=out_rgb)
+			colors[indices, :3] = out_rgb
+
+			arrays.write_colors(color_attribute.name, colors)
+		return
+
+	bm = bmesh.from_edit_mesh(mesh)
+
+	active_layer, is_corner_attribute, _ = _parse_color_attribute(bm, mesh.color_attributes.active_color)
+
+	if is_corner_attribute:
+		elems = _get_face_loops(bm, filter_type)
+	else:
+		elems = _get_vertices(bm, filter_type)
 
 	for elem in elems:
 		out_rgb = Vector((c * multiplier + offset for c in elem[active_layer][:3]))
@@ -98,6 +116,14 @@ def bright_contrast_color_attribute(mesh: bpy.types.Mesh,
 	
 
 def clip_color_attribute(mesh: bpy.types.Mesh):
+	if use_bulk_backend(mesh):
+		with bulk_mesh_arrays(mesh) as arrays:
+			name = mesh.color_attributes.active_color.name
+			colors = arrays.read_colors(name)
+			np.clip(colors, 0.0, 1.0, out=colors)
+			arrays.write_colors(name, colors)
+		return
+
 	bm = bmesh.from_edit_mesh(mesh)
 
 	active_layer, is_corner_attribute, _ = _parse_color_attribute(bm, mesh.color_attributes.active_color)
@@ -118,6 +144,10 @@ def select_linked(mesh: bpy.types.Mesh,
 				threshold: float = 0.0,
 				ignore_alpha: bool = True,
 				deselect: bool = False):
+	if use_bulk_backend(mesh):
+		_select_linked_bulk(mesh, check_corners, threshold, ignore_alpha, deselect)
+		return
+
 	bm = bmesh.from_edit_mesh(mesh)
 
 	active_layer, is_corner_attribute, _ = _parse_color_attribute(bm, mesh.color_attributes.active_color)
@@ -137,16 +167,70 @@ def select_linked(mesh: bpy.types.Mesh,
 	bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
 
 
+def select_color_regions(mesh: bpy.types.Mesh,
+						threshold: float = 0.0,
+						ignore_alpha: bool = True,
+						check_corners: bool = False):
+	'''
+	Selects every color region that contains a selected vertex or face.
+	A region is a set of connected elements where each linked pair differs by at most the threshold.
+	'''
+	is_corner_attribute = mesh.color_attributes.active_color.domain == 'CORNER'
+
+	with bulk_mesh_arrays(mesh) as arrays:
+		labels = _get_color_region_labels(arrays, threshold, ignore_alpha, check_corners)
+		selection = arrays.face_select if is_corner_attribute else arrays.vert_select
+		if not selection.any():
+			raise ContextException("No selection")
+		region_elems = np.flatnonzero(np.isin(labels, labels[selection]) & ~selection)
+
+	bm = bmesh.from_edit_mesh(mesh)
+	elems = bm.faces if is_corner_attribute else bm.verts
+	elems.ensure_lookup_table()
+	for i in region_elems.tolist():
+		elems[i].select = True
+
+	bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
+
+
+def split_color_regions(mesh: bpy.types.Mesh,
+						threshold: float = 0.0,
+						ignore_alpha: bool = True,
+						check_corners: bool = False):
+	'''
+	Splits the edges between faces of different color regions, so that every region becomes a separate island.
+	Requires a face corner color attribute.
+	'''
+	if mesh.color_attributes.active_color.domain != 'CORNER':
+		raise ContextException("Splitting color regions requires a face corner color attribute")
+
+	with bulk_mesh_arrays(mesh) as arrays:
+		labels = _get_color_region_labels(arrays, threshold, ignore_alpha, check_corners)
+
+		# Edges with faces of different regions
+		loop_labels = labels[arrays.loop_faces]
+		edge_min = np.full(len(arrays.edge_verts), len(labels))
+		edge_max = np.full(len(arrays.edge_verts), -1)
+		np.minimum.at(edge_min, arrays.loop_edges, loop_labels)
+		np.maximum.at(edge_max, arrays.loop_edges, loop_labels)
+		border_edges = np.flatnonzero((edge_max >= 0) & (edge_min != edge_max))
+
+	bm = bmesh.from_edit_mesh(mesh)
+	bm.edges.ensure_lookup_table()
+	bmesh.ops.split_edges(bm, edges=[bm.edges[i] for i in border_edges.tolist()])
+
+	bmesh.update_edit_mesh(mesh, loop_triangles=True, destructive=True)
+
+
 def _flood_fill_select_vertex(vert: BMVert, active_layer: BMLayerItem, threshold: float, ignore_alpha: bool, select: bool):
 	color: Vector = vert[active_layer]
 	
 	if ignore_alpha:
 		color = color.to_3d()
 
-	vert_q: queue.Queue[BMVert]= queue.Queue()
-	vert_q.put(vert)
-	while vert_q.qsize() != 0:
-		vert = vert_q.get()
+	vert_q: deque[BMVert] = deque((vert,))
+	while vert_q:
+		vert = vert_q.popleft()
 		for edge in vert.link_edges:
 			other_vert = edge.other_vert(vert)
 			if other_vert.select == select:
@@ -157,7 +241,7 @@ def _flood_fill_select_vertex(vert: BMVert, active_layer: BMLayerItem, threshold
 				other_color = other_color.to_3d()
 			if (other_color - color).length <= threshold:
 				other_vert.select = select
-				vert_q.put(other_vert)
+				vert_q.append(other_vert)
 
 
 def _flood_fill_select_face(face: BMFace, active_layer: BMLayerItem, threshold: float, ignore_alpha: bool, select: bool, check_corners: bool):
@@ -166,24 +250,29 @@ def _flood_fill_select_face(face: BMFace, active_layer: BMLayerItem, threshold:
 	if ignore_alpha:
 		color = color.to_3d()
 
-	face_q: queue.Queue[BMFace] = queue.Queue()
-	face_q.put(face)
-	while face_q.qsize() != 0:
-		face = face_q.get()
+	# Average colors of the faces that were compared already
+	average_colors: dict[BMFace, Vector] = {}
+
+	face_q: deque[BMFace] = deque((face,))
+	while face_q:
+		face = face_q.popleft()
 		if check_corners:
-			other_faces = [f for v in face.verts for f in v.link_faces]
+			other_faces = {f for v in face.verts for f in v.link_faces}
 		else:
 			other_faces = [loop.link_loop_radial_next.face for loop in face.loops if loop.link_loop_radial_next != loop]
 		
 		for other_face in other_faces:
 			if other_face.select == select:
 				continue
-			other_color = _get_average_color(other_face.loops, active_layer)
-			if ignore_alpha:
-				other_color = other_color.to_3d()
+			other_color = average_colors.get(other_face)
+			if other_color is None:
+				other_color = _get_average_color(other_face.loops, active_layer)
+				if ignore_alpha:
+					other_color = other_color.to_3d()
+				average_colors[other_face] = other_color
 			if (other_color - color).length <= threshold:
 				other_face.select = select
-				face_q.put(other_face)
+				face_q.append(other_face)
 
 
 
@@ -191,6 +280,10 @@ def select_similar_color(mesh: bpy.types.Mesh,
 						threshold: float = 0.0,
 						ignore_alpha: bool = True):
 	
+	if use_bulk_backend(mesh):
+		_select_similar_color_bulk(mesh, threshold, ignore_alpha)
+		return
+
 	bm = bmesh.from_edit_mesh(mesh)
 
 	active_layer, is_corner_attribute, _ = _parse_color_attribute(bm, mesh.color_attributes.active_color)
@@ -317,6 +410,10 @@ def _get_selection_colors(mesh: bpy.types.Mesh, ignore_alpha = False) -> tuple[V
 		
 
 def copy_active_color_to_selected(mesh: bpy.types.Mesh):
+	if use_bulk_backend(mesh):
+		_copy_active_color_to_selected_bulk(mesh)
+		return
+
 	bm = bmesh.from_edit_mesh(mesh)
 	
 	active_layer, is_corner_attribute, _ = _parse_color_attribute(bm, mesh.color_attributes.active_color)
@@ -341,23 +438,42 @@ def copy_active_color_to_selected(mesh: bpy.types.Mesh):
 	bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
 
 
-def save_active_color(mesh: bpy.types.Mesh) -> list[Vector]:
+def save_active_color(mesh: bpy.types.Mesh) -> ColorSnapshot:
+	'''
+	Takes a snapshot of the active color attribute.
+	Changes made afterwards have to be reported with `ColorSnapshot.mark_dirty` to be undone by `load_active_color`.
+	'''
+	color_attribute = mesh.color_attributes.active_color
+
+	if use_bulk_backend(mesh, color_attribute):
+		with bulk_mesh_arrays(mesh) as arrays:
+			return ColorSnapshot(color_attribute.name, arrays.read_colors(color_attribute.name))
+
 	bm = bmesh.from_edit_mesh(mesh)
 
-	active_layer, is_corner_attribute, is_byte_color = _parse_color_attribute(bm, mesh.color_attributes.active_color)
+	active_layer, is_corner_attribute, is_byte_color = _parse_color_attribute(bm, color_attribute)
 	
 	if is_corner_attribute:
 		elems = _get_face_loops(bm)		   
 	else:
 		elems = _get_vertices(bm)
 
-	arr = [elem[active_layer].copy() for elem in elems]
+	colors = np.array([elem[active_layer][:] for elem in elems], dtype=np.float32).reshape(-1, 4)
+	return ColorSnapshot(color_attribute.name, colors)
 
-	bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
-	return arr
 
+def load_active_color(mesh: bpy.types.Mesh, saved: ColorSnapshot):
+	'''
+	Restores the elements marked as dirty in the snapshot
+	'''
+	if not saved.is_dirty:
+		return
+
+	if use_bulk_backend(mesh):
+		with bulk_mesh_arrays(mesh) as arrays:
+			saved.restore(arrays)
+		return
 
-def load_active_color(mesh: bpy.types.Mesh, saved: list[Vector]):
 	bm = bmesh.from_edit_mesh(mesh)
 	
 	active_layer, is_corner_attribute, is_byte_color = _parse_color_attribute(bm, mesh.color_attributes.active_color)
@@ -367,8 +483,10 @@ def load_active_color(mesh: bpy.types.Mesh, saved: list[Vector]):
 	else:
 		elems = _get_vertices(bm)
 
-	for i, elem in enumerate(elems):
-		elem[active_layer] = saved[i]
+	start, stop = saved.dirty_start, saved.dirty_stop
+	for elem, color in zip(islice(elems, start, stop), saved.colors[start:stop].tolist()):
+		elem[active_layer] = color
+	saved.clear_dirty()
 
 	bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
 
@@ -463,6 +581,84 @@ def _modify_color_attribute(elem: BMVert | BMLoop,
 	elem[color_layer] = out_col
 
 
+def _modify_color_attributes(elems: list[BMVert] | list[BMLoop],
+						color_layer: BMLayerItem,
+						func: callable,
+						clip_colors: bool,
+						factors: list[float] | np.ndarray,
+						colors: list[Vector] | np.ndarray):
+	'''
+	Batched `_modify_color_attribute` with one factor and color per element.
+	Uses the array blend functions when there are enough elements. Each element must only appear once.
+	'''
+	array_func = ColorUtils.get_array_blend_func(func)
+	if array_func is None or len(elems) < BULK_ELEMENT_THRESHOLD:
+		for elem, factor, color in zip(elems, factors, colors):
+			_modify_color_attribute(elem, color_layer, func, clip_colors, factor, Vector(color))
+		return
+
+	base_colors = np.array([elem[color_layer][:] for elem in elems], dtype=np.float32)
+	out_colors = array_func(factors, base_colors, np.asarray(colors, dtype=np.float32))
+
+	if clip_colors:
+		np.clip(out_colors, 0.0, 1.0, out=out_colors)
+
+	for elem, out_col in zip(elems, out_colors.tolist()):
+		elem[color_layer] = out_col
+
+
+class ColorModifierBatch:
+	'''
+	Collects `_modify_color_attribute` calls and applies them together with `_modify_color_attributes`.
+	Elements that are added several times are modified in the order they were added.
+	Element indices can be collected instead of elements, see `apply` and `apply_to_array`.
+	'''
+
+	def __init__(self, color_layer: BMLayerItem, func: callable, clip_colors: bool):
+		self.color_layer = color_layer
+		self.func = func
+		self.clip_colors = clip_colors
+		self._rounds: list[tuple[list, list, list]] = []
+		self._counts: dict[BMVert | BMLoop, int] = {}
+
+	def add(self, elem: BMVert | BMLoop, factor: float, color: Vector):
+		count = self._counts.get(elem, 0)
+		self._counts[elem] = count + 1
+		if count == len(self._rounds):
+			self._rounds.append(([], [], []))
+
+		elems, factors, colors = self._rounds[count]
+		elems.append(elem)
+		factors.append(factor)
+		colors.append(color[:])
+
+	@property
+	def indices(self) -> np.ndarray:
+		'''
+		Collected element indices, each once. Only valid before the batch is applied.
+		'''
+		return np.fromiter(self._counts.keys(), dtype=np.int64, count=len(self._counts))
+
+	def apply(self, resolve_elem: callable = None):
+		'''
+		Modifies the collected elements. `resolve_elem` maps collected indices to their elements.
+		'''
+		for elems, factors, colors in self._rounds:
+			if resolve_elem:
+				elems = [resolve_elem(elem) for elem in elems]
+			_modify_color_attributes(elems, self.color_layer, self.func, self.clip_colors, factors, colors)
+		self._rounds.clear()
+		self._counts.clear()
+
+	def apply_to_array(self, colors: np.ndarray):
+		'''
+		Modifies a (N,4) color array in place, the collected elements must be indices into it
+		'''
+		for elems, factors, blend_colors in self._rounds:
+			indices = np.array(elems, dtype=np.int64)
+			colors[indices] = _blend_colors_array(self.func, np.array(factors), colors[indices], np.array(blend_colors), self.clip_colors)
+		self._rounds.clear()
+		self._counts.clear()
 
 
 def set_selection_color(mesh: bpy.types.Mesh,
@@ -480,6 +676,10 @@ def set_selection_color(mesh: bpy.types.Mesh,
 	if is_byte_color:
 		vec_col[:3] = [ColorUtils.linear_to_srgb(x) for x in color[:3]]
 
+	if use_bulk_backend(mesh):
+		_set_selection_color_bulk(mesh, active_corner_only, blend_func, factor, vec_col, clip_colors)
+		return
+
 	if is_corner_attribute:
 		if active_corner_only:
 			active = _get_active_vertex(bm)
@@ -489,11 +689,11 @@ def set_selection_color(mesh: bpy.types.Mesh,
 		else:
 			elems = []
 
-			face_verts = []
+			face_verts: set[BMVert] = set()
 			for face in bm.faces:
 				if face.select:
 					elems += face.loops
-					face_verts += face.verts
+					face_verts.update(face.verts)
 
 			elems += [loop for vert in bm.verts if vert.select and vert not in face_verts for loop in vert.link_loops]
 	else:
@@ -543,4 +743,218 @@ def get_active_corner_color(mesh: bpy.types.Mesh):
 
 	average_color = active_loop[active_layer].copy()
 
-	return average_color
\ No newline at end of file
+	return average_color
+
+
+""" Bulk (numpy) backend """
+
+def _blend_colors_array(blend_func: callable,
+						factor: float | np.ndarray,
+						colors: np.ndarray,
+						blend_colors: np.ndarray,
+						clip_colors: bool) -> np.ndarray:
+	'''
+	Array counterpart of `_modify_color_attribute`.
+	`factor` and `blend_colors` can be a single value or one value per element.
+	'''
+	blend_colors = np.broadcast_to(blend_colors, colors.shape)
+
+	if array_func := ColorUtils.get_array_blend_func(blend_func):
+		out_colors = array_func(factor, colors, blend_colors).astype(np.float32)
+	else:
+		factors = np.broadcast_to(factor, len(colors)).tolist()
+		out_colors = np.array([blend_func(fac, Vector(col), Vector(blend_col))[:] for fac, col, blend_col in zip(factors, colors, blend_colors)],
+							dtype=np.float32).reshape(-1, 4)
+
+	if clip_colors:
+		np.clip(out_colors, 0.0, 1.0, out=out_colors)
+
+	return out_colors
+
+
+def _copy_active_color_to_selected_bulk(mesh: bpy.types.Mesh):
+	color_attribute = mesh.color_attributes.active_color
+	is_corner_attribute = color_attribute.domain == 'CORNER'
+	name = color_attribute.name
+
+	with bulk_mesh_arrays(mesh) as arrays:
+		selection = get_selection_indices(arrays)
+		active_indices = selection.get(is_corner_attribute, FilterType.ACTIVE)
+		if len(active_indices) == 0:
+			if is_corner_attribute:
+				raise ContextException("Active element has to be a face when color attribute domain is 'Face Corner'")
+			raise ContextException("No active element found")
+
+		colors = arrays.read_colors(name)
+		colors[selection.get(is_corner_attribute, FilterType.SELECTED)] = colors[active_indices].mean(axis=0)
+		arrays.write_colors(name, colors)
+
+
+def _set_selection_color_bulk(mesh: bpy.types.Mesh,
+							active_corner_only: bool,
+							blend_func: callable,
+							factor: float,
+							color: Vector,
+							clip_colors: bool) -> None:
+	color_attribute = mesh.color_attributes.active_color
+	is_corner_attribute = color_attribute.domain == 'CORNER'
+	name = color_attribute.name
+
+	with bulk_mesh_arrays(mesh) as arrays:
+		selection = get_selection_indices(arrays)
+		if active_corner_only:
+			if arrays.active_vert < 0:
+				raise ContextException("No active vertex found")
+			indices = selection.get(is_corner_attribute, FilterType.ACTIVE_VERTEX)
+		elif is_corner_attribute:
+			indices = selection.selection_corners
+		else:
+			indices = selection.get(is_corner_attribute, FilterType.SELECTED)
+
+		colors = arrays.read_colors(name)
+		colors[indices] = _blend_colors_array(blend_func, factor, colors[indices], np.array(color, dtype=np.float32), clip_colors)
+		arrays.write_colors(name, colors)
+
+
+def _select_linked_bulk(mesh: bpy.types.Mesh,
+						check_corners: bool,
+						threshold: float,
+						ignore_alpha: bool,
+						deselect: bool):
+	is_corner_attribute = mesh.color_attributes.active_color.domain == 'CORNER'
+	select = not deselect
+
+	with bulk_mesh_arrays(mesh) as arrays:
+		if is_corner_attribute:
+			if arrays.active_face < 0:
+				raise ContextException("No active face")
+			seed = arrays.active_face
+			selection = arrays.face_select
+		else:
+			if arrays.active_vert < 0:
+				raise ContextException("No active vertex")
+			seed = arrays.active_vert
+			selection = arrays.vert_select
+
+		colors, adjacency = _get_color_graph(arrays, ignore_alpha, check_corners)
+
+		# Elements already in the target selection state are not crossed, like in the BMesh flood fill
+		distances = np.linalg.norm(colors - colors[seed], axis=1)
+		reached = flood_fill(adjacency, seed, (distances <= threshold) & (selection != select))
+
+	bm = bmesh.from_edit_mesh(mesh)
+	elems = bm.faces if is_corner_attribute else bm.verts
+	elems.ensure_lookup_table()
+	for i in reached.tolist():
+		elems[i].select = select
+
+	bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
+
+
+def _get_color_graph(arrays: MeshArrays, ignore_alpha: bool, check_corners: bool) -> tuple[np.ndarray, CSRAdjacency]:
+	'''
+	Returns the colors of the elements used for color region operations and their adjacency.
+	These are faces with their average corner colors for face corner attributes, and vertices otherwise.
+	'''
+	color_attribute = arrays.mesh.color_attributes.active_color
+	colors = arrays.read_colors(color_attribute.name)
+	if color_attribute.domain == 'CORNER':
+		colors = arrays.face_averages(colors)
+		adjacency = face_adjacency(arrays, check_corners)
+	else:
+		adjacency = vertex_adjacency(arrays)
+
+	if ignore_alpha:
+		colors = colors[:, :3]
+	return colors, adjacency
+
+
+def _get_color_region_labels(arrays: MeshArrays, threshold: float, ignore_alpha: bool, check_corners: bool) -> np.ndarray:
+	colors, adjacency = _get_color_graph(arrays, ignore_alpha, check_corners)
+	a, b = adjacency.pairs()
+	similar = np.linalg.norm(colors[a] - colors[b], axis=1) <= threshold
+	return connected_labels(len(colors), a[similar], b[similar])
+
+
+def _select_similar_color_bulk(mesh: bpy.types.Mesh, threshold: float, ignore_alpha: bool):
+	is_corner_attribute = mesh.color_attributes.active_color.domain == 'CORNER'
+	selection_colors, selection_type = _get_selection_colors(mesh, ignore_alpha)
+	selection_colors = np.array([color[:] for color in selection_colors] if selection_type else selection_colors[:])
+
+	with bulk_mesh_arrays(mesh) as arrays:
+		colors = arrays.read_colors(mesh.color_attributes.active_color.name)
+		if ignore_alpha:
+			colors = colors[:, :3]
+
+		if selection_type == BMVert:
+			# Vertices with the same number of face corners, matched against the corners of the selected vertex
+			vert_count = len(arrays.coords)
+			candidates, candidate_loops = _group_loops(arrays.loop_verts, vert_count, len(selection_colors))
+			candidate_colors = colors[candidate_loops]
+			elem_type = BMVert
+
+		elif selection_type == BMEdge:
+			# Edges with half as many face corners, each corner is matched twice like the BMesh implementation does
+			edge_count = len(arrays.edge_verts)
+			candidates, candidate_loops = _group_loops(arrays.loop_edges, edge_count, len(selection_colors) // 2)
+			candidate_colors = np.concatenate((colors[candidate_loops], colors[candidate_loops[:, ::-1]]), axis=1)
+			elem_type = BMEdge
+
+		else:
+			# Average colors of faces or vertex colors
+			if is_corner_attribute:
+				colors = arrays.face_averages(colors)
+			distances = np.linalg.norm(colors - selection_colors, axis=1) * 0.5
+			candidates = np.flatnonzero(distances <= threshold)
+			elem_type = BMFace if is_corner_attribute else BMVert
+
+		if selection_type:
+			# The distance of the means is at most twice the average matched distance,
+			# which rules out most candidates before the matching
+			mean_distances = np.linalg.norm(candidate_colors.mean(axis=1) - selection_colors.mean(axis=0), axis=1)
+			close = mean_distances <= threshold * 2 + 1e-6
+			candidates = candidates[close]
+			distances = _greedy_match_distances(candidate_colors[close], selection_colors)
+			candidates = candidates[distances <= threshold]
+
+	bm = bmesh.from_edit_mesh(mesh)
+	if elem_type is BMVert:
+		elems = bm.verts
+	elif elem_type is BMEdge:
+		elems = bm.edges
+	else:
+		elems = bm.faces
+	elems.ensure_lookup_table()
+	for i in candidates.tolist():
+		elems[i].select = True
+
+	bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
+
+
+def _group_loops(loop_keys: np.ndarray, key_count: int, group_size: int) -> tuple[np.ndarray, np.ndarray]:
+	'''
+	Returns the keys (vertex or edge indices) that have exactly `group_size` face corners,
+	and a (N, group_size) array with the indices of those face corners
+	'''
+	counts = np.bincount(loop_keys, minlength=key_count)
+	keys = np.flatnonzero(counts == group_size)
+	order = np.argsort(loop_keys, kind='stable')
+	starts = np.cumsum(counts) - counts
+	return keys, order[starts[keys][:, np.newaxis] + np.arange(group_size)]
+
+
+def _greedy_match_distances(candidate_colors: np.ndarray, selection_colors: np.ndarray) -> np.ndarray:
+	'''
+	Matches each selection color to the closest remaining color of every candidate in order,
+	the same as the greedy matching of `select_similar_color`. Returns the average matched distance per candidate.
+	'''
+	rows = np.arange(len(candidate_colors))
+	remaining = np.ones(candidate_colors.shape[:2], dtype=bool)
+	total_distances = np.zeros(len(candidate_colors))
+	for s_color in selection_colors:
+		distances = np.linalg.norm(candidate_colors - s_color, axis=2) * 0.5
+		distances[~remaining] = np.inf
+		closest = np.argmin(distances, axis=1)
+		total_distances += distances[rows, closest]
+		remaining[rows, closest] = False
+	return total_distances / max(len(selection_colors), 1)
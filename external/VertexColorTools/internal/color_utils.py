@@ -18,6 +18,7 @@
 from bl_math import clamp
 from functools import partial
 from mathutils import Vector, Matrix
+import numpy as np
 
 
 
@@ -365,17 +366,15 @@ def rgb_to_hsl(rgba: Vector) -> Vector:
 
 """ Interpolation types """
 
-def hue_interp(intp_type: int, fac: float, h1: float, h2: float) -> float:
-	m_fac = 1.0 - fac
+def _hue_mod(h: float) -> float:
+	return h if (h < 1.0) else (h - 1.0)
 
-	def HUE_INTERP(h_a, h_b):
-		return (m_fac * h_a) + (fac * h_b)
-	
-	def HUE_MOD(h):
-		return h if (h < 1.0) else (h - 1.0)
-	
-	h1 = HUE_MOD(h1)
-	h2 = HUE_MOD(h2)
+
+def _hue_interp_mode(intp_type: int, h1: float, h2: float) -> int:
+	'''
+	Which endpoint hue to wrap for the interpolation: 0 = none, 1 = first, 2 = second.
+	Only depends on the endpoints, not on the interpolation factor.
+	'''
 	mode = 0
 	if intp_type == _HUE_INTP_NEAR:
 		if ((h1 < h2) and (h2 - h1) > +0.5):
@@ -409,6 +408,21 @@ def hue_interp(intp_type: int, fac: float, h1: float, h2: float) -> float:
 		else:
 			mode = 0
 
+	return mode
+
+
+def hue_interp(intp_type: int, fac: float, h1: float, h2: float) -> float:
+	m_fac = 1.0 - fac
+
+	def HUE_INTERP(h_a, h_b):
+		return (m_fac * h_a) + (fac * h_b)
+	
+	HUE_MOD = _hue_mod
+	
+	h1 = HUE_MOD(h1)
+	h2 = HUE_MOD(h2)
+	mode = _hue_interp_mode(intp_type, h1, h2)
+
 	hue = 0
 	match (mode):
 		case 0:
@@ -506,6 +520,340 @@ def mix_oklab_smoothstep(fac: float, col1: Vector, col2: Vector) -> Vector:
 
 
 
+""" Array blending functions
+
+Counterparts of the blending functions above operating on many colors at once.
+`fac` is a scalar or an array of N factors, `col1` and `col2` are (N,4) arrays.
+"""
+
+def _fac_column(fac) -> np.ndarray:
+	return np.asarray(fac, dtype=np.float64).reshape(-1, 1)
+
+
+def blend_mix_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1 + (col2 - col1) * _fac_column(fac)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_add_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1 + col2 * _fac_column(fac)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_multiply_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1 + (col1 * col2 - col1) * _fac_column(fac)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_screen_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	fac = _fac_column(fac)
+	outcol = 1.0 - ((1.0 - fac) + fac * (1.0 - col2)) * (1.0 - col1)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_overlay_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	fac = _fac_column(fac)
+	facm = 1.0 - fac
+	rgb1 = col1[:, :3]
+	rgb2 = col2[:, :3]
+	outcol = col1.copy()
+	outcol[:, :3] = np.where(rgb1 < 0.5,
+		rgb1 * (facm + 2.0 * fac * rgb2),
+		1.0 - (facm + 2.0 * fac * (1.0 - rgb2)) * (1.0 - rgb1))
+	return outcol
+
+
+def blend_subtract_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1 - col2 * _fac_column(fac)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_divide_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	fac = _fac_column(fac)
+	rgb1 = col1[:, :3]
+	rgb2 = col2[:, :3]
+	quotient = np.divide(rgb1, rgb2, out=np.zeros_like(rgb1), where=rgb2 != 0.0)
+	outcol = col1.copy()
+	outcol[:, :3] = np.where(rgb2 != 0.0, (1.0 - fac) * rgb1 + fac * quotient, rgb1)
+	return outcol
+
+
+def blend_difference_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1 + (np.abs(col1 - col2) - col1) * _fac_column(fac)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_exclusion_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1 + ((col1 + col2 - 2.0 * col1 * col2) - col1) * _fac_column(fac)
+	np.maximum(outcol, 0.0, out=outcol)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_darken_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1 + (np.minimum(col1, col2) - col1) * _fac_column(fac)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_lighten_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1 + (np.maximum(col1, col2) - col1) * _fac_column(fac)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_dodge_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	rgb1 = col1[:, :3]
+	tmp = 1.0 - _fac_column(fac) * col2[:, :3]
+	quotient = np.divide(rgb1, tmp, out=np.ones_like(rgb1), where=tmp > 0.0)
+	outcol = col1.copy()
+	outcol[:, :3] = np.where(rgb1 != 0.0, np.minimum(quotient, 1.0), rgb1)
+	return outcol
+
+
+def blend_burn_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	fac = _fac_column(fac)
+	tmp = (1.0 - fac) + fac * col2[:, :3]
+	quotient = np.divide(1.0 - col1[:, :3], tmp, out=np.ones_like(tmp), where=tmp > 0.0)
+	outcol = col1.copy()
+	outcol[:, :3] = np.clip(np.where(tmp > 0.0, 1.0 - quotient, 0.0), 0.0, 1.0)
+	return outcol
+
+
+def blend_hue_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	hsv2 = rgb_to_hsv_array(col2)
+	hsv = rgb_to_hsv_array(col1)
+	hsv[:, 0] = hsv2[:, 0]
+	outcol = col1 + (hsv_to_rgb_array(hsv) - col1) * _fac_column(fac)
+	outcol[:, 3] = col1[:, 3]
+	return np.where((hsv2[:, 1] != 0.0)[:, None], outcol, col1)
+
+
+def blend_saturation_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	fac = _fac_column(fac)[:, 0]
+	hsv = rgb_to_hsv_array(col1)
+	hsv2 = rgb_to_hsv_array(col2)
+	has_saturation = hsv[:, 1] != 0.0
+	hsv[:, 1] = (1.0 - fac) * hsv[:, 1] + fac * hsv2[:, 1]
+	return np.where(has_saturation[:, None], hsv_to_rgb_array(hsv), col1)
+
+
+def blend_value_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	fac = _fac_column(fac)[:, 0]
+	hsv = rgb_to_hsv_array(col1)
+	hsv2 = rgb_to_hsv_array(col2)
+	hsv[:, 2] = (1.0 - fac) * hsv[:, 2] + fac * hsv2[:, 2]
+	return hsv_to_rgb_array(hsv)
+
+
+def blend_color_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	hsv2 = rgb_to_hsv_array(col2)
+	hsv = rgb_to_hsv_array(col1)
+	hsv[:, :2] = hsv2[:, :2]
+	outcol = col1 + (hsv_to_rgb_array(hsv) - col1) * _fac_column(fac)
+	outcol[:, 3] = col1[:, 3]
+	return np.where((hsv2[:, 1] != 0.0)[:, None], outcol, col1)
+
+
+def blend_soft_light_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	fac = _fac_column(fac)
+	scr = 1.0 - (1.0 - col2) * (1.0 - col1)
+	outcol = (1.0 - fac) * col1 + fac * ((1.0 - col1) * col2 * col1 + col1 * scr)
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_linear_light_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1 + _fac_column(fac) * (2.0 * (col2 - 0.5))
+	outcol[:, 3] = col1[:, 3]
+	return outcol
+
+
+def blend_alpha_add_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1.copy()
+	outcol[:, 3] = col1[:, 3] + _fac_column(fac)[:, 0] * col2[:, 3]
+	return outcol
+
+
+def blend_alpha_subtract_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1.copy()
+	outcol[:, 3] = col1[:, 3] - _fac_column(fac)[:, 0] * col2[:, 3]
+	return outcol
+
+
+def blend_alpha_mix_array(fac, col1: np.ndarray, col2: np.ndarray) -> np.ndarray:
+	outcol = col1.copy()
+	outcol[:, 3] = col1[:, 3] + _fac_column(fac)[:, 0] * (col2[:, 3] - col1[:, 3])
+	return outcol
+
+
+def hsv_to_rgb_array(hsva: np.ndarray) -> np.ndarray:
+	h, s, v = hsva[:, 0], hsva[:, 1:2], hsva[:, 2:3]
+	n = np.empty((len(hsva), 3), dtype=hsva.dtype)
+	n[:, 0] = np.abs(h * 6.0 - 3.0) - 1.0
+	n[:, 1] = 2.0 - np.abs(h * 6.0 - 2.0)
+	n[:, 2] = 2.0 - np.abs(h * 6.0 - 4.0)
+	np.clip(n, 0.0, 1.0, out=n)
+
+	rgba = np.empty_like(hsva)
+	rgba[:, :3] = ((n - 1.0) * s + 1.0) * v
+	rgba[:, 3] = hsva[:, 3]
+	return rgba
+
+
+def rgb_to_hsv_array(rgba: np.ndarray) -> np.ndarray:
+	r, g, b = rgba[:, 0], rgba[:, 1], rgba[:, 2]
+
+	swap = g < b
+	g, b = np.where(swap, b, g), np.where(swap, g, b)
+	k = np.where(swap, -1.0, 0.0)
+
+	min_gb = b
+	swap = r < g
+	r, g = np.where(swap, g, r), np.where(swap, r, g)
+	k = np.where(swap, -2.0 / 6.0 - k, k)
+	min_gb = np.where(swap, np.minimum(g, b), min_gb)
+
+	chroma = r - min_gb
+
+	hsva = np.empty_like(rgba)
+	hsva[:, 0] = np.abs(k + (g - b) / (6.0 * chroma + 1e-20))
+	hsva[:, 1] = chroma / (r + 1e-20)
+	hsva[:, 2] = r
+	hsva[:, 3] = rgba[:, 3]
+	return hsva
+
+
+
+def hsl_to_rgb_array(hsla: np.ndarray) -> np.ndarray:
+	h, s, l = hsla[:, 0], hsla[:, 1:2], hsla[:, 2:3]
+	n = np.empty((len(hsla), 3), dtype=hsla.dtype)
+	n[:, 0] = np.abs(h * 6.0 - 3.0) - 1.0
+	n[:, 1] = 2.0 - np.abs(h * 6.0 - 2.0)
+	n[:, 2] = 2.0 - np.abs(h * 6.0 - 4.0)
+	np.clip(n, 0.0, 1.0, out=n)
+
+	chroma = (1.0 - np.abs(2.0 * l - 1.0)) * s
+
+	rgba = np.empty_like(hsla)
+	rgba[:, :3] = (n - 0.5) * chroma + l
+	rgba[:, 3] = hsla[:, 3]
+	return rgba
+
+
+""" Array interpolation functions
+
+Counterparts of the interpolation functions taking an array of N factors and returning (N,4) colors.
+The two endpoint colors are converted only once per call.
+"""
+
+def _smoothstep_array(fac: np.ndarray) -> np.ndarray:
+	fac2 = fac * fac
+	return 3 * fac2 - 2 * fac2 * fac
+
+
+def _lerp_array(fac: np.ndarray, col1, col2) -> np.ndarray:
+	col1 = np.asarray(col1[:], dtype=np.float64)
+	col2 = np.asarray(col2[:], dtype=np.float64)
+	return col1 + np.outer(fac, col2 - col1)
+
+
+def _hue_interp_array(intp_type: int, fac: np.ndarray, h1: float, h2: float) -> np.ndarray:
+	h1 = _hue_mod(h1)
+	h2 = _hue_mod(h2)
+	match _hue_interp_mode(intp_type, h1, h2):
+		case 1:
+			h1 += 1.0
+		case 2:
+			h2 += 1.0
+		case _:
+			return (1.0 - fac) * h1 + fac * h2
+	hue = (1.0 - fac) * h1 + fac * h2
+	return np.where(hue < 1.0, hue, hue - 1.0)
+
+
+def mix_rgb_array(fac: np.ndarray, col1: Vector, col2: Vector) -> np.ndarray:
+	return _lerp_array(fac, col1, col2)
+
+
+def mix_rgb_smoothstep_array(fac: np.ndarray, col1: Vector, col2: Vector) -> np.ndarray:
+	return _lerp_array(_smoothstep_array(fac), col1, col2)
+
+
+def mix_hsv_array(intp_type: int, fac: np.ndarray, col1: Vector, col2: Vector) -> np.ndarray:
+	hsv_col1 = rgb_to_hsv(col1)
+	hsv_col2 = rgb_to_hsv(col2)
+
+	mixed_hsv = _lerp_array(fac, hsv_col1, hsv_col2)
+	mixed_hsv[:, 0] = _hue_interp_array(intp_type, fac, hsv_col1[0], hsv_col2[0])
+
+	return hsv_to_rgb_array(mixed_hsv)
+
+
+def mix_hsl_array(intp_type: int, fac: np.ndarray, col1: Vector, col2: Vector) -> np.ndarray:
+	hsl_col1 = rgb_to_hsl(col1)
+	hsl_col2 = rgb_to_hsl(col2)
+
+	mixed_hsl = _lerp_array(fac, hsl_col1, hsl_col2)
+	mixed_hsl[:, 0] = _hue_interp_array(intp_type, fac, hsl_col1[0], hsl_col2[0])
+
+	return hsl_to_rgb_array(mixed_hsl)
+
+
+def _matrix_to_array(matrix: Matrix) -> np.ndarray:
+	# Column j is the matrix applied to the j-th basis vector
+	return np.array([(matrix @ Vector(axis))[:] for axis in ((1, 0, 0), (0, 1, 0), (0, 0, 1))]).T
+
+
+_CONE_TO_RGB_ARRAY = _matrix_to_array(CONE_TO_RGB)
+
+
+def mix_oklab_array(fac: np.ndarray, col1: Vector, col2: Vector) -> np.ndarray:
+	lms1 = np.cbrt(np.asarray((RGB_TO_CONE @ col1.xyz)[:]))
+	lms2 = np.cbrt(np.asarray((RGB_TO_CONE @ col2.xyz)[:]))
+
+	lms_mix = lms1 + np.outer(fac, lms2 - lms1)
+
+	outcol = np.empty((len(lms_mix), 4))
+	outcol[:, :3] = (lms_mix * lms_mix * lms_mix) @ _CONE_TO_RGB_ARRAY.T
+	outcol[:, 3] = col1.w
+	return outcol
+
+
+def mix_oklab_smoothstep_array(fac: np.ndarray, col1: Vector, col2: Vector) -> np.ndarray:
+	return mix_oklab_array(_smoothstep_array(fac), col1, col2)
+
+
+# Default size of the quantized weight lookup table used by `interp_colors`
+INTERP_LUT_SIZE = 4096
+
+
+def interp_colors(interp_func: callable, weights: np.ndarray, col1: Vector, col2: Vector, lut_size: int = 0) -> np.ndarray:
+	'''
+	Interpolates between two colors for every weight with one of the functions from the interpolation mode tables.
+	When `lut_size` is set, the weights (expected to be in [0, 1]) are quantized into a lookup table of that
+	many steps, which makes every color mode as cheap as RGB for large arrays.
+	Returns a (N,4) array.
+	'''
+	weights = np.asarray(weights, dtype=np.float64)
+	array_func = get_array_interp_func(interp_func)
+	if array_func is None:
+		return np.array([interp_func(weight, col1, col2)[:] for weight in weights.tolist()]).reshape(-1, 4)
+
+	if lut_size and len(weights) > lut_size:
+		table = array_func(np.linspace(0.0, 1.0, lut_size), col1, col2)
+		indices = np.rint(np.clip(weights, 0.0, 1.0) * (lut_size - 1)).astype(np.int32)
+		return table[indices]
+
+	return array_func(weights, col1, col2)
+
+
 """ Blend type enum """
 BLEND_MODES = {
 	'ALPHA_ADD'		: (blend_alpha_add,			"Add Alpha",		"Add to the alpha channel. Only alpha channel values are used"),
@@ -532,6 +880,40 @@ BLEND_MODES = {
 	'MIX'			: (blend_mix,				"Mix",				""),
 }
 
+""" Array blend functions, keyed like BLEND_MODES """
+BLEND_MODES_ARRAY = {
+	'ALPHA_ADD'		: blend_alpha_add_array,
+	'ALPHA_MIX'		: blend_alpha_mix_array,
+	'ALPHA_SUBTRACT': blend_alpha_subtract_array,
+	'VALUE'			: blend_value_array,
+	'COLOR'			: blend_color_array,
+	'SATURATION'	: blend_saturation_array,
+	'HUE'			: blend_hue_array,
+	'DIVIDE'		: blend_divide_array,
+	'SUBTRACT'		: blend_subtract_array,
+	'EXCLUSION'		: blend_exclusion_array,
+	'DIFFERENCE'	: blend_difference_array,
+	'LINEAR_LIGHT'	: blend_linear_light_array,
+	'SOFT_LIGHT'	: blend_soft_light_array,
+	'OVERLAY'		: blend_overlay_array,
+	'ADD'			: blend_add_array,
+	'COLOR_DODGE'	: blend_dodge_array,
+	'SCREEN'		: blend_screen_array,
+	'LIGHTEN'		: blend_lighten_array,
+	'COLOR_BURN'	: blend_burn_array,
+	'MULTIPLY'		: blend_multiply_array,
+	'DARKEN'		: blend_darken_array,
+	'MIX'			: blend_mix_array,
+}
+
+_BLEND_FUNC_TO_ARRAY = {BLEND_MODES[mode][0]: BLEND_MODES_ARRAY[mode] for mode in BLEND_MODES}
+
+def get_array_blend_func(blend_func: callable) -> callable:
+	'''
+	Returns the array counterpart of a blend function from BLEND_MODES, or None if there is none
+	'''
+	return _BLEND_FUNC_TO_ARRAY.get(blend_func)
+
 RGB_INTP_MODES = {
 	'LINEAR'	: (mix_rgb,				"Linear",	"Linear interpolation"),
 	'EASE'		: (mix_rgb_smoothstep,	"Ease",		"Smoothstep interpolation"),
@@ -557,6 +939,47 @@ HSL_INPT_MODES = {
 	'CCW'	: (partial(mix_hsl, _HUE_INTP_CCW),		"Counter-Clockwise",	""),
 }
 
+""" Array interpolation functions, keyed like the interpolation mode tables """
+RGB_INTP_MODES_ARRAY = {
+	'LINEAR'	: mix_rgb_array,
+	'EASE'		: mix_rgb_smoothstep_array,
+}
+
+OKLAB_INTP_MODES_ARRAY = {
+	'LINEAR'	: mix_oklab_array,
+	'EASE'		: mix_oklab_smoothstep_array,
+}
+
+HSV_INPT_MODES_ARRAY = {
+	'NEAR' 	: partial(mix_hsv_array, _HUE_INTP_NEAR),
+	'FAR'	: partial(mix_hsv_array, _HUE_INTP_FAR),
+	'CW'	: partial(mix_hsv_array, _HUE_INTP_CW),
+	'CCW'	: partial(mix_hsv_array, _HUE_INTP_CCW),
+}
+
+HSL_INPT_MODES_ARRAY = {
+	'NEAR' 	: partial(mix_hsl_array, _HUE_INTP_NEAR),
+	'FAR'	: partial(mix_hsl_array, _HUE_INTP_FAR),
+	'CW'	: partial(mix_hsl_array, _HUE_INTP_CW),
+	'CCW'	: partial(mix_hsl_array, _HUE_INTP_CCW),
+}
+
+_INTERP_FUNC_TO_ARRAY = {
+	modes[mode][0]: array_modes[mode]
+	for modes, array_modes in (
+		(RGB_INTP_MODES, RGB_INTP_MODES_ARRAY),
+		(OKLAB_INTP_MODES, OKLAB_INTP_MODES_ARRAY),
+		(HSV_INPT_MODES, HSV_INPT_MODES_ARRAY),
+		(HSL_INPT_MODES, HSL_INPT_MODES_ARRAY))
+	for mode in modes
+}
+
+def get_array_interp_func(interp_func: callable) -> callable:
+	'''
+	Returns the array counterpart of a function from the interpolation mode tables, or None if there is none
+	'''
+	return _INTERP_FUNC_TO_ARRAY.get(interp_func)
+
 """ Enum property items for ui elements """
 INPT_MODE_ITEMS = (
 	('RGB', "RGB",		"Interpolate in linear RGB color space"),
@@ -5,9 +5,11 @@ import bmesh
 from bmesh.types import BMFace, BMLoop, BMFaceSeq
 from mathutils import Vector, Color, geometry
 from bl_math import clamp
+import numpy as np
 
 from . import color_utils as ColorUtils
-from .color_attribute import _parse_color_attribute
+from .color_attribute import _parse_color_attribute, _modify_color_attributes, _blend_colors_array
+from .color_array import MeshArrays, ColorSnapshot
 
 from enum import Enum
 
@@ -37,8 +39,13 @@ def paint_gradient(mesh: bpy.types.Mesh,
 				clip_colors: bool,
 				factor: tuple[float,float],
 				color: tuple[Color,Color],
-				line: tuple[Vector,Vector]) -> None:
-	
+				line: tuple[Vector,Vector],
+				preview_step: int = 1) -> np.ndarray:
+	'''
+	Paints a linear or radial gradient into the active color attribute.
+	With a `preview_step` above 1 only every n-th element is painted, for fast previews.
+	Returns the indices of the painted vertices or face corners.
+	'''
 	bm = bmesh.from_edit_mesh(mesh)
 	active_layer, is_corner_attribute, is_byte_color = _parse_color_attribute(bm, mesh.color_attributes.active_color)
 
@@ -54,7 +61,7 @@ def paint_gradient(mesh: bpy.types.Mesh,
 	line_dir = (l1 - l0)
 	radius = line_dir.length
 	if radius == 0:
-		return
+		return np.empty(0, dtype=np.int64)
 	
 	line_dir /= radius
 	
@@ -92,9 +99,8 @@ def paint_gradient(mesh: bpy.types.Mesh,
 				co_v = vert.co
 				match gradient_type:
 					case GradientType.LINEAR:
-						_, dist0 = geometry.intersect_point_line(co_v, l0, l1)
-						_, dist1 = geometry.intersect_point_line(co_v, l0, l1)
-						if dist0 < 0 or dist1 > 1:
+						_, dist = geometry.intersect_point_line(co_v, l0, l1)
+						if dist < 0 or dist > 1:
 							continue
 					case GradientType.RADIAL:
 						if (l0 - co_v).length_squared > radius_squared:
@@ -102,13 +108,17 @@ def paint_gradient(mesh: bpy.types.Mesh,
 				elems.append(vert)
 				coords.append(vert.co)
 	
+	if preview_step > 1:
+		elems = list(elems)[::preview_step]
+		coords = list(coords)[::preview_step]
+
 	# Precompute these for interpolation
 	factor_a = factor[0]
 	factor_b = (factor[1] - factor[0])
 
 	# Iterate over loops / verts
-	for i, elem in enumerate(elems):
-		co_v = coords[i]
+	weights = np.empty(len(coords))
+	for i, co_v in enumerate(coords):
 		# Calculate gradient weight for this vertex
 		weight = 0
 		match gradient_type:
@@ -118,22 +128,30 @@ def paint_gradient(mesh: bpy.types.Mesh,
 			case GradientType.RADIAL:
 				weight = (co_v - l0).length / radius
 
-		weight = clamp(weight)
+		weights[i] = clamp(weight)
 
-		# Get the color and factor from the blend function
-		blend_fac = (factor_a + weight * factor_b)
+	# Get the colors and factors for all elements at once
+	blend_facs = factor_a + weights * factor_b
+	blend_cols = ColorUtils.interp_colors(interp_func, weights, col0, col1, ColorUtils.INTERP_LUT_SIZE)
 
-		blend_col = interp_func(weight, col0, col1)
-		out_col = blend_func(blend_fac, elem[active_layer], blend_col)
-
-		if clip_colors:
-			out_col[:] = [clamp(x, 0.0, 1.0) for x in out_col[:]]
-			
-		# Assign
-		elem[active_layer] = out_col
+	# Blend and assign
+	_modify_color_attributes(elems, active_layer, blend_func, clip_colors, blend_facs, blend_cols)
 
 	bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
 
+	return _element_indices(bm, elems, is_corner_attribute)
+
+
+def _element_indices(bm: bmesh.types.BMesh, elems: list, is_corner_attribute: bool) -> np.ndarray:
+	'''
+	Indices of the vertices or face corners, corners are numbered in face order like the mesh loops
+	'''
+	if not is_corner_attribute:
+		bm.verts.index_update()
+		return np.fromiter((vert.index for vert in elems), dtype=np.int64, count=len(elems))
+	loop_indices = {loop: i for i, loop in enumerate(loop for face in bm.faces for loop in face.loops)}
+	return np.fromiter((loop_indices[loop] for loop in elems), dtype=np.int64, count=len(elems))
+
 	
 
 def _filter_loops_from_faces(faces: list[BMFace] | BMFaceSeq,
@@ -264,4 +282,254 @@ def _distance_to_radius(co: Vector, center: Vector, radius_sqrt: float):
 	return 0 if abs(dist) < 0.0001 else dist
 
 
+""" Array implementation """
+
+class GradientEngine:
+	'''
+	Array implementation of `paint_gradient` for interactive painting on large meshes.
+	Edit mode is left once by `begin` and entered again by `end`, every `paint` in between repaints the
+	gradient over the colors read by `begin` with a single bulk write. The painted elements are marked in
+	the snapshot of those colors, so `restore` only writes when something was painted. The vertex coordinates and face
+	corner indices are read on the first `paint` and reused afterwards, so an engine is only valid as
+	long as the topology and the selection of the mesh do not change.
+	'''
+
+	def __init__(self, mesh: bpy.types.Mesh):
+		self.mesh = mesh
+		self.arrays = MeshArrays(mesh)
+		self._base_colors: ColorSnapshot = None
+		self._attribute_name: str = None
+		self._loop_prev_verts: np.ndarray = None
+		self._loop_next_verts: np.ndarray = None
+
+	def begin(self):
+		'''
+		Leaves edit mode and reads the colors the gradient is painted over
+		'''
+		bpy.ops.object.mode_set(mode='OBJECT')
+		self._attribute_name = self.mesh.color_attributes.active_color.name
+		self._base_colors = ColorSnapshot(self._attribute_name, self.arrays.read_colors(self._attribute_name))
+
+	def restore(self):
+		'''
+		Writes back the colors read by `begin`, removing the painted gradient
+		'''
+		if not self._base_colors.is_dirty:
+			return
+		self._base_colors.restore(self.arrays)
+		self.mesh.update()
+
+	def end(self, restore: bool = False):
+		'''
+		Enters edit mode again, which loads the painted colors into the edit-mesh
+		'''
+		if restore:
+			self.restore()
+		self._base_colors = None
+		bpy.ops.object.mode_set(mode='EDIT')
+
+	def paint(self,
+			selected_only: bool,
+			extend_mode: GradientExtendMode,
+			boundary_sharp_mode: GradientSharpEdgeMode,
+			gradient_type: GradientType,
+			interp_func: callable,
+			blend_func: callable,
+			clip_colors: bool,
+			factor: tuple[float,float],
+			color: tuple[Color,Color],
+			line: tuple[Vector,Vector],
+			preview_step: int = 1) -> np.ndarray:
+		'''
+		Same as `paint_gradient`, replacing the gradient of the previous call. Only valid between `begin` and `end`.
+		Returns the indices of the painted vertices or face corners.
+		'''
+		color_attribute = self.mesh.color_attributes[self._attribute_name]
+		is_corner_attribute = color_attribute.domain == 'CORNER'
+
+		col0 = Vector(color[0])
+		col1 = Vector(color[1])
+
+		if color_attribute.data_type == 'BYTE_COLOR':
+			clip_colors = False
+			col0[:3] = [ColorUtils.linear_to_srgb(x) for x in col0[:3]]
+			col1[:3] = [ColorUtils.linear_to_srgb(x) for x in col1[:3]]
+
+		l0, l1 = line
+		if (l1 - l0).length == 0:
+			self.restore()
+			return np.empty(0, dtype=np.int64)
+
+		arrays = self.arrays
+		if is_corner_attribute:
+			elems = self._filter_loops(selected_only, boundary_sharp_mode, extend_mode, gradient_type, l0, l1)
+		else:
+			elems = self._filter_verts(selected_only, extend_mode, gradient_type, l0, l1)
+
+		elems = elems[::preview_step]
+		coords = arrays.coords[arrays.loop_verts[elems] if is_corner_attribute else elems]
+
+		weights = _gradient_weights(coords, gradient_type, l0, l1)
+		blend_facs = factor[0] + weights * (factor[1] - factor[0])
+		blend_cols = ColorUtils.interp_colors(interp_func, weights, col0, col1, ColorUtils.INTERP_LUT_SIZE)
+
+		colors = self._base_colors.colors.copy()
+		colors[elems] = _blend_colors_array(blend_func, blend_facs, colors[elems], blend_cols, clip_colors)
+		arrays.write_colors(self._attribute_name, colors)
+		self.mesh.update()
+		# The whole array was written, which also removed the gradient of the previous call
+		self._base_colors.clear_dirty()
+		self._base_colors.mark_dirty(elems)
+
+		return elems
+
+	def _filter_verts(self,
+				selected_only: bool,
+				extend_mode: GradientExtendMode,
+				gradient_type: GradientType,
+				l0: Vector,
+				l1: Vector) -> np.ndarray:
+		arrays = self.arrays
+		# Select filter
+		if selected_only:
+			vert_mask = arrays.vert_select.copy()
+		else:
+			vert_mask = np.ones(len(arrays.coords), dtype=bool)
+		# Extend filter
+		if extend_mode:
+			return np.flatnonzero(vert_mask)
+
+		match gradient_type:
+			case GradientType.LINEAR:
+				dist = _line_factors(arrays.coords, l0, l1)
+				vert_mask &= (dist >= 0) & (dist <= 1)
+			case GradientType.RADIAL:
+				vert_mask &= _squared_distances(arrays.coords, l0) <= (l1 - l0).length_squared
+		return np.flatnonzero(vert_mask)
+
+	def _filter_loops(self,
+				selected_only: bool,
+				boundary_sharp_mode: GradientSharpEdgeMode,
+				extend_mode: GradientExtendMode,
+				gradient_type: GradientType,
+				l0: Vector,
+				l1: Vector) -> np.ndarray:
+		'''
+		Array version of `_filter_loops_from_faces`, returns the indices of the face corners to paint
+		'''
+		arrays = self.arrays
+		# Select filter
+		if selected_only:
+			face_mask = arrays.face_select.copy()
+		else:
+			face_mask = np.ones(len(arrays.loop_starts), dtype=bool)
+
+		if extend_mode == GradientExtendMode.BOTH:
+			return np.flatnonzero(face_mask[arrays.loop_faces])
+
+		sharp_bounds = boundary_sharp_mode != GradientSharpEdgeMode.OFF
+
+		check_forward = extend_mode == GradientExtendMode.BACKWARD
+		check_backward = extend_mode == GradientExtendMode.FORWARD
+
+		# Boundary distances per vertex
+		match gradient_type:
+			case GradientType.LINEAR:
+				factors = _line_factors(arrays.coords, l0, l1)
+				dist_forward = _snap_distances(factors)
+				dist_backward = _snap_distances(1.0 - factors)
+			case GradientType.RADIAL:
+				dist_radius = _snap_distances((l1 - l0).length_squared - _squared_distances(arrays.coords, l0))
+
+		if boundary_sharp_mode == GradientSharpEdgeMode.FACE:
+			# Discard faces not completely withing the bounds
+			match gradient_type:
+				case GradientType.LINEAR:
+					if not check_forward:
+						face_mask &= ~self._any_vert_per_face(dist_forward < 0)
+					if not check_backward:
+						face_mask &= ~self._any_vert_per_face(dist_backward < 0)
+
+				case GradientType.RADIAL:
+					if check_forward:
+						face_mask &= ~self._any_vert_per_face(dist_radius < 0)
+
+		loop_mask = face_mask[arrays.loop_faces]
+		match gradient_type:
+			case GradientType.LINEAR:
+				if not check_forward:
+					loop_mask &= self._loop_bounds_linear(dist_forward, sharp_bounds)
+				if not check_backward:
+					loop_mask &= self._loop_bounds_linear(dist_backward, sharp_bounds)
+
+			case GradientType.RADIAL:
+				if check_forward:
+					loop_mask &= self._loop_bounds_radial(dist_radius, sharp_bounds)
+
+		return np.flatnonzero(loop_mask)
+
+	def _any_vert_per_face(self, vert_mask: np.ndarray) -> np.ndarray:
+		arrays = self.arrays
+		counts = np.bincount(arrays.loop_faces, weights=vert_mask[arrays.loop_verts], minlength=len(arrays.loop_starts))
+		return counts > 0
+
+	def _loop_bounds_linear(self, dist: np.ndarray, sharp_bounds: bool) -> np.ndarray:
+		loop_dist = dist[self.arrays.loop_verts]
+		if not sharp_bounds:
+			return loop_dist >= 0
+
+		# Check boundary overlap
+		prev_dist = dist[self.loop_prev_verts]
+		border_dist = np.where(prev_dist == 0, dist[self.loop_next_verts], prev_dist)
+		return (loop_dist >= 0) & ((loop_dist != 0) | (border_dist >= 0))
+
+	def _loop_bounds_radial(self, dist: np.ndarray, sharp_bounds: bool) -> np.ndarray:
+		loop_dist = dist[self.arrays.loop_verts]
+		if not sharp_bounds:
+			return loop_dist >= 0
+
+		# Check boundary overlap
+		has_out_of_range_connected_loop = (dist[self.loop_prev_verts] > 0) | (dist[self.loop_next_verts] > 0)
+		return (loop_dist >= 0) & ((loop_dist != 0) | has_out_of_range_connected_loop)
+
+	@property
+	def loop_prev_verts(self) -> np.ndarray:
+		'''Vertex index of the previous face corner of each face corner'''
+		if self._loop_prev_verts is None:
+			self._loop_prev_verts = self._offset_loop_verts(-1)
+		return self._loop_prev_verts
+
+	@property
+	def loop_next_verts(self) -> np.ndarray:
+		'''Vertex index of the next face corner of each face corner'''
+		if self._loop_next_verts is None:
+			self._loop_next_verts = self._offset_loop_verts(1)
+		return self._loop_next_verts
+
+	def _offset_loop_verts(self, offset: int) -> np.ndarray:
+		arrays = self.arrays
+		starts = arrays.loop_starts[arrays.loop_faces]
+		totals = arrays.loop_totals[arrays.loop_faces]
+		positions = np.arange(len(arrays.loop_verts), dtype=np.int32) - starts
+		return arrays.loop_verts[starts + (positions + offset) % totals]
+
+
+def _gradient_weights(coords: np.ndarray, gradient_type: GradientType, l0: Vector, l1: Vector) -> np.ndarray:
+	match gradient_type:
+		case GradientType.LINEAR:
+			weights = _line_factors(coords, l0, l1)
+		case GradientType.RADIAL:
+			weights = np.sqrt(_squared_distances(coords, l0)) / (l1 - l0).length
+	return np.clip(weights, 0.0, 1.0)
+
+def _line_factors(coords: np.ndarray, l0: Vector, l1: Vector) -> np.ndarray:
+	# Same as the factor returned by geometry.intersect_point_line
+	line_dir = np.array((l1 - l0)[:])
+	return (coords - np.array(l0[:])) @ (line_dir / line_dir.dot(line_dir))
+
+def _squared_distances(coords: np.ndarray, center: Vector) -> np.ndarray:
+	offsets = coords - np.array(center[:])
+	return np.einsum('ij,ij->i', offsets, offsets)
 
+def _snap_distances(dist: np.ndarray) -> np.ndarray:
+	return np.where(np.abs(dist) < 0.0001, 0.0, dist)
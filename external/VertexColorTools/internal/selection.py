@@ -0,0 +1,155 @@
+# SPDX-License-Identifier: GPL-2.0-or-later
+#
+# Selection masks of the bulk backend.
+#
+# Turns a `FilterType` into an index array over the vertex or face corner domain. The arrays are
+# cached per mesh across calls. A depsgraph handler drops the entry of a mesh when it changes, except
+# for the updates caused by the add-on's own color writes (see `color_array.consume_own_update`), and
+# the entry is only reused while the active elements and selection counts still match.
+#
+
+import bpy
+from bpy.app.handlers import persistent
+import numpy as np
+
+from .color_array import MeshArrays, consume_own_update
+
+from enum import Enum
+
+
+class FilterType(Enum):
+	ALL = 0
+	SELECTED = 1
+	ACTIVE_VERTEX = 2,
+	ACTIVE = 3
+
+
+class SelectionIndices:
+	'''
+	Index arrays of the vertices and face corners matched by each `FilterType`, computed on first use.
+	The corner arrays are only needed for the corner domain.
+	'''
+
+	def __init__(self,
+				active_vert: int,
+				active_face: int,
+				vert_select: np.ndarray,
+				face_select: np.ndarray,
+				loop_verts: np.ndarray = None,
+				loop_faces: np.ndarray = None):
+		self.active_vert = active_vert
+		self.active_face = active_face
+		self.vert_select = vert_select
+		self.face_select = face_select
+		self.loop_verts = loop_verts
+		self.loop_faces = loop_faces
+		self._indices: dict[tuple[bool, FilterType], np.ndarray] = {}
+		self._selection_corners: np.ndarray = None
+
+	def get(self, is_corner_attribute: bool, types: FilterType = FilterType.ALL) -> np.ndarray:
+		key = (is_corner_attribute, types)
+		if key not in self._indices:
+			if is_corner_attribute:
+				self._indices[key] = self._get_corner_indices(types)
+			else:
+				self._indices[key] = self._get_vertex_indices(types)
+		return self._indices[key]
+
+	@property
+	def selection_corners(self) -> np.ndarray:
+		'''
+		Corners of the selected faces and all corners of selected vertices outside of them
+		'''
+		if self._selection_corners is None:
+			face_loops = self.face_select[self.loop_faces]
+			face_verts = np.zeros(len(self.vert_select), dtype=bool)
+			face_verts[self.loop_verts[face_loops]] = True
+			self._selection_corners = np.flatnonzero(face_loops | (self.vert_select & ~face_verts)[self.loop_verts])
+		return self._selection_corners
+
+	def _get_corner_indices(self, types: FilterType) -> np.ndarray:
+		match types:
+			case FilterType.ACTIVE:
+				return np.flatnonzero(self.loop_faces == self.active_face)
+			case FilterType.ACTIVE_VERTEX:
+				if self.active_vert < 0:
+					return np.empty(0, dtype=np.int64)
+				return np.flatnonzero(self.face_select[self.loop_faces] & (self.loop_verts == self.active_vert))
+			case FilterType.SELECTED:
+				return np.flatnonzero(self.face_select[self.loop_faces])
+			case FilterType.ALL:
+				return np.arange(len(self.loop_verts))
+		return np.empty(0, dtype=np.int64)
+
+	def _get_vertex_indices(self, types: FilterType) -> np.ndarray:
+		match types:
+			case FilterType.ACTIVE_VERTEX | FilterType.ACTIVE:
+				if self.active_vert < 0:
+					return np.empty(0, dtype=np.int64)
+				return np.array([self.active_vert])
+			case FilterType.SELECTED:
+				return np.flatnonzero(self.vert_select)
+			case FilterType.ALL:
+				return np.arange(len(self.vert_select))
+		return np.empty(0, dtype=np.int64)
+
+
+_selection_cache: dict[int, tuple[tuple, SelectionIndices]] = {}
+
+
+def _selection_state(arrays: MeshArrays) -> tuple:
+	'''
+	Cheap summary of the selection, read without touching the per element data
+	'''
+	mesh = arrays.mesh
+	return (arrays.active_vert, arrays.active_face,
+			len(mesh.vertices), len(mesh.loops), len(mesh.polygons),
+			mesh.total_vert_sel, mesh.total_face_sel)
+
+
+def get_selection_indices(arrays: MeshArrays) -> SelectionIndices:
+	'''
+	Returns the cached selection indices of the mesh, or creates them from the arrays
+	'''
+	key = arrays.mesh.as_pointer()
+	state = _selection_state(arrays)
+	entry = _selection_cache.get(key)
+	if entry is None or entry[0] != state:
+		entry = _selection_cache[key] = (state, SelectionIndices(arrays.active_vert, arrays.active_face,
+																arrays.vert_select, arrays.face_select,
+																arrays.loop_verts, arrays.loop_faces))
+	return entry[1]
+
+
+def invalidate_selection_cache():
+	_selection_cache.clear()
+
+
+@persistent
+def _depsgraph_update_handler(scene: bpy.types.Scene, depsgraph: bpy.types.Depsgraph):
+	if not _selection_cache:
+		return
+	for update in depsgraph.updates:
+		if not isinstance(update.id, bpy.types.Mesh):
+			continue
+		key = update.id.original.as_pointer()
+		# Color writes of the add-on don't change the selection
+		if consume_own_update(key):
+			continue
+		_selection_cache.pop(key, None)
+
+
+@persistent
+def _load_post_handler(_):
+	invalidate_selection_cache()
+
+
+def register():
+	bpy.app.handlers.depsgraph_update_post.append(_depsgraph_update_handler)
+	bpy.app.handlers.load_post.append(_load_post_handler)
+
+
+def unregister():
+	bpy.app.handlers.load_post.remove(_load_post_handler)
+	bpy.app.handlers.depsgraph_update_post.remove(_depsgraph_update_handler)
+	invalidate_selection_cache()
@@ -4,12 +4,16 @@ import bpy
 import bmesh
 from bmesh.types import BMEdge, BMFace, BMLayerItem, BMLoop
 from mathutils import Vector, Color
+import numpy as np
 
 from . import color_utils as ColorUtils
-from .color_attribute import _parse_color_attribute, _modify_color_attribute
+from .color_attribute import _parse_color_attribute, ColorModifierBatch
+from .color_array import bulk_mesh_arrays, use_bulk_backend
 from .types import ContextException
 
 from enum import Enum
+from functools import partial
+from itertools import accumulate
 
 # Maximum distance to check for face loop extent for each edge
 MAX_EDGE_TOPOLOGY_EXTENT = 10000
@@ -29,11 +33,19 @@ def paint_topology_gradient(mesh: bpy.types.Mesh,
 						colors: tuple[Color,Color],
 						distance: float,
 						extent_clamp_mode: TopologyExtentClampMode,
-						direction: Vector) -> None:
-	
+						direction: Vector,
+						strip_cache: 'TopologyStripCache' = None) -> np.ndarray:
+	'''
+	Paints a gradient along the face strips starting at the selected edges.
+	A `strip_cache` created for the same selection can be passed to reuse the walked strips between calls.
+	Returns the indices of the painted vertices or face corners.
+	'''
 	bm = bmesh.from_edit_mesh(mesh)
+	bm.verts.index_update()
+	bm.faces.index_update()
 
-	active_layer, is_corner_attribute, is_byte_color = _parse_color_attribute(bm, mesh.color_attributes.active_color)
+	color_attribute = mesh.color_attributes.active_color
+	active_layer, is_corner_attribute, is_byte_color = _parse_color_attribute(bm, color_attribute)
 	
 	vec_colors = (Vector(colors[0]), Vector(colors[1]))
 	direction = direction.copy()
@@ -43,84 +55,227 @@ def paint_topology_gradient(mesh: bpy.types.Mesh,
 		vec_colors[0][:3] = [ColorUtils.linear_to_srgb(x) for x in vec_colors[0][:3]]
 		vec_colors[1][:3] = [ColorUtils.linear_to_srgb(x) for x in vec_colors[1][:3]]
 
-	edges : list[BMEdge] = [edge for edge in bm.edges if edge.select]
+	if strip_cache is None:
+		strip_cache = TopologyStripCache(mesh)
 
-	if not edges:
+	if not strip_cache.edge_count:
 		raise ContextException("No edges selected")
 
-	if distance == 0:
-		return
-	if direction.length_squared == 0:
-		return
+	if distance == 0 or direction.length_squared == 0:
+		return np.empty(0, dtype=np.int64)
 	
 	if distance < 0:
 		direction *= -1
 	
 	distance = abs(distance)
 
-	_paint_topology_gradient_for_edges(edges, is_corner_attribute, distance, factors, vec_colors, active_layer, interp_func, blend_func, clip_colors, extent_clamp_mode, direction)
+	# Elements are collected as vertex or face corner indices
+	batch = ColorModifierBatch(active_layer, blend_func, clip_colors)
+
+	_paint_topology_gradient_for_edges(bm, strip_cache, is_corner_attribute, distance, factors, vec_colors, batch, interp_func, extent_clamp_mode, direction)
 
 	if mirror:
-		_paint_topology_gradient_for_edges(edges, is_corner_attribute, distance, factors, vec_colors, active_layer, interp_func, blend_func, clip_colors, extent_clamp_mode, -direction)
+		_paint_topology_gradient_for_edges(bm, strip_cache, is_corner_attribute, distance, factors, vec_colors, batch, interp_func, extent_clamp_mode, -direction)
+
+	indices = batch.indices
+	if use_bulk_backend(mesh, color_attribute):
+		with bulk_mesh_arrays(mesh) as arrays:
+			colors = arrays.read_colors(color_attribute.name)
+			batch.apply_to_array(colors)
+			arrays.write_colors(color_attribute.name, colors)
+		return indices
+
+	if is_corner_attribute:
+		batch.apply(partial(strip_cache.get_loop, bm))
+	else:
+		bm.verts.ensure_lookup_table()
+		batch.apply(bm.verts.__getitem__)
 
 	bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
-
-def _find_edge_extent(edge: BMEdge, direction: Vector):
-	loop_0: BMLoop = None
-	first_face: BMFace = None
-	for face_idx in range(1, MAX_EDGE_TOPOLOGY_EXTENT):
-		if not loop_0:
-			loop_0 = _find_first_loop(edge, direction)
+	return indices
+
+
+class _StripStep:
+	'''
+	Indices of the elements around one face of a strip.
+	`loop_0` and `loop_1` are the corners of the face at the edge the strip enters it through,
+	the back loops are the matching corners of the previous face.
+	'''
+	__slots__ = ('face', 'next_face', 'num_verts', 'position',
+			'loop_0', 'loop_1', 'loop_back_0', 'loop_back_1', 'loop_front_0',
+			'vert_0', 'vert_1', 'vert_front_0')
+
+
+class TopologyStrip:
+	'''
+	The face strip walked from one side of an edge, stored as element indices.
+	Steps are walked lazily, so a strip only ever walks as far as it has been painted.
+	'''
+
+	def __init__(self, cache: 'TopologyStripCache', first_loop: BMLoop):
+		self.cache = cache
+		self.steps: list[_StripStep] = []
+		self._extent: int = None
+		self._append_step(first_loop)
+
+	@property
+	def first_face(self) -> int:
+		return self.steps[0].face
+
+	def step(self, bm: bmesh.types.BMesh, face_idx: int) -> _StripStep:
+		while face_idx >= len(self.steps):
+			last_step = self.steps[-1]
+			bm.faces.ensure_lookup_table()
+			loop_0 = bm.faces[last_step.face].loops[last_step.position]
+			self._append_step(loop_0.link_loop_next.link_loop_next.link_loop_radial_next)
+		return self.steps[face_idx]
+
+	def extent(self, bm: bmesh.types.BMesh) -> int:
+		'''
+		Number of faces the strip can be painted over
+		'''
+		if self._extent is not None:
+			return self._extent
+
+		self._extent = 0
+		for face_idx in range(1, MAX_EDGE_TOPOLOGY_EXTENT):
+			step = self.step(bm, face_idx - 1)
+
+			if step.next_face == step.face:
+				# Non manifold
+				self._extent = face_idx
+				break
 			
-			if not loop_0:
-				# No next loop found in the direction
-				return 0
+			if step.next_face == self.first_face:
+				# Wrapped around
+				self._extent = face_idx
+				break
 			
-			first_face = loop_0.face
-		else:
-			loop_0 = loop_0.link_loop_next.link_loop_next.link_loop_radial_next
+			if step.num_verts == 3:
+				# Current face is a triangle
+				self._extent = face_idx
+				break
+			elif step.num_verts > 4:
+				# Current face is an n-gon
+				self._extent = face_idx - 1
+				break
 
+		return self._extent
 
+	def _append_step(self, loop_0: BMLoop):
+		cache = self.cache
 		loop_1 = loop_0.link_loop_next
+		loop_back_0 = loop_0.link_loop_radial_next
 		loop_front_0 = loop_1.link_loop_next
-		loop_front_1 = loop_0.link_loop_prev
 
-		loop_back_0 = loop_0.link_loop_radial_next
-		loop_back_1 = loop_back_0.link_loop_next
+		step = _StripStep()
+		step.face = loop_0.face.index
+		step.next_face = loop_front_0.link_loop_radial_next.face.index
+		step.num_verts = len(loop_0.face.verts)
+		step.position = _loop_position(loop_0)
+		step.loop_0 = cache.loop_index(loop_0)
+		step.loop_1 = cache.loop_index(loop_1)
+		step.loop_back_0 = cache.loop_index(loop_back_0)
+		step.loop_back_1 = cache.loop_index(loop_back_0.link_loop_next)
+		step.loop_front_0 = cache.loop_index(loop_front_0)
+		step.vert_0 = loop_0.vert.index
+		step.vert_1 = loop_1.vert.index
+		step.vert_front_0 = loop_front_0.vert.index
+		self.steps.append(step)
+
+
+class TopologyStripCache:
+	'''
+	Face strips for the selected edges of a mesh in edit mode, keyed by edge and the side the strip is walked to.
+	Only holds indices, so it stays valid while the topology and the edge selection do not change,
+	even when the edit-mesh is reloaded in between.
+	'''
+
+	def __init__(self, mesh: bpy.types.Mesh):
+		bm = bmesh.from_edit_mesh(mesh)
+		bm.verts.index_update()
+		bm.faces.index_update()
+
+		self.face_loop_starts: list[int] = list(accumulate((len(face.loops) for face in bm.faces), initial=0))
+		self._loop_faces: dict[int, tuple[int, int]] = {}
+		self._strips: dict[tuple[int, int], TopologyStrip] = {}
+
+		# First loop (face index and position) and walking direction of the sides of each selected edge
+		self._edge_sides: list[list[tuple[tuple[int, int], Vector]]] = []
+		for edge in bm.edges:
+			if not edge.select:
+				continue
+			link_loops = list(edge.link_loops)
+			sides = []
+			for loop in link_loops[:2 if len(link_loops) == 2 else 1]:
+				next_loop = loop.link_loop_next.link_loop_next.link_loop_radial_next
+				sides.append(((loop.face.index, _loop_position(loop)), (next_loop.vert.co - loop.vert.co).normalized()))
+			self._edge_sides.append(sides)
+
+	@property
+	def edge_count(self) -> int:
+		return len(self._edge_sides)
+
+	def strip(self, bm: bmesh.types.BMesh, edge_idx: int, direction: Vector) -> TopologyStrip | None:
+		'''
+		Returns the strip of the selected edge that leads along the direction, None if there is no clear side
+		'''
+		sides = self._edge_sides[edge_idx]
+		if not sides:
+			return None
+
+		a_diff = sides[0][1].dot(direction)
+		b_diff = sides[1][1].dot(direction) if len(sides) == 2 else 0
+		if a_diff > b_diff:
+			side = 0
+		elif a_diff < b_diff:
+			side = 1
+		else:
+			return None
 
-		cur_face = loop_0.face
-		next_face = loop_front_0.link_loop_radial_next.face
+		if side >= len(sides):
+			# Only one side
+			return None
 
-		if next_face == cur_face:
-			# Non manifold
-			return face_idx
-		
-		if next_face == first_face:
-			# Wrapped around
-			return face_idx
-		
-		num_face_verts = len(cur_face.verts)
-		if num_face_verts == 3:
-			# Current face is a triangle
-			return face_idx
-		elif num_face_verts > 4:
-			# Current face is an n-gon
-			return face_idx - 1
+		key = (edge_idx, side)
+		if key not in self._strips:
+			face, position = sides[side][0]
+			bm.faces.ensure_lookup_table()
+			self._strips[key] = TopologyStrip(self, bm.faces[face].loops[position])
+		return self._strips[key]
 
-	return 0
+	def loop_index(self, loop: BMLoop) -> int:
+		face = loop.face.index
+		position = _loop_position(loop)
+		index = self.face_loop_starts[face] + position
+		self._loop_faces[index] = (face, position)
+		return index
+
+	def get_loop(self, bm: bmesh.types.BMesh, index: int) -> BMLoop:
+		face, position = self._loop_faces[index]
+		bm.faces.ensure_lookup_table()
+		return bm.faces[face].loops[position]
+
+
+def _loop_position(loop: BMLoop) -> int:
+	position = 0
+	first_loop = loop.face.loops[0]
+	while loop != first_loop:
+		loop = loop.link_loop_prev
+		position += 1
+	return position
 
 
 def _paint_topology_gradient_for_edges(
-						edges: list[BMEdge],
+						bm: bmesh.types.BMesh,
+						strip_cache: TopologyStripCache,
 						is_corner_attribute: bool,
 						distance: float,
 						factors: tuple[float,
 						float],
 						colors: tuple[Vector,Vector],
-						color_layer: BMLayerItem,
+						batch: ColorModifierBatch,
 						interp_func: callable,
-						blend_func: callable,
-						clip_colors: bool,
 						extend_clamp_mode: TopologyExtentClampMode,
 						direction: Vector):
 	
@@ -128,16 +283,18 @@ def _paint_topology_gradient_for_edges(
 	color_start, color_end = colors[:]
 	factor_start, factor_end= factors[:]
 
+	strips = [strip_cache.strip(bm, edge_idx, direction) for edge_idx in range(strip_cache.edge_count)]
+
 	edge_extents = []
-	for edge in edges:
-		extent = _find_edge_extent(edge, direction)
+	for strip in strips:
+		extent = strip.extent(bm) if strip else 0
 		edge_extents.append(extent)
 		
 	minimum_extent = min(edge_extents)
 	maximum_extent = max(edge_extents)
 	
-	for i in range(len(edges)):
-		edge = edges[i]
+	for i in range(len(strips)):
+		strip = strips[i]
 		match extend_clamp_mode:
 			case TopologyExtentClampMode.MAXIMUM:
 				extent = min(distance, maximum_extent)
@@ -146,6 +303,9 @@ def _paint_topology_gradient_for_edges(
 			case TopologyExtentClampMode.INDIVIDUAL:
 				extent = min(edge_extents[i], distance)
 		
+		if not strip:
+			# No next loop found in the direction
+			return
 			
 		last_face_idx = max(int(extent), 1)
 		denom = max(extent, 1)
@@ -153,126 +313,75 @@ def _paint_topology_gradient_for_edges(
 		integer_distance = (extent % 1) == 0
 		is_partial_step = extent < 1
 
-		loop_0: BMLoop = None
-		first_face: BMFace = None
-		prev_face: BMFace = None
+		prev_face = None
 		step_count = last_face_idx + (0 if is_partial_step else 1)
 		for face_idx in range(step_count):
-			if not loop_0:
-				loop_0 = _find_first_loop(edge, direction)
-				
-				if not loop_0:
-					# No next loop found in the direction
-					return 0
-				
-				first_face = loop_0.face
-			else:
-				loop_0 = loop_0.link_loop_next.link_loop_next.link_loop_radial_next
-
-
-			loop_1 = loop_0.link_loop_next
-
-			loop_back_0 = loop_0.link_loop_radial_next
-			loop_back_1 = loop_back_0.link_loop_next
-
-			loop_front_0 = loop_1.link_loop_next
-			loop_front_1 = loop_0.link_loop_prev
-
-			cur_face = loop_0.face
-			is_ngon = len(cur_face.verts) > 4
+			step = strip.step(bm, face_idx)
 
-			#next_face = loop_front_0.link_loop_radial_next.face
+			if is_corner_attribute:
+				elem_0, elem_1, elem_front_0 = step.loop_0, step.loop_1, step.loop_front_0
+			else:
+				elem_0, elem_1, elem_front_0 = step.vert_0, step.vert_1, step.vert_front_0
 
-			
+			cur_face = step.face
+			is_ngon = step.num_verts > 4
 
 			# Get the color and factor from the blend function
 			weight = face_idx / denom
 			blend_fac = factor_start + weight * (factor_end - factor_start)
 			blend_col = interp_func(weight, color_start, color_end)
 
-			if face_idx != last_face_idx and len(cur_face.verts) == 3 :
+			if face_idx != last_face_idx and step.num_verts == 3 :
 				# Handle edge case where the last face is a triangle
-				if not is_corner_attribute:
-					# Vertex attributes
-					_modify_color_attribute(loop_0.vert, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-					_modify_color_attribute(loop_1.vert, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-				else:
-					if face_idx != 0:
-						_modify_color_attribute(loop_back_0, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-						_modify_color_attribute(loop_back_1, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-					
-					_modify_color_attribute(loop_0, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-					_modify_color_attribute(loop_1, color_layer, blend_func, clip_colors, blend_fac, blend_col)
+				if is_corner_attribute and face_idx != 0:
+					batch.add(step.loop_back_0, blend_fac, blend_col)
+					batch.add(step.loop_back_1, blend_fac, blend_col)
+				
+				batch.add(elem_0, blend_fac, blend_col)
+				batch.add(elem_1, blend_fac, blend_col)
 					
 				# The third point of the triangle uses the weight for the next face.
 				# Apply color here and break
 				weight = (face_idx + 1) / denom
 				blend_fac = factor_start + weight * (factor_end - factor_start)
 				blend_col = interp_func(weight, color_start, color_end)
-				if not is_corner_attribute:
-					_modify_color_attribute(loop_front_0.vert, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-				else:
-					_modify_color_attribute(loop_front_0, color_layer, blend_func, clip_colors, blend_fac, blend_col)
+				batch.add(elem_front_0, blend_fac, blend_col)
 				break
 
 
 			if not is_corner_attribute:
 				# Vertex attributes
-				_modify_color_attribute(loop_0.vert, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-				_modify_color_attribute(loop_1.vert, color_layer, blend_func, clip_colors, blend_fac, blend_col)
+				batch.add(elem_0, blend_fac, blend_col)
+				batch.add(elem_1, blend_fac, blend_col)
 			else:
 				# Corner attributes
 				if integer_distance:
 					# Snapped distance:
 					if face_idx != 0:
-						_modify_color_attribute(loop_back_0, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-						_modify_color_attribute(loop_back_1, color_layer, blend_func, clip_colors, blend_fac, blend_col)
+						batch.add(step.loop_back_0, blend_fac, blend_col)
+						batch.add(step.loop_back_1, blend_fac, blend_col)
 					if face_idx != last_face_idx and not is_ngon:
-						_modify_color_attribute(loop_0, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-						_modify_color_attribute(loop_1, color_layer, blend_func, clip_colors, blend_fac, blend_col)
+						batch.add(elem_0, blend_fac, blend_col)
+						batch.add(elem_1, blend_fac, blend_col)
 				elif is_partial_step:
 					# Only the first face is modified:
 					# 	Only the front loops are colored
-					#if edge_idx != last_edge_idx:
-					_modify_color_attribute(loop_0, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-					_modify_color_attribute(loop_1, color_layer, blend_func, clip_colors, blend_fac, blend_col)
+					batch.add(elem_0, blend_fac, blend_col)
+					batch.add(elem_1, blend_fac, blend_col)
 				else:
 					# Decimal distance:
 					#	Skip first back loops
 					# 	Front loops of the last edge are colored as well 
 					if face_idx != 0:
-						_modify_color_attribute(loop_back_0, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-						_modify_color_attribute(loop_back_1, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-					_modify_color_attribute(loop_0, color_layer, blend_func, clip_colors, blend_fac, blend_col)
-					_modify_color_attribute(loop_1, color_layer, blend_func, clip_colors, blend_fac, blend_col)
+						batch.add(step.loop_back_0, blend_fac, blend_col)
+						batch.add(step.loop_back_1, blend_fac, blend_col)
+					batch.add(elem_0, blend_fac, blend_col)
+					batch.add(elem_1, blend_fac, blend_col)
 			
-			if face_idx != 0 and cur_face == first_face:
+			if face_idx != 0 and cur_face == strip.first_face:
 				# Wrapped around
 				break
 			if prev_face == cur_face:
 				# Non manifold
 				break
 			prev_face = cur_face
-
-
-def _find_first_loop(edge: BMEdge, direction: Vector) -> BMLoop | None:
-	a0 = edge.link_loops[0]
-	a1 = edge.link_loops[0].link_loop_next.link_loop_next.link_loop_radial_next
-	a_back = None
-	b0 = None
-	b1 = None
-	b_back = None
-	b_diff = 0
-	if len(edge.link_loops) == 2:
-		a_back = edge.link_loops[0].link_loop_radial_next.link_loop_next.link_loop_next
-
-		b0 = edge.link_loops[1]
-		b1 = edge.link_loops[1].link_loop_next.link_loop_next.link_loop_radial_next
-		b_back = edge.link_loops[1].link_loop_radial_next.link_loop_next.link_loop_next
-		b_diff = (b1.vert.co - b0.vert.co).normalized().dot(direction)
-	a_diff = (a1.vert.co - a0.vert.co).normalized().dot(direction)
-	if a_diff > b_diff:
-		return a0
-	elif a_diff < b_diff:
-		return b0
-	return
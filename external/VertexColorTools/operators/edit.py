@@ -14,6 +14,8 @@ from ..internal.color_attribute import (
 	clip_color_attribute,
 	select_similar_color,
 	select_linked,
+	select_color_regions,
+	split_color_regions,
 	copy_active_color_to_selected)
 
 from ..internal.types import ContextException
@@ -144,6 +146,58 @@ class EDITVERTCOL_OT_SelectLinkedVertexColor(Operator):
 		return {'FINISHED'}
 
 
+class EDITVERTCOL_OT_VertexColorRegions(Operator):
+	bl_idname = "edit_vertex_colors.color_regions"
+	bl_label = "Vertex Color Regions"
+	bl_description = "Select or split all connected regions of similar vertex color at once"
+	bl_options = {'REGISTER', 'UNDO'}
+
+	action: EnumProperty(
+		name="Action",
+		items=[
+			('SELECT', "Select", "Select every region that contains a selected element"),
+			('SPLIT', "Split", "Split the edges between regions, so that every region becomes a separate island")],
+		default='SELECT')
+
+	threshold: FloatProperty(
+		name="Threshold", description="Maximum color difference between linked elements of a region", default=0.0, subtype='FACTOR', soft_min=0, soft_max=1)
+	
+	ignore_alpha: BoolProperty(
+		name="Ignore Alpha", description="Ignore alpha component when comparing colors", default=True)
+
+	check_corners: BoolProperty(
+		name="Corners", description="Check for faces linked by vertices instead of edges", default=False)
+
+	@classmethod
+	def poll(cls, context: Context):
+		return poll_active_color_attribute(cls, context)
+	
+	def draw(self, context: Context):
+		layout = self.layout
+		layout.use_property_split = True
+		layout.prop(self, 'action')
+		layout.prop(self, 'threshold')
+		if context.active_object.data.color_attributes.active_color.domain == 'CORNER':
+			layout.prop(self, 'check_corners')
+		layout.prop(self, 'ignore_alpha')
+
+	def execute(self, context: Context):
+		object: Object = context.active_object
+		mesh: Mesh = object.data
+
+		try:
+			match self.action:
+				case 'SELECT':
+					select_color_regions(mesh, self.threshold, self.ignore_alpha, self.check_corners)
+				case 'SPLIT':
+					split_color_regions(mesh, self.threshold, self.ignore_alpha, self.check_corners)
+		except ContextException as e:
+			self.report({'ERROR_INVALID_INPUT'}, e.args[0])
+			return {'CANCELLED'}
+
+		return {'FINISHED'}
+
+
 class EDITVERTCOL_OT_SelectSimilarVertexColor(Operator):
 	bl_idname = "edit_vertex_colors.select_similar_color"
 	bl_label = "Select Similar Vertex Color"
@@ -246,7 +300,8 @@ classes = (
 	EDITVERTCOL_OT_Clip,
 	EDITVERTCOL_OT_SelectSimilarVertexColor,
 	EDITVERTCOL_OT_CopyColorToSelected,
-	EDITVERTCOL_OT_SelectLinkedVertexColor
+	EDITVERTCOL_OT_SelectLinkedVertexColor,
+	EDITVERTCOL_OT_VertexColorRegions
 )
 
 def register():
@@ -23,9 +23,12 @@ from ..internal.color_attribute import (
 	save_active_color,
 )
 
+from ..internal.color_array import ColorSnapshot, use_bulk_backend
+
 
 from ..internal.gradient import (
 	paint_gradient,
+	GradientEngine,
 	GradientType, 
 	GradientSharpEdgeMode,
 	GradientExtendMode
@@ -33,7 +36,7 @@ from ..internal.gradient import (
 
 from ..preferences import BLEND_MODE_ITEMS
 from ..internal.color_utils import BLEND_MODES, INPT_MODE_ITEMS, HSV_INPT_MODES, OKLAB_INTP_MODES, RGB_INTP_MODES, HSL_INPT_MODES
-from .shared import poll_active_color_attribute, INTP_MODE_ITEMS, HUE_INPT_MODE_ITEMS
+from .shared import poll_active_color_attribute, ModalRefreshScheduler, INTP_MODE_ITEMS, HUE_INPT_MODE_ITEMS
 
 from enum import Enum
 
@@ -217,6 +220,10 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 		self._viz_color = Vector((0.75, 0.26, 0.2, 1.0))
 		self._viz_color_begin = Vector((0.26,0.75, 0.2, 0.0))
 		self._viz_color_end = Vector((0.56,0.33,0.02, 0.0))
+		self._engine: GradientEngine = None
+		self._stored_colors: ColorSnapshot = None
+		self._scheduler = ModalRefreshScheduler(self.refresh)
+		self._preview_step = 1
 
 
 	@classmethod
@@ -226,10 +233,23 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 	def execute(self, context: Context):
 		bpy.ops.object.mode_set(mode='VERTEX_PAINT')
 		bpy.ops.object.mode_set(mode='EDIT')
+
+		mesh: Mesh = context.active_object.data
+		if use_bulk_backend(mesh):
+			engine = GradientEngine(mesh)
+			engine.begin()
+			try:
+				engine.paint(*self.paint_args(context))
+			finally:
+				engine.end()
+		else:
+			paint_gradient(mesh, *self.paint_args(context))
+		return {'FINISHED'}
+
+	def paint_args(self, context: Context) -> tuple:
 		blend_func = BLEND_MODES[self.blend_mode][0]
 
 		object = context.active_object
-		mesh: Mesh = object.data
 		inv_world_mat = object.matrix_world.inverted_safe()
 		position_begin_obj = inv_world_mat @ self.position_begin
 		position_end_obj = inv_world_mat @ self.position_end
@@ -248,9 +268,7 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 			case 'OKLAB':
 				intp_func = OKLAB_INTP_MODES[self.interpolation_type][0]
 
-		paint_gradient(
-			mesh,
-			self.selected_only,
+		return (self.selected_only,
 			extend_mode,
 			sharp_edge_mode,
 			gradient_type,
@@ -262,9 +280,42 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 			(self.color_begin,
 			self.color_end),
 			(position_begin_obj,
-			position_end_obj))
+			position_end_obj),
+			self._preview_step)
+
+	def paint_preview(self, context: Context):
+		'''
+		Paints the gradient during the modal session, without switching modes
+		'''
+		if self._engine:
+			# Replaces the previous preview
+			self._engine.paint(*self.paint_args(context))
+			return
 
-		return {'FINISHED'}
+		load_active_color(context.active_object.data, self._stored_colors)
+		self._stored_colors.mark_dirty(paint_gradient(context.active_object.data, *self.paint_args(context)))
+
+	def restore_colors(self, context: Context):
+		'''
+		Removes the preview
+		'''
+		if self._engine:
+			self._engine.restore()
+		else:
+			load_active_color(context.active_object.data, self._stored_colors)
+
+	def refresh(self, context: Context, preview_step: int) -> bool:
+		'''
+		Repaints the preview, called by the refresh scheduler
+		'''
+		if self._state != self.PaintState.NONE:
+			self._preview_step = preview_step
+			self.paint_preview(context)
+			self._preview_step = 1
+			self.update_status(context)
+		else:
+			self.restore_colors(context)
+		return True
 	
 	@staticmethod
 	def draw_callback_px(self, context: Context):
@@ -377,10 +428,19 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 
 		mesh: Mesh = context.active_object.data
 
-		self._stored_colors = save_active_color(mesh)
+		if use_bulk_backend(mesh):
+			# Edit mode is left once for the whole modal session and the mesh arrays are kept until it ends
+			self._engine = GradientEngine(mesh)
+			self._engine.begin()
+			self._stored_colors = None
+		else:
+			self._stored_colors = save_active_color(mesh)
+			self._engine = None
 	
 		self._draw_handler = SpaceView3D.draw_handler_add(self.draw_callback_px, (self, context), 'WINDOW', 'POST_VIEW')
 		
+		self._scheduler.time_budget = context.scene.EditVertexColorsProperties.gradient_preview_budget
+		self._scheduler.start(context)
 		context.window_manager.modal_handler_add(self) # Start modal
 
 		self._kd = mathutils.kdtree.KDTree(len(mesh.vertices))
@@ -433,7 +493,8 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 			+ f"E: Cycle Extend ({extend_mode_name}), "
 			+ f"SHIFT-TAB: Toggle Snap ({'ON' if self._snap else 'OFF'}), "
 			+ f"H: Toggle Color Clip ({'ON' if self.clip_colors else 'OFF'}), "
-			+ f"XYZ: Orientation Lock ({axis_name})")
+			+ f"XYZ: Orientation Lock ({axis_name}), "
+			+ f"Preview: {self._scheduler.timing_text()}")
 
 		context.area.header_text_set(header)
 
@@ -461,11 +522,14 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 	def modal(self, context: Context, event: Event):
 		context.area.tag_redraw()
 
-		mesh: Mesh = context.active_object.data
-
 		# Allow navigation
 		if event.type in ['MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE']:
 			return {'PASS_THROUGH'}
+
+		# Repaint coalesced refresh requests
+		if event.type == 'TIMER':
+			self._scheduler.tick(context)
+			return {'RUNNING_MODAL'}
 				
 		do_refresh = False
 		do_cursor_refresh = False
@@ -532,11 +596,13 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 							self.set_paint_state(context, self.PaintState.BOTH)
 							self.update_status(context)
 						case self.PaintState.BOTH:
+							self._scheduler.flush(context)
 							self.modal_cleanup(context=context)
 							return {'FINISHED'}
 						
 				case 'RET' if self._state == self.PaintState.BOTH:
 					# Alternative confirm
+					self._scheduler.flush(context)
 					self.modal_cleanup(context=context)
 					return {'FINISHED'}
 				
@@ -544,13 +610,13 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 					# Go backward in states
 					match self._state:
 						case self.PaintState.NONE:
-							load_active_color(mesh, self._stored_colors)
+							self.restore_colors(context)
 							self.modal_cleanup(context)
 							return {'CANCELLED'}
 						
 						case self.PaintState.FIRST:
 							self.set_axis_mode(context, AxisMode.NONE)
-							load_active_color(mesh, self._stored_colors)
+							self.restore_colors(context)
 							self._viz_color_begin.w = 0.0
 							self.set_paint_state(context, self.PaintState.NONE)
 							do_refresh = True
@@ -565,7 +631,7 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 							
 				case 'ESC':
 					# Cancel
-					load_active_color(mesh, self._stored_colors)
+					self.restore_colors(context)
 					self.modal_cleanup(context)
 					return {'CANCELLED'}
 				
@@ -574,21 +640,23 @@ class EDITVERTCOL_OT_PaintGradient(Operator):
 			match self._state:
 				case self.PaintState.FIRST:
 					self.position_end = self.get_mouse_3d_pos(context, event)
-					load_active_color(mesh, self._stored_colors)
 					do_refresh = True
 			self._viz_position = self.get_mouse_3d_pos(context, event)
 
 		if do_refresh:
-			# Re-run execute
+			# Re-run execute on the next timer event
 			self.update_status(context)
 			if self._state != self.PaintState.NONE:
-				load_active_color(mesh, self._stored_colors)
-				self.execute(context)
+				self._scheduler.request()
 
 		return {'RUNNING_MODAL'}
 	
 
 	def modal_cleanup(self, context: Context):
+		self._scheduler.stop(context)
+		if self._engine:
+			self._engine.end()
+			self._engine = None
 		context.area.header_text_set(None)
 		SpaceView3D.draw_handler_remove(self._draw_handler, 'WINDOW')
 		context.area.tag_redraw()
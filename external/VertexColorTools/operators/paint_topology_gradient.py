@@ -23,12 +23,13 @@ from ..internal.types import ContextException
 
 from ..internal.topology_gradient import (
 	paint_topology_gradient,
-	TopologyExtentClampMode
+	TopologyExtentClampMode,
+	TopologyStripCache
 	)
 
 from ..preferences import BLEND_MODE_ITEMS
 from ..internal.color_utils import BLEND_MODES, INPT_MODE_ITEMS, HSV_INPT_MODES, RGB_INTP_MODES, HSL_INPT_MODES, OKLAB_INTP_MODES
-from .shared import poll_active_color_attribute, INTP_MODE_ITEMS, HUE_INPT_MODE_ITEMS
+from .shared import poll_active_color_attribute, ModalRefreshScheduler, INTP_MODE_ITEMS, HUE_INPT_MODE_ITEMS
 
 
 TOPOLOGY_GRADIENT_MOUSE_SENSITIVITY = 5.0
@@ -147,6 +148,9 @@ class EDITVERTCOL_OT_PaintGradientTopology(Operator):
 		self._distance = 0.0
 		self._start_coord = None
 		self._stored_colors = None
+		self._strip_cache: TopologyStripCache = None
+		# The topology walk cannot be painted partially, so previews are never coarse
+		self._scheduler = ModalRefreshScheduler(self.refresh, max_preview_step=1)
 
 	@classmethod
 	def poll(cls, context: Context):
@@ -171,7 +175,7 @@ class EDITVERTCOL_OT_PaintGradientTopology(Operator):
 
 		extent_clamp_mode = TopologyExtentClampMode(self.extent_clamp_mode)
 		try:
-			paint_topology_gradient(
+			painted = paint_topology_gradient(
 				mesh,
 				self.mirror,
 				intp_func,
@@ -183,21 +187,35 @@ class EDITVERTCOL_OT_PaintGradientTopology(Operator):
 				self.color_end),
 				self.distance,
 				extent_clamp_mode,
-				self.direction)
+				self.direction,
+				self._strip_cache)
 			
 		except ContextException as e:
 			self.report({'ERROR_INVALID_INPUT'}, e.args[0])
 			return {'CANCELLED'}
 
+		if self._stored_colors is not None:
+			self._stored_colors.mark_dirty(painted)
+
 		return {'FINISHED'}
+
+	def refresh(self, context: Context, preview_step: int) -> bool:
+		'''
+		Repaints the preview, called by the refresh scheduler
+		'''
+		self.distance = ceil(self._distance) if self._snap else self._distance
+		load_active_color(context.active_object.data, self._stored_colors)
+		result = self.execute(context)
+		self.update_status(context)
+		return 'FINISHED' in result
 	
 
 	def update_status(self, context: Context):
 		header = (f"Topology Gradient: {self.distance: .3f}, LMB: Confirm, ESC/RMB: Cancel, "
 			+ f"M: Toggle Mirror ({'ON' if self.mirror else 'OFF'}), "
 			+ f"CTRL: Toggle Snap ({'ON' if self._snap else 'OFF'}), "
-			+ f"H: Toggle Color Clip ({'ON' if self.clip_colors else 'OFF'})")
-		
+			+ f"H: Toggle Color Clip ({'ON' if self.clip_colors else 'OFF'}), "
+			+ f"Preview: {self._scheduler.timing_text()}")
 		context.area.header_text_set(header)
 
 
@@ -238,7 +256,10 @@ class EDITVERTCOL_OT_PaintGradientTopology(Operator):
 
 		self._start_coord = Vector((event.mouse_x, event.mouse_y))
 		self._stored_colors = save_active_color(mesh)
+		# The selection does not change while the modal is running
+		self._strip_cache = TopologyStripCache(mesh)
 
+		self._scheduler.start(context)
 		context.window_manager.modal_handler_add(self) # Start modal
 		return {'RUNNING_MODAL'}
 
@@ -246,6 +267,13 @@ class EDITVERTCOL_OT_PaintGradientTopology(Operator):
 		context.area.tag_redraw()
 		mesh: Mesh = context.active_object.data
 
+		# Repaint coalesced refresh requests
+		if event.type == 'TIMER':
+			if not self._scheduler.tick(context):
+				self.modal_cleanup(context)
+				return {'CANCELLED'}
+			return {'RUNNING_MODAL'}
+
 		do_refresh = False
 
 		if self._snap == event.ctrl:
@@ -266,7 +294,6 @@ class EDITVERTCOL_OT_PaintGradientTopology(Operator):
 			u = Vector(rv3d.view_matrix[1][:3])
 			self.direction[:] = (diff[0] * r + diff[1] * u)[:]
 			self.direction.normalize()
-			load_active_color(mesh, self._stored_colors)
 			self.update_status(context)
 			do_refresh = True
 			
@@ -282,12 +309,10 @@ class EDITVERTCOL_OT_PaintGradientTopology(Operator):
 					self.update_status(context)
 					do_refresh = True
 
-				case 'LEFTMOUSE':
-					self.modal_cleanup(context=context)
-					return {'FINISHED'}
-
-				case 'RET' :
-					# Alternative confirm
+				case 'LEFTMOUSE' | 'RET':
+					if not self._scheduler.flush(context):
+						self.modal_cleanup(context)
+						return {'CANCELLED'}
 					self.modal_cleanup(context=context)
 					return {'FINISHED'}
 							
@@ -298,16 +323,14 @@ class EDITVERTCOL_OT_PaintGradientTopology(Operator):
 					return {'CANCELLED'}
 
 		if do_refresh:
-			self.distance = ceil(self._distance) if self._snap else self._distance
-			load_active_color(mesh, self._stored_colors)
-			if 'FINISHED' not in self.execute(context):
-				self.modal_cleanup(context)
-				return {'CANCELLED'}
+			# Re-run execute on the next timer event
+			self._scheduler.request()
 
 		return {'RUNNING_MODAL'}
 	
 	
 	def modal_cleanup(self, context: Context):
+		self._scheduler.stop(context)
 		context.area.header_text_set(None)
 
 
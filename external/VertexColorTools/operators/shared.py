@@ -1,5 +1,10 @@
 # SPDX-License-Identifier: GPL-2.0-or-later
 
+from bpy.types import Context
+
+from math import ceil
+from time import perf_counter
+
 from ..internal.color_utils import HSV_INPT_MODES, RGB_INTP_MODES
 
 def poll_active_color_attribute(cls, context) -> bool:
@@ -28,3 +33,85 @@ INTP_MODE_ITEMS = [(mode, RGB_INTP_MODES[mode][1], RGB_INTP_MODES[mode][2]) for
 HUE_INPT_MODE_ITEMS = [(mode, HSV_INPT_MODES[mode][1], HSV_INPT_MODES[mode][2]) for mode in HSV_INPT_MODES]
 
 
+
+
+class ModalRefreshScheduler:
+	'''
+	Coalesces the refresh requests of an interactive modal operator.
+	Requests only mark the preview as outdated, the refresh itself runs on the next timer event, so mouse
+	positions that arrive in between are never painted. When a full refresh takes longer than the time budget,
+	previews are painted with a coarser element step until the mouse rests for `idle_delay` seconds or `flush` is called.
+	'''
+
+	def __init__(self,
+			refresh: callable,
+			time_budget: float = 1 / 30,
+			interval: float = 1 / 60,
+			max_preview_step: int = 16,
+			idle_delay: float = 0.2):
+		self.refresh = refresh
+		self.time_budget = time_budget
+		self.interval = interval
+		self.max_preview_step = max_preview_step
+		self.idle_delay = idle_delay
+
+		self.last_refresh_time = 0.0
+		self.last_preview_step = 1
+
+		self._timer = None
+		self._pending = False
+		self._last_request = 0.0
+
+	def start(self, context: Context):
+		self._timer = context.window_manager.event_timer_add(self.interval, window=context.window)
+
+	def stop(self, context: Context):
+		if self._timer is not None:
+			context.window_manager.event_timer_remove(self._timer)
+			self._timer = None
+
+	def request(self):
+		self._pending = True
+		self._last_request = perf_counter()
+
+	@property
+	def preview_step(self) -> int:
+		'''Element step that is expected to fit the time budget, based on the last refresh'''
+		if self.time_budget <= 0:
+			return 1
+		estimate = self.last_refresh_time * self.last_preview_step
+		return max(1, min(self.max_preview_step, ceil(estimate / self.time_budget)))
+
+	def tick(self, context: Context) -> bool:
+		'''
+		Runs the pending refresh, to be called for TIMER events. Returns False if the refresh failed.
+		'''
+		if self._pending:
+			self._pending = False
+			return self._run(context, self.preview_step)
+
+		if self.last_preview_step > 1 and perf_counter() - self._last_request >= self.idle_delay:
+			return self._run(context, 1)
+		return True
+
+	def flush(self, context: Context) -> bool:
+		'''
+		Runs a full resolution refresh if the current preview is outdated or coarse
+		'''
+		if self._pending or self.last_preview_step > 1:
+			self._pending = False
+			return self._run(context, 1)
+		return True
+
+	def timing_text(self) -> str:
+		text = f"{self.last_refresh_time * 1000:.1f} ms"
+		if self.last_preview_step > 1:
+			text += f" (1/{self.last_preview_step})"
+		return text
+
+	def _run(self, context: Context, preview_step: int) -> bool:
+		start = perf_counter()
+		result = self.refresh(context, preview_step)
+		self.last_refresh_time = perf_counter() - start
+		self.last_preview_step = preview_step
+		return result
@@ -98,6 +98,16 @@ class EDITVERTCOL_PropertyGroup(PropertyGroup):
 		default=False,
 		description='Paint only the active face corner of the selected face. Allows painting single vertices even when the color attribute is split between faces')
 
+	gradient_preview_budget: FloatProperty(
+		name="Preview Budget",
+		subtype='TIME_ABSOLUTE',
+		default=0.033,
+		min=0.0,
+		soft_max=0.2,
+		step=1,
+		precision=3,
+		description="Time in seconds an interactive gradient preview may take before it is painted on a subset of the elements. 0 always paints all elements")
+
 
 class EDITVERTCOL_PaletteColor(PropertyGroup):
 	color: FloatVectorProperty(
@@ -20,7 +20,8 @@ from ..operators.edit import (
     EDITVERTCOL_OT_Clip,
     EDITVERTCOL_OT_SelectSimilarVertexColor,
     EDITVERTCOL_OT_CopyColorToSelected,
-    EDITVERTCOL_OT_SelectLinkedVertexColor
+    EDITVERTCOL_OT_SelectLinkedVertexColor,
+    EDITVERTCOL_OT_VertexColorRegions
 )
 
 from ..operators.sidepanel import (
@@ -127,11 +128,13 @@ class EDITVERTCOL_PT_UtilityPanel(Panel):
         row = layout.row()
         row.operator(EDITVERTCOL_OT_PaintGradient.bl_idname, text="Gradient", icon='IPO_LINEAR')
         row.operator(EDITVERTCOL_OT_PaintGradientTopology.bl_idname, text="Topology Gradient", icon='EDGESEL')
+        layout.prop(context.scene.EditVertexColorsProperties, 'gradient_preview_budget')
         layout.label(text="Misc")
         layout.operator(EDITVERTCOL_OT_CopyColorToSelected.bl_idname, text="Copy to Selected from Active", icon='UV_SYNC_SELECT')
         row = layout.row()
         row.operator(EDITVERTCOL_OT_SelectSimilarVertexColor.bl_idname, text="Select Similar")
         row.operator(EDITVERTCOL_OT_SelectLinkedVertexColor.bl_idname, text="Select Linked")
+        layout.operator(EDITVERTCOL_OT_VertexColorRegions.bl_idname, text="Color Regions")
         layout.separator()
         layout.operator(EDITVERTCOL_OT_Preview.bl_idname, icon='SHADING_SOLID')
 
@@ -0,0 +1,305 @@
+import bpy
+import json
+import struct
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from mathutils import Matrix
+
+# Lightweight loader for the simple vertex colored prefabs written by the exporter.
+# The GLB files are decoded in a thread pool without touching bpy, only building the meshes runs on the main thread.
+# Files using anything the loader does not handle raise UnsupportedGLB, so the caller can use the glTF importer instead.
+
+GLB_MAGIC = b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+COMPONENT_TYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32,
+}
+TYPE_WIDTHS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4}
+
+SUPPORTED_ATTRIBUTES = {"POSITION", "NORMAL", "TEXCOORD_0", "COLOR_0"}
+# Features the importer handles and the loader does not
+UNSUPPORTED_KEYS = ("extensionsRequired", "animations", "skins", "images", "textures", "cameras")
+MODE_TRIANGLES = 4
+
+# glTF is Y up and Blender Z up, a point (x, y, z) becomes (x, -z, y)
+Y_UP_TO_Z_UP = np.array([
+    [1.0, 0.0, 0.0, 0.0],
+    [0.0, 0.0, -1.0, 0.0],
+    [0.0, 1.0, 0.0, 0.0],
+    [0.0, 0.0, 0.0, 1.0],
+])
+
+class UnsupportedGLB(Exception):
+    pass
+
+class PrefabMesh:
+    def __init__(self, name, positions, indices, normals=None, uvs=None, colors=None):
+        self.name = name
+        self.positions = positions
+        self.indices = indices
+        self.normals = normals
+        self.uvs = uvs
+        self.colors = colors
+
+class PrefabNode:
+    def __init__(self, name, matrix, mesh=None, children=(), extras=None):
+        self.name = name
+        self.matrix = matrix
+        self.mesh = mesh
+        self.children = list(children)
+        self.extras = extras or {}
+
+class PrefabData:
+    def __init__(self, filepath, meshes, nodes):
+        self.filepath = filepath
+        self.meshes = meshes
+        self.nodes = nodes
+
+def to_z_up(vectors):
+    return np.ascontiguousarray(vectors[:, [0, 2, 1]] * np.array([1.0, -1.0, 1.0], dtype=vectors.dtype))
+
+def read_chunks(data):
+    magic, version, length = struct.unpack_from("<4sII", data, 0)
+    if magic != GLB_MAGIC or version != 2:
+        raise UnsupportedGLB("Not a glTF 2.0 binary")
+
+    document = None
+    binary = b""
+    offset = 12
+    while offset < min(length, len(data)):
+        chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+        chunk = data[offset + 8:offset + 8 + chunk_length]
+        if chunk_type == CHUNK_JSON:
+            document = json.loads(bytes(chunk))
+        elif chunk_type == CHUNK_BIN:
+            binary = chunk
+        offset += 8 + chunk_length
+
+    if document is None:
+        raise UnsupportedGLB("Missing JSON chunk")
+    return document, binary
+
+def check_supported(document):
+    for key in UNSUPPORTED_KEYS:
+        if document.get(key):
+            raise UnsupportedGLB("Uses " + key)
+
+    buffers = document.get("buffers", [])
+    if len(buffers) > 1 or any("uri" in buffer for buffer in buffers):
+        raise UnsupportedGLB("Uses external buffers")
+
+    for node in document.get("nodes", []):
+        if "skin" in node or "camera" in node or "extensions" in node or "weights" in node:
+            raise UnsupportedGLB("Node " + node.get("name", "") + " is not a plain mesh or empty")
+
+    for mesh in document.get("meshes", []):
+        attributes = None
+        for primitive in mesh["primitives"]:
+            if primitive.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES or "targets" in primitive:
+                raise UnsupportedGLB("Mesh " + mesh.get("name", "") + " is not a plain triangle mesh")
+            if not set(primitive["attributes"]) <= SUPPORTED_ATTRIBUTES:
+                raise UnsupportedGLB("Mesh " + mesh.get("name", "") + " uses unsupported attributes")
+            # Merged into one mesh, so every primitive needs the same attributes
+            if attributes is not None and set(primitive["attributes"]) != attributes:
+                raise UnsupportedGLB("Mesh " + mesh.get("name", "") + " has primitives with different attributes")
+            attributes = set(primitive["attributes"])
+
+def read_accessor(document, binary, index):
+    """
+    Values of the accessor as a (count, width) view into the binary chunk, normalized integers as floats
+    """
+    accessor = document["accessors"][index]
+    if "sparse" in accessor or "bufferView" not in accessor:
+        raise UnsupportedGLB("Uses sparse or empty accessors")
+
+    view = document["bufferViews"][accessor["bufferView"]]
+    dtype = np.dtype(COMPONENT_TYPES[accessor["componentType"]])
+    width = TYPE_WIDTHS[accessor["type"]]
+    offset = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    stride = view.get("byteStride") or dtype.itemsize * width
+    values = np.ndarray((accessor["count"], width), dtype=dtype, buffer=binary, offset=offset,
+                        strides=(stride, dtype.itemsize))
+
+    if accessor.get("normalized") and dtype.kind in "iu":
+        values = np.maximum(values.astype(np.float32) / np.iinfo(dtype).max, -1.0)
+    return values
+
+def read_mesh(document, binary, mesh):
+    positions = []
+    indices = []
+    normals = []
+    uvs = []
+    colors = []
+    vertex_count = 0
+    for primitive in mesh["primitives"]:
+        attributes = primitive["attributes"]
+        primitive_positions = read_accessor(document, binary, attributes["POSITION"])
+        positions.append(to_z_up(primitive_positions.astype(np.float32)))
+        if "indices" in primitive:
+            primitive_indices = read_accessor(document, binary, primitive["indices"]).ravel()
+        else:
+            primitive_indices = np.arange(len(primitive_positions))
+        # Blender would read out of range indices as garbage or crash
+        if len(primitive_indices) % 3 != 0 or (len(primitive_indices) > 0 and
+                                               primitive_indices.max() >= len(primitive_positions)):
+            raise UnsupportedGLB("Mesh " + mesh.get("name", "") + " has invalid indices")
+        indices.append(primitive_indices.astype(np.int32) + vertex_count)
+        vertex_count += len(primitive_positions)
+
+        for key in ("NORMAL", "TEXCOORD_0", "COLOR_0"):
+            if key in attributes and document["accessors"][attributes[key]]["count"] != len(primitive_positions):
+                raise UnsupportedGLB("Mesh " + mesh.get("name", "") + " has a " + key + " count not matching its vertices")
+
+        if "NORMAL" in attributes:
+            normals.append(to_z_up(read_accessor(document, binary, attributes["NORMAL"]).astype(np.float32)))
+        if "TEXCOORD_0" in attributes:
+            uv = read_accessor(document, binary, attributes["TEXCOORD_0"]).astype(np.float32)
+            # glTF puts the UV origin at the top left, Blender at the bottom left
+            uv[:, 1] = 1.0 - uv[:, 1]
+            uvs.append(uv)
+        if "COLOR_0" in attributes:
+            color = read_accessor(document, binary, attributes["COLOR_0"]).astype(np.float32)
+            if color.shape[1] == 3:
+                color = np.hstack((color, np.ones((len(color), 1), dtype=np.float32)))
+            colors.append(color)
+
+    return PrefabMesh(
+        mesh.get("name", "Mesh"),
+        np.concatenate(positions),
+        np.concatenate(indices),
+        np.concatenate(normals) if normals else None,
+        np.concatenate(uvs) if uvs else None,
+        np.concatenate(colors) if colors else None,
+    )
+
+def quaternion_to_matrix(x, y, z, w):
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+
+def node_matrix(node):
+    if "matrix" in node:
+        # Stored column major
+        matrix = np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+    else:
+        matrix = np.identity(4)
+        matrix[:3, :3] = quaternion_to_matrix(*node.get("rotation", (0.0, 0.0, 0.0, 1.0))) * node.get("scale", (1.0, 1.0, 1.0))
+        matrix[:3, 3] = node.get("translation", (0.0, 0.0, 0.0))
+    return Y_UP_TO_Z_UP @ matrix @ Y_UP_TO_Z_UP.T
+
+def parse_glb(filepath):
+    """
+    Decodes a GLB file into a PrefabData, raises UnsupportedGLB if it needs the importer.
+    Does not use bpy, so it can run on any thread.
+    """
+    with open(filepath, "rb") as file:
+        data = memoryview(file.read())
+
+    try:
+        document, binary = read_chunks(data)
+        check_supported(document)
+        meshes = [read_mesh(document, binary, mesh) for mesh in document.get("meshes", [])]
+        nodes = [PrefabNode(node.get("name", "Node"), node_matrix(node), node.get("mesh"), node.get("children", ()),
+                            node.get("extras")) for node in document.get("nodes", [])]
+        for node in nodes:
+            if node.mesh is not None and not 0 <= node.mesh < len(meshes):
+                raise UnsupportedGLB("Node " + node.name + " uses a missing mesh")
+            if any(not 0 <= child < len(nodes) for child in node.children):
+                raise UnsupportedGLB("Node " + node.name + " has missing children")
+    except (KeyError, IndexError, TypeError, ValueError, struct.error) as err:
+        raise UnsupportedGLB("Could not decode: " + str(err))
+    return PrefabData(filepath, meshes, nodes)
+
+def try_parse_glb(filepath):
+    try:
+        return parse_glb(filepath)
+    except (UnsupportedGLB, OSError) as err:
+        print("Importing " + filepath + " with the glTF importer: " + str(err))
+        return None
+
+def parse_glb_files(filepaths, max_workers=None):
+    """
+    Decodes the files in a thread pool, returns a dictionary of file path to PrefabData, or None for the
+    files that need the importer
+    """
+    if not filepaths:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(filepaths, pool.map(try_parse_glb, filepaths)))
+
+def build_mesh(prefab_mesh):
+    mesh = bpy.data.meshes.new(prefab_mesh.name)
+    try:
+        loop_count = len(prefab_mesh.indices)
+        face_count = loop_count // 3
+
+        mesh.vertices.add(len(prefab_mesh.positions))
+        mesh.vertices.foreach_set("co", prefab_mesh.positions.ravel())
+        mesh.loops.add(loop_count)
+        mesh.loops.foreach_set("vertex_index", prefab_mesh.indices)
+        mesh.polygons.add(face_count)
+        mesh.polygons.foreach_set("loop_start", np.arange(0, loop_count, 3, dtype=np.int32))
+        # Derived from the loop starts since Blender 4.0
+        if bpy.app.version < (4, 0, 0):
+            mesh.polygons.foreach_set("loop_total", np.full(face_count, 3, dtype=np.int32))
+
+        if prefab_mesh.uvs is not None:
+            uv_layer = mesh.uv_layers.new(name="UVMap")
+            uv_layer.data.foreach_set("uv", prefab_mesh.uvs[prefab_mesh.indices].ravel())
+        if prefab_mesh.colors is not None:
+            color_attribute = mesh.attributes.new("Color", 'FLOAT_COLOR', 'POINT')
+            color_attribute.data.foreach_set("color", prefab_mesh.colors.ravel())
+            if hasattr(mesh, "color_attributes"):
+                mesh.color_attributes.active_color = color_attribute
+
+        mesh.update(calc_edges=True)
+        # Removes degenerate faces (e.g. a vertex used twice), the face count may change
+        mesh.validate()
+
+        if prefab_mesh.normals is not None:
+            mesh.polygons.foreach_set("use_smooth", np.ones(len(mesh.polygons), dtype=bool))
+            # Blender < 4.1
+            if hasattr(mesh, "use_auto_smooth"):
+                mesh.use_auto_smooth = True
+            mesh.normals_split_custom_set_from_vertices(prefab_mesh.normals)
+    except Exception:
+        bpy.data.meshes.remove(mesh)
+        raise
+    return mesh
+
+def build_prefab(prefab, collection):
+    """
+    Creates the objects of a decoded prefab in the collection, returns them in node order.
+    If building fails the meshes and objects created so far are removed before the error is raised.
+    """
+    meshes = []
+    objects = []
+    try:
+        for prefab_mesh in prefab.meshes:
+            meshes.append(build_mesh(prefab_mesh))
+        for node in prefab.nodes:
+            obj = bpy.data.objects.new(node.name, meshes[node.mesh] if node.mesh is not None else None)
+            objects.append(obj)
+            obj.matrix_basis = Matrix(node.matrix.tolist())
+            # Extras are imported as custom properties
+            for key, value in node.extras.items():
+                if isinstance(value, (int, float, str)):
+                    obj[key] = value
+            collection.objects.link(obj)
+
+        for node, obj in zip(prefab.nodes, objects):
+            for child in node.children:
+                objects[child].parent = obj
+    except Exception:
+        bpy.data.batch_remove(objects + meshes)
+        raise
+    return objects
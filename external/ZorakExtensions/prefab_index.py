@@ -0,0 +1,137 @@
+import bpy
+import re
+from bpy.app.handlers import persistent
+
+# Prefab empties are named "<name>_prefab-<ID>", possibly followed by a ".001" suffix
+PREFAB_PATTERN = re.compile(r"_prefab-(\d+)")
+
+def get_prefab_id(obj):
+    if obj.type != 'EMPTY':
+        return None
+    match = PREFAB_PATTERN.search(obj.name)
+    return match.group(1) if match else None
+
+class PrefabIndex:
+    """
+    Prefab empties of a scene by prefab ID, built with a single pass over the scene objects and updated
+    from the depsgraph handler when empties are added, renamed or deleted.
+    The prefabs nested in a collection are indexed the first time they are asked for.
+    """
+
+    def __init__(self, scene):
+        self.__scene = scene.as_pointer()
+        # object pointer -> (object, prefab ID)
+        self.__ids = {}
+        # prefab ID -> {object pointer: object}
+        self.__empties = {}
+        # collection pointer -> {prefab ID: [objects]}
+        self.__nested = {}
+        self.object_count = len(bpy.data.objects)
+        self.add_objects(scene.objects)
+
+    def is_for(self, scene):
+        return scene.as_pointer() == self.__scene
+
+    def prefab_ids(self):
+        return list(self.__empties)
+
+    def empties(self, prefab_id):
+        return list(self.__empties.get(prefab_id, {}).values())
+
+    def all_empties(self):
+        return [obj for obj, prefab_id in self.__ids.values()]
+
+    def nested(self, collection):
+        """
+        Prefab ID to empties of the collection, the edges from a prefab to the prefabs nested in it
+        """
+        key = collection.as_pointer()
+        if key not in self.__nested:
+            nested = {}
+            for obj in collection.objects:
+                prefab_id = get_prefab_id(obj)
+                if prefab_id is not None:
+                    nested.setdefault(prefab_id, []).append(obj)
+            self.__nested[key] = nested
+        return self.__nested[key]
+
+    def add_objects(self, objects):
+        for obj in objects:
+            self.update_object(obj)
+
+    def update_object(self, obj):
+        key = obj.as_pointer()
+        prefab_id = get_prefab_id(obj)
+        previous = self.__ids.get(key)
+        if previous is not None and previous[1] == prefab_id:
+            return
+        if previous is not None:
+            self.__remove(key)
+        if prefab_id is not None:
+            self.__ids[key] = (obj, prefab_id)
+            self.__empties.setdefault(prefab_id, {})[key] = obj
+        # The nested prefabs of the collections holding the object changed
+        if self.__nested:
+            for collection in obj.users_collection:
+                self.__nested.pop(collection.as_pointer(), None)
+
+    def remove_deleted(self):
+        for key, (obj, prefab_id) in list(self.__ids.items()):
+            try:
+                obj.name
+            except ReferenceError:
+                self.__remove(key)
+        self.__nested.clear()
+
+    def __remove(self, key):
+        obj, prefab_id = self.__ids.pop(key)
+        empties = self.__empties[prefab_id]
+        del empties[key]
+        if not empties:
+            del self.__empties[prefab_id]
+
+_index = None
+
+def get_prefab_index(scene):
+    """
+    Returns the prefab index of the scene, built on first use
+    """
+    global _index
+    if _index is None or not _index.is_for(scene):
+        _index = PrefabIndex(scene)
+    return _index
+
+def invalidate_prefab_index():
+    global _index
+    _index = None
+
+@persistent
+def _depsgraph_update_handler(scene, depsgraph):
+    if _index is None or not _index.is_for(scene) or not depsgraph.id_type_updated('OBJECT'):
+        return
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            _index.update_object(update.id.original)
+    # Deleted objects are not part of the updates
+    object_count = len(bpy.data.objects)
+    if object_count != _index.object_count:
+        _index.remove_deleted()
+        _index.object_count = object_count
+
+@persistent
+def _invalidate_handler(*args):
+    # Loading a file or undoing replaces all objects
+    invalidate_prefab_index()
+
+def register_handlers():
+    bpy.app.handlers.depsgraph_update_post.append(_depsgraph_update_handler)
+    bpy.app.handlers.load_post.append(_invalidate_handler)
+    bpy.app.handlers.undo_post.append(_invalidate_handler)
+    bpy.app.handlers.redo_post.append(_invalidate_handler)
+
+def unregister_handlers():
+    bpy.app.handlers.redo_post.remove(_invalidate_handler)
+    bpy.app.handlers.undo_post.remove(_invalidate_handler)
+    bpy.app.handlers.load_post.remove(_invalidate_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(_depsgraph_update_handler)
+    invalidate_prefab_index()
@@ -1,12 +1,58 @@
 import bpy
 import os
-import re
+from .glb_loader import parse_glb_files, try_parse_glb, build_prefab
+from .prefab_index import get_prefab_index, invalidate_prefab_index
+from .visibility import VisibilityManager
 
 # Path to the folder containing your .glb files
 glb_path = os.path.expanduser("~\\AppData\\LocalLow\\01 Studio\\CitywarsSavage\\glbFiles")
 
+# Custom properties of the prefab library collections, identifying the file they were imported from
+LIBRARY_PATH_KEY = "cw_prefab_path"
+LIBRARY_SIZE_KEY = "cw_prefab_size"
+LIBRARY_MTIME_KEY = "cw_prefab_mtime"
+
+# Custom property of the Instances collection listing the datablocks created for each prefab ID
+REGISTRY_KEY = "cw_prefab_registry"
+# bpy.data collections of the registered datablocks
+REGISTRY_TYPES = ("collections", "objects", "meshes", "materials", "images")
+# Custom property tagging every registered datablock with the ID of the prefab it was created for
+PREFAB_ID_KEY = "cw_prefab_id"
+
+# GLB files decoded ahead by preload_prefabs, waiting to be built by instantiate_glb
+decoded_prefabs = {}
+
+# Library collections by the GLB file they were imported from, see get_library_collections
+library_collections = None
+
+def preload_prefabs(prefab_ids, collection_mapping):
+    # Decodes the GLB files of the prefabs that have to be imported, in parallel
+    glb_files = []
+    for prefab_id in prefab_ids:
+        if prefab_id not in collection_mapping:
+            glb_file = os.path.join(glb_path, f"{prefab_id}.glb")
+            if (glb_file not in decoded_prefabs and os.path.exists(glb_file)
+                    and get_library_collection(glb_file) is None):
+                glb_files.append(glb_file)
+    decoded_prefabs.update(parse_glb_files(glb_files))
+
 def instantiate_glb(glb_file, collection_name):
-    # Import the GLB file
+    if glb_file in decoded_prefabs:
+        prefab = decoded_prefabs.pop(glb_file)
+    else:
+        prefab = try_parse_glb(glb_file)
+
+    if prefab is not None:
+        new_collection = bpy.data.collections.new(collection_name)
+        try:
+            build_prefab(prefab, new_collection)
+            return new_collection
+        except Exception as err:
+            # build_prefab already removed its partial datablocks
+            bpy.data.collections.remove(new_collection)
+            print("Importing " + glb_file + " with the glTF importer: " + str(err))
+
+    # Fall back to the glTF importer for files the loader does not support
     bpy.ops.import_scene.gltf(filepath=glb_file)
     
     # The imported objects will be selected, so we can move them to a new collection
@@ -22,70 +68,188 @@ def instantiate_glb(glb_file, collection_name):
     
     return new_collection
 
-def exclude_collection_from_view_layer(view_layer, collection_name):
-    layer_collection = view_layer.layer_collection
-    collections = [layer_collection]
-    while collections:
-        collection = collections.pop()
-        if collection.name == collection_name:
-            collection.exclude = True
-        else:
-            collections.extend(collection.children)
-
-def include_all_collections(view_layer):
-    layer_collection = view_layer.layer_collection
-    collections = [layer_collection]
-    while collections:
-        collection = collections.pop()
-        collection.exclude = False
-        collections.extend(collection.children)
-
-def instantiate_objects():
+def is_library_collection(collection):
+    return LIBRARY_PATH_KEY in collection
+
+def get_library_collections():
+    # Library collections are found by their file and not by name, a user collection may already use the prefab ID as name.
+    # The map is built with one pass over the collections and kept until reset_library_collections.
+    global library_collections
+    if library_collections is None:
+        library_collections = {}
+        for collection in bpy.data.collections:
+            if is_library_collection(collection):
+                library_collections[collection[LIBRARY_PATH_KEY]] = collection
+    return library_collections
+
+def reset_library_collections():
+    global library_collections
+    library_collections = None
+
+def get_instances_collection():
     # Create or get the master collection "Instances"
     if "Instances" not in bpy.data.collections:
         instances_collection = bpy.data.collections.new("Instances")
         bpy.context.scene.collection.children.link(instances_collection)
     else:
         instances_collection = bpy.data.collections["Instances"]
+    return instances_collection
 
-    # Get the current view layer
-    view_layer = bpy.context.view_layer
+def get_prefab_datablocks(collection):
+    # The collection, its objects and the meshes, materials and images they use
+    datablocks = {"collections": [collection], "objects": [], "meshes": [], "materials": [], "images": []}
+    for obj in collection.objects:
+        datablocks["objects"].append(obj)
+        if obj.type != 'MESH':
+            continue
+        if obj.data not in datablocks["meshes"]:
+            datablocks["meshes"].append(obj.data)
+        for slot in obj.material_slots:
+            material = slot.material
+            if material is None or material in datablocks["materials"]:
+                continue
+            datablocks["materials"].append(material)
+            if material.node_tree:
+                for node in material.node_tree.nodes:
+                    if node.type == 'TEX_IMAGE' and node.image and node.image not in datablocks["images"]:
+                        datablocks["images"].append(node.image)
+    return datablocks
+
+def register_prefab(prefab_id, collection):
+    # Records and tags the datablocks created for the prefab, so removing it does not have to search the whole file
+    # and never removes a user datablock that took over a freed name
+    instances_collection = get_instances_collection()
+    if REGISTRY_KEY not in instances_collection:
+        instances_collection[REGISTRY_KEY] = {}
+    datablocks = get_prefab_datablocks(collection)
+    for data_type in REGISTRY_TYPES:
+        for datablock in datablocks[data_type]:
+            datablock[PREFAB_ID_KEY] = prefab_id
+    instances_collection[REGISTRY_KEY][prefab_id] = {
+        data_type: [datablock.name for datablock in datablocks[data_type]] for data_type in REGISTRY_TYPES
+    }
+
+def get_registered_prefabs():
+    instances_collection = bpy.data.collections.get("Instances")
+    if instances_collection is None or REGISTRY_KEY not in instances_collection:
+        return {}
+    return instances_collection[REGISTRY_KEY]
+
+def remove_prefab_collections(collections):
+    # Removes the collections and their objects with one batch_remove, then the meshes, materials and images
+    # they used that have no users left. Datablocks of registered prefabs are only removed if they carry its tag,
+    # collections without a prefab ID were imported before the registry existed and all their objects are removed.
+    registry = get_registered_prefabs()
+    datablocks = {data_type: [] for data_type in REGISTRY_TYPES}
+    for collection in collections:
+        prefab_id = collection.get(PREFAB_ID_KEY)
+        found = get_prefab_datablocks(collection)
+        if prefab_id is not None and prefab_id in registry:
+            # Registered datablocks that are no longer reachable from the collection
+            entry = registry[prefab_id]
+            for data_type in REGISTRY_TYPES:
+                data = getattr(bpy.data, data_type)
+                for name in entry.get(data_type, ()):
+                    datablock = data.get(name)
+                    if datablock is not None and datablock not in found[data_type]:
+                        found[data_type].append(datablock)
+            del registry[prefab_id]
+        for data_type in REGISTRY_TYPES:
+            for datablock in found[data_type]:
+                if prefab_id is not None and datablock.get(PREFAB_ID_KEY) != prefab_id:
+                    continue
+                if datablock not in datablocks[data_type]:
+                    datablocks[data_type].append(datablock)
+
+    if not datablocks["collections"]:
+        return
+    bpy.data.batch_remove(datablocks["collections"] + datablocks["objects"])
+    # Meshes use the materials and materials the images, so every step frees the users of the next one
+    for data_type in ("meshes", "materials", "images"):
+        unused = [datablock for datablock in datablocks[data_type] if datablock.users == 0]
+        if unused:
+            bpy.data.batch_remove(unused)
+    invalidate_prefab_index()
+    reset_library_collections()
+
+def get_library_collection(glb_file):
+    # The library collection of the prefab, if it was imported from the current version of its file
+    collection = get_library_collections().get(glb_file)
+    if collection is None:
+        return None
+    stat = os.stat(glb_file)
+    if (collection[LIBRARY_PATH_KEY] == glb_file
+            and collection[LIBRARY_SIZE_KEY] == stat.st_size
+            and collection[LIBRARY_MTIME_KEY] == stat.st_mtime):
+        return collection
+    return None
+
+def get_library_prefab(glb_file, prefab_id):
+    # Imported prefabs are kept as library collections with a fake user, so they survive remove_instances.
+    # A prefab is only imported again when its file path, size or modification time changed.
+    collection = get_library_collection(glb_file)
+    if collection is not None:
+        return collection
+    # Imported from an older version of the file
+    stale_collection = get_library_collections().get(glb_file)
+    if stale_collection is not None:
+        remove_prefab_collections([stale_collection])
+
+    stat = os.stat(glb_file)
+    collection = instantiate_glb(glb_file, prefab_id)
+    collection.use_fake_user = True
+    collection[LIBRARY_PATH_KEY] = glb_file
+    collection[LIBRARY_SIZE_KEY] = stat.st_size
+    collection[LIBRARY_MTIME_KEY] = stat.st_mtime
+    register_prefab(prefab_id, collection)
+    get_library_collections()[glb_file] = collection
+    return collection
+
+def clear_prefab_library():
+    remove_instances()
+    # All library collections, including the ones cached before the registry existed
+    reset_library_collections()
+    remove_prefab_collections(list(get_library_collections().values()))
+
+def instantiate_objects():
+    instances_collection = get_instances_collection()
+    # Collections may have been added, removed or renamed since the last instantiation
+    reset_library_collections()
 
     # Dictionary to store prefab_id to collection mapping
     collection_mapping = {}
+    prefab_ids = get_prefab_index(bpy.context.scene).prefab_ids()
+    preload_prefabs(prefab_ids, collection_mapping)
+
+    for prefab_id in prefab_ids:
+        glb_file = os.path.join(glb_path, f"{prefab_id}.glb")
 
-    # Iterate through all objects in the scene
-    for obj in bpy.context.scene.objects:
-        if obj.type == 'EMPTY' and re.search(r"_prefab-\d+(\.\d+)?", obj.name):
-            # Extract the ID from the empty object name
-            match = re.search(r"_prefab-(\d+)", obj.name)
-            if match:
-                prefab_id = match.group(1)
-                if prefab_id not in collection_mapping:
-                    glb_file = os.path.join(glb_path, f"{prefab_id}.glb")
-                    
-                    # Check if the GLB file exists
-                    if os.path.exists(glb_file):
-                        new_collection = instantiate_glb(glb_file, prefab_id)
-                        if new_collection:
-                            instances_collection.children.link(new_collection)
-                            exclude_collection_from_view_layer(view_layer, new_collection.name)
-                            collection_mapping[prefab_id] = new_collection
+        # Check if the GLB file exists
+        if os.path.exists(glb_file):
+            new_collection = get_library_prefab(glb_file, prefab_id)
+            if new_collection:
+                if new_collection.name not in instances_collection.children:
+                    instances_collection.children.link(new_collection)
+                    get_prefab_index(bpy.context.scene).add_objects(new_collection.objects)
+                collection_mapping[prefab_id] = new_collection
 
     # Instantiate collections on empty objects with matching numbers
-    for obj in bpy.context.scene.objects:
-        if obj.type == 'EMPTY' and re.search(r"_prefab-\d+(\.\d+)?", obj.name):
-            # Extract the ID from the empty object name
-            match = re.search(r"_prefab-(\d+)", obj.name)
-            if match:
-                prefab_id = match.group(1)
-                if prefab_id in collection_mapping:
-                    obj.instance_type = 'COLLECTION'
-                    obj.instance_collection = collection_mapping[prefab_id]
+    # The index is fetched again, re-importing a changed prefab invalidates it
+    prefab_index = get_prefab_index(bpy.context.scene)
+    for prefab_id, new_collection in list(collection_mapping.items()):
+        for obj in prefab_index.empties(prefab_id):
+            obj.instance_type = 'COLLECTION'
+            obj.instance_collection = new_collection
 
     # Check for nested _prefab-<ID> objects in imported collections
     for collection in instances_collection.children:
-        check_nested_prefabs(collection, collection_mapping, instances_collection, view_layer)
+        check_nested_prefabs(collection, collection_mapping, instances_collection)
+    decoded_prefabs.clear()
+
+    # Exclude all prefab collections at once, now that they are linked
+    with VisibilityManager(bpy.context.view_layer) as visibility:
+        for new_collection in collection_mapping.values():
+            visibility.set_exclude(new_collection.name)
 
     # Set show_instancer to True by default after instantiation
     bpy.context.scene.show_instancer = True
@@ -94,62 +258,54 @@ def instantiate_objects():
     # Set the default display type to 'TEXTURED' (Vertex Color) for all _prefab-# objects
     update_display_type('TEXTURED')
 
-def check_nested_prefabs(collection, collection_mapping, instances_collection, view_layer):
-    for obj in collection.objects:
-        if obj.type == 'EMPTY' and re.search(r"_prefab-\d+(\.\d+)?", obj.name):
-            match = re.search(r"_prefab-(\d+)", obj.name)
-            if match:
-                prefab_id = match.group(1)
-                if prefab_id not in collection_mapping:
-                    glb_file = os.path.join(glb_path, f"{prefab_id}.glb")
-                    if os.path.exists(glb_file):
-                        new_collection = instantiate_glb(glb_file, prefab_id)
-                        if new_collection:
-                            collection.children.link(new_collection)  # Link to parent collection
-                            exclude_collection_from_view_layer(view_layer, new_collection.name)
-                            collection_mapping[prefab_id] = new_collection
-                            obj.instance_type = 'COLLECTION'
-                            obj.instance_collection = new_collection
-                            check_nested_prefabs(new_collection, collection_mapping, instances_collection, view_layer)
+def check_nested_prefabs(collection, collection_mapping, instances_collection):
+    nested_prefabs = get_prefab_index(bpy.context.scene).nested(collection)
+    preload_prefabs(nested_prefabs, collection_mapping)
+    for prefab_id, empties in nested_prefabs.items():
+        if prefab_id not in collection_mapping:
+            glb_file = os.path.join(glb_path, f"{prefab_id}.glb")
+            if os.path.exists(glb_file):
+                new_collection = get_library_prefab(glb_file, prefab_id)
+                if new_collection:
+                    if new_collection.name not in collection.children:
+                        collection.children.link(new_collection)  # Link to parent collection
+                        get_prefab_index(bpy.context.scene).add_objects(new_collection.objects)
+                    collection_mapping[prefab_id] = new_collection
+                    for obj in empties:
+                        obj.instance_type = 'COLLECTION'
+                        obj.instance_collection = new_collection
+                    check_nested_prefabs(new_collection, collection_mapping, instances_collection)
 
 def remove_instances():
     if "Instances" in bpy.data.collections:
         instances_collection = bpy.data.collections["Instances"]
-        # Unlink and remove all objects in the Instances collection and its children
+        # Collections instantiated before the prefab library are removed with their objects
+        removed_collections = []
+        unlinked = set()
+        for sub_collection in list(instances_collection.children):
+            # Library prefabs are only unlinked, they are reused by the next instantiation
+            if is_library_collection(sub_collection):
+                unlinked.add(sub_collection.as_pointer())
+            else:
+                removed_collections.append(sub_collection)
+
+        # Removing a collection clears the empties instancing it, unlinking doesn't
+        for empty in get_prefab_index(bpy.context.scene).all_empties():
+            collection = empty.instance_collection
+            if collection is not None and collection.as_pointer() in unlinked:
+                empty.instance_collection = None
+                empty.instance_type = 'NONE'
+
         for sub_collection in list(instances_collection.children):
-            for obj in list(sub_collection.objects):
-                bpy.data.objects.remove(obj, do_unlink=True)
-            bpy.data.collections.remove(sub_collection)
-        # Clean up orphaned data blocks
-        orphan_cleanup()
+            if sub_collection.as_pointer() in unlinked:
+                instances_collection.children.unlink(sub_collection)
+        remove_prefab_collections(removed_collections)
+        # The unlinked library prefabs left the scene
+        invalidate_prefab_index()
         # Set show_instancer back to True
         bpy.context.scene.show_instancer = True
         toggle_instancer_visibility(True)
 
-def orphan_cleanup():
-    # Remove orphaned meshes
-    for mesh in bpy.data.meshes:
-        if mesh.users == 0:
-            bpy.data.meshes.remove(mesh)
-    # Remove orphaned materials
-    for material in bpy.data.materials:
-        if material.users == 0:
-            bpy.data.materials.remove(material)
-    # Remove orphaned textures
-    for texture in bpy.data.textures:
-        if texture.users == 0:
-            bpy.data.textures.remove(texture)
-    # Remove orphaned images
-    for image in bpy.data.images:
-        if image.users == 0:
-            bpy.data.images.remove(image)
-    # Remove orphaned collections
-    for collection in bpy.data.collections:
-        if collection.users == 0:
-            bpy.data.collections.remove(collection)
-    # Purge all unused data blocks
-    bpy.ops.outliner.orphans_purge()
-
 def get_prefab_collections():
     collections = []
     if "Instances" in bpy.data.collections:
@@ -159,42 +315,22 @@ def get_prefab_collections():
     return collections
 
 def toggle_visibility(collection_name):
-    view_layer = bpy.context.view_layer
-    layer_collection = view_layer.layer_collection
-    collections = [layer_collection]
-    while collections:
-        collection = collections.pop()
-        if collection.name == collection_name:
-            collection.exclude = not collection.exclude
-        else:
-            collections.extend(collection.children)
+    with VisibilityManager(bpy.context.view_layer) as visibility:
+        visibility.toggle_exclude(collection_name)
 
     # Update the custom property for UI icon change
     collection = bpy.data.collections[collection_name]
     collection["is_visible"] = not collection.get("is_visible", True)
 
 def update_display_type(display_type):
-    view_layer = bpy.context.view_layer
-    instances_collection = bpy.data.collections.get("Instances")
-
-    if instances_collection:
-        # Include all collections in the view layer
-        include_all_collections(view_layer)
-
-        # Update the display type for all _prefab-# objects
-        prefab_pattern = re.compile(r"_prefab-\d+(\.\d+)?")
-        for obj in bpy.context.scene.objects:
-            if prefab_pattern.match(obj.name):
-                obj.display_type = display_type
-
-        # Re-exclude all collections in the Instances collection
-        for collection in instances_collection.children:
-            exclude_collection_from_view_layer(view_layer, collection.name)
+    if "Instances" in bpy.data.collections:
+        # Update the display type for all _prefab-# objects, the instance collections stay excluded
+        with VisibilityManager(bpy.context.view_layer) as visibility:
+            visibility.set_display_type(get_prefab_index(bpy.context.scene).all_empties(), display_type)
 
 def toggle_instancer_visibility(show_instancer):
-    prefab_pattern = re.compile(r"_prefab-\d+(\.\d+)?")
-    for obj in bpy.context.scene.objects:
-        if prefab_pattern.match(obj.name) and obj.instance_type == 'COLLECTION':
+    for obj in get_prefab_index(bpy.context.scene).all_empties():
+        if obj.instance_type == 'COLLECTION':
             obj.show_instancer_for_viewport = show_instancer
 
 class PREFABMANAGER_UL_List(bpy.types.UIList):
@@ -219,6 +355,7 @@ class PREFABMANAGER_OT_Popover(bpy.types.Operator):
         layout = self.layout
         layout.operator("object.instantiate_objects", text="Instantiate Prefabs")
         layout.operator("prefab_manager.remove_instances", text="Remove Instances")
+        layout.operator("prefab_manager.clear_library", text="Clear Prefab Library")
         
         prefab_collections = get_prefab_collections()
         if prefab_collections:
@@ -239,6 +376,16 @@ class PREFABMANAGER_OT_RemoveInstances(bpy.types.Operator):
         remove_instances()
         return {'FINISHED'}
 
+class PREFABMANAGER_OT_ClearLibrary(bpy.types.Operator):
+    bl_label = "Clear Prefab Library"
+    bl_idname = "prefab_manager.clear_library"
+    bl_description = "Remove the instances and all cached prefab imports, so the next instantiation imports every prefab again"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        clear_prefab_library()
+        return {'FINISHED'}
+
 class PREFABMANAGER_OT_ToggleVisibility(bpy.types.Operator):
     bl_label = "Toggle Visibility"
     bl_idname = "prefab_manager.toggle_visibility"
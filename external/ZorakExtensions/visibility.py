@@ -0,0 +1,61 @@
+class VisibilityManager:
+    """
+    Name to LayerCollection map of a view layer, built with a single walk of its layer collection tree.
+    Exclude and display type changes are queued and applied together by apply(), skipping the ones that
+    would not change anything, so the depsgraph is only tagged for real changes.
+    LayerCollections are not ID blocks and become invalid when collections are linked or removed,
+    so a manager is only meant to be used for one batch of changes.
+    """
+
+    def __init__(self, view_layer):
+        self.view_layer = view_layer
+        # A collection linked into several parents has a LayerCollection for each of them
+        self.__layers = {}
+        self.__excludes = {}
+        self.__display_types = {}
+
+        layer_collections = list(view_layer.layer_collection.children)
+        while layer_collections:
+            layer_collection = layer_collections.pop()
+            self.__layers.setdefault(layer_collection.name, []).append(layer_collection)
+            layer_collections.extend(layer_collection.children)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.apply()
+
+    def layer_collections(self, collection_name):
+        return list(self.__layers.get(collection_name, ()))
+
+    def is_excluded(self, collection_name):
+        if collection_name in self.__excludes:
+            return self.__excludes[collection_name]
+        layers = self.__layers.get(collection_name)
+        return bool(layers) and layers[0].exclude
+
+    def set_exclude(self, collection_name, exclude=True):
+        self.__excludes[collection_name] = exclude
+
+    def toggle_exclude(self, collection_name):
+        exclude = not self.is_excluded(collection_name)
+        self.set_exclude(collection_name, exclude)
+        return exclude
+
+    def set_display_type(self, objects, display_type):
+        # Object display types do not depend on the view layer, the collections can stay excluded
+        for obj in objects:
+            self.__display_types[obj.as_pointer()] = (obj, display_type)
+
+    def apply(self):
+        for collection_name, exclude in self.__excludes.items():
+            for layer_collection in self.__layers.get(collection_name, ()):
+                if layer_collection.exclude != exclude:
+                    layer_collection.exclude = exclude
+        for obj, display_type in self.__display_types.values():
+            if obj.display_type != display_type:
+                obj.display_type = display_type
+        self.__excludes.clear()
+        self.__display_types.clear()
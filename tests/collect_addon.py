@@ -0,0 +1,13 @@
+# pytest plugin, loaded by pytest.ini.
+# The add-on folder is a package whose __init__ needs Blender, it is collected as a plain directory
+# so the tests can import single modules of the add-on without it.
+import os
+
+import pytest
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def pytest_collect_directory(path, parent):
+  if str(path) == ADDON_DIR:
+    return pytest.Dir.from_parent(parent, path=path)
+  return None
@@ -0,0 +1,110 @@
+# Benchmark of the hierarchy index in cw_hierarchy against the recursive scan of bpy.data.objects it replaces.
+#
+# bpy.data.objects is a list of stand-in objects with a parent and a pointer, enough for HierarchyIndex.
+# Runs without Blender:
+#
+#   python -m pytest tests
+
+import importlib
+import os
+import random
+import sys
+import time
+import types
+
+import pytest
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OBJECT_COUNT = 10000
+# Objects of every tree, a root and its descendants
+TREE_SIZE = 100
+# Roots whose children are looked up, like the objects of one export
+LOOKUPS = 10
+
+def _import_cw_hierarchy():
+  # Outside of Blender only the parts of bpy imported at module level are needed
+  if "bpy" not in sys.modules:
+    bpy = types.ModuleType("bpy")
+    bpy.app = types.ModuleType("bpy.app")
+    bpy.app.handlers = types.ModuleType("bpy.app.handlers")
+    bpy.app.handlers.persistent = lambda func: func
+    bpy.data = types.SimpleNamespace(objects=[])
+    sys.modules.update({"bpy": bpy, "bpy.app": bpy.app, "bpy.app.handlers": bpy.app.handlers})
+  # Imported as a package of its own, so the add-on's __init__ (and its operators) isn't loaded
+  package = types.ModuleType("cw_addon")
+  package.__path__ = [ADDON_DIR]
+  sys.modules.setdefault("cw_addon", package)
+  return importlib.import_module("cw_addon.cw_hierarchy")
+
+cw_hierarchy = _import_cw_hierarchy()
+
+class _Object:
+
+  def __init__(self, name, parent=None):
+    self.name = name
+    self.parent = parent
+
+  def as_pointer(self):
+    return id(self)
+
+def generate_objects(seed=0):
+  """
+  Trees of TREE_SIZE objects where every object has up to three children, in random order like
+  bpy.data.objects after objects were added and reparented
+  """
+  objects = []
+  roots = []
+  for tree in range(OBJECT_COUNT // TREE_SIZE):
+    nodes = [_Object(str(tree) + "_root")]
+    for i in range(1, TREE_SIZE):
+      nodes.append(_Object(str(tree) + "_" + str(i), nodes[(i - 1) // 3]))
+    roots.append(nodes[0])
+    objects += nodes
+  random.Random(seed).shuffle(objects)
+  return objects, roots
+
+def recursive_children(objects, obj):
+  """
+  The scan cw_utils.get_children did before the index
+  """
+  children = []
+  for ob in objects:
+    if ob.parent == obj:
+      children.append(ob)
+      children = children + recursive_children(objects, ob)
+  return children
+
+@pytest.fixture
+def objects(monkeypatch):
+  objects, roots = generate_objects()
+  monkeypatch.setattr(cw_hierarchy.bpy.data, "objects", objects)
+  cw_hierarchy.invalidate_hierarchy()
+  yield objects, roots
+  cw_hierarchy.invalidate_hierarchy()
+
+def test_descendants_match_recursive_scan(objects):
+  objects, roots = objects
+  index = cw_hierarchy.get_hierarchy()
+  for root in roots[:LOOKUPS]:
+    assert index.descendants(root) == recursive_children(objects, root)
+    assert index.children(root) == [ob for ob in objects if ob.parent is root]
+
+def test_index_faster_than_recursive_scan(objects):
+  objects, roots = objects
+
+  start = time.perf_counter()
+  for root in roots[:LOOKUPS]:
+    recursive_children(objects, root)
+  recursive_time = time.perf_counter() - start
+
+  # Includes building the index, which an export does once
+  start = time.perf_counter()
+  index = cw_hierarchy.get_hierarchy()
+  for root in roots[:LOOKUPS]:
+    index.descendants(root)
+  index_time = time.perf_counter() - start
+
+  print("\n%d objects, %d lookups: recursive scan %.1f ms, index %.1f ms" %
+        (OBJECT_COUNT, LOOKUPS, recursive_time * 1000, index_time * 1000))
+  assert index_time < recursive_time
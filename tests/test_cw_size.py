@@ -0,0 +1,251 @@
+# Consistency checks of the GLB size estimator in cw_size, on generated meshes.
+#
+# The meshes are plain stand-ins providing the arrays mesh_size reads with foreach_get, and the reference sizes
+# come from a minimal GLB writer that splits vertices the way the glTF exporter does. That writer follows the
+# same vertex splitting model as mesh_size, so these tests check the JSON and buffer size constants and the
+# splitting of the estimator against an independent GLB layout, NOT its accuracy against the real glTF exporter
+# (which needs Blender). Runs without Blender:
+#
+#   python -m pytest tests
+
+import importlib
+import json
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Largest accepted relative error of the uncalibrated and the calibrated prediction
+MAX_ERROR = 0.15
+MAX_CALIBRATED_ERROR = 0.1
+
+def _import_cw_size():
+  # Outside of Blender only the parts of bpy imported at module level are needed
+  if "bpy" not in sys.modules:
+    bpy = types.ModuleType("bpy")
+    bpy.app = types.ModuleType("bpy.app")
+    bpy.app.handlers = types.ModuleType("bpy.app.handlers")
+    bpy.app.handlers.persistent = lambda func: func
+    bpy.data = types.SimpleNamespace(objects=[])
+    sys.modules.update({"bpy": bpy, "bpy.app": bpy.app, "bpy.app.handlers": bpy.app.handlers})
+  # Imported as a package of its own, so the add-on's __init__ (and its operators) isn't loaded
+  package = types.ModuleType("cw_addon")
+  package.__path__ = [ADDON_DIR]
+  sys.modules.setdefault("cw_addon", package)
+  return importlib.import_module("cw_addon.cw_size")
+
+cw_size = _import_cw_size()
+
+class _Items:
+  """
+  Collection supporting foreach_get on the given fields
+  """
+
+  def __init__(self, count, **fields):
+    self.count = count
+    self.fields = {name: np.asarray(values) for name, values in fields.items()}
+
+  def __len__(self):
+    return self.count
+
+  def foreach_get(self, name, out):
+    out[:] = self.fields[name].ravel()
+
+class _Mesh:
+
+  def __init__(self, loop_verts, loop_totals, normals, uvs=(), colors=None, color_domain='CORNER'):
+    self.loops = _Items(len(loop_verts), vertex_index=loop_verts)
+    self.polygons = _Items(len(loop_totals), loop_total=loop_totals)
+    self.corner_normals = _Items(len(loop_verts), vector=normals)
+    self.uv_layers = [types.SimpleNamespace(uv=_Items(len(uv), vector=uv)) for uv in uvs]
+    self.color_attributes = types.SimpleNamespace(active_color=None)
+    if colors is not None:
+      self.color_attributes.active_color = types.SimpleNamespace(data=_Items(len(colors), color=colors),
+                                                                 domain=color_domain)
+
+  def as_pointer(self):
+    return id(self)
+
+class _Object:
+
+  def __init__(self, name, mesh):
+    self.name = name
+    self.type = 'MESH'
+    self.data = mesh
+
+  def keys(self):
+    return []
+
+  def as_pointer(self):
+    return id(self)
+
+def generate_grid(size, smooth=True, uv_islands=False, colors=None, seed=0):
+  """
+  Grid of size x size quads on a random height field.
+  colors: None, "point" (one color per vertex) or "face" (one color per face, split on the corners)
+  """
+  rng = np.random.default_rng(seed)
+  side = size + 1
+
+  quads = []
+  for y in range(size):
+    for x in range(size):
+      v = y * side + x
+      quads.append((v, v + 1, v + side + 1, v + side))
+  loop_verts = np.array(quads, dtype=np.int32).ravel()
+  loop_totals = np.full(len(quads), 4, dtype=np.int32)
+
+  if smooth:
+    vertex_normals = rng.normal(size=(side * side, 3)).astype(np.float32)
+    normals = vertex_normals[loop_verts]
+  else:
+    face_normals = rng.normal(size=(len(quads), 3)).astype(np.float32)
+    normals = np.repeat(face_normals, 4, axis=0)
+
+  grid_uv = np.stack(np.meshgrid(np.arange(side), np.arange(side)), axis=-1).reshape(-1, 2) / size
+  uvs = grid_uv[loop_verts].astype(np.float32)
+  if uv_islands:
+    # Every face is an island of its own
+    uvs = uvs + np.repeat(np.arange(len(quads))[:, None] * 0.001, 4, axis=0).astype(np.float32)
+
+  color_values = None
+  color_domain = 'CORNER'
+  if colors == "point":
+    color_values = rng.random((side * side, 4)).astype(np.float32)
+    color_domain = 'POINT'
+  elif colors == "face":
+    color_values = np.repeat(rng.random((len(quads), 4)), 4, axis=0).astype(np.float32)
+
+  return _Mesh(loop_verts, loop_totals, normals, [uvs], color_values, color_domain)
+
+def _align4(size):
+  return (size + 3) & ~3
+
+def reference_glb_size(name, mesh):
+  """
+  Size of a GLB holding the mesh, with one exported vertex per distinct combination of corner attributes
+  """
+  loop_verts = mesh.loops.fields["vertex_index"]
+  normals = mesh.corner_normals.fields["vector"].reshape(-1, 3)
+  uvs = [layer.uv.fields["vector"].reshape(-1, 2) for layer in mesh.uv_layers]
+  color = mesh.color_attributes.active_color
+  colors = None
+  if color is not None:
+    colors = color.data.fields["color"].reshape(-1, 4)
+    if color.domain == 'POINT':
+      colors = colors[loop_verts]
+
+  vertices = {}
+  indices = []
+  for loop, vertex in enumerate(loop_verts):
+    key = (int(vertex), tuple(normals[loop])) + tuple(tuple(uv[loop]) for uv in uvs)
+    if colors is not None:
+      key += (tuple(colors[loop]),)
+    indices.append(vertices.setdefault(key, len(vertices)))
+
+  triangles = []
+  start = 0
+  for total in mesh.polygons.fields["loop_total"]:
+    for i in range(1, total - 1):
+      triangles += [indices[start], indices[start + i], indices[start + i + 1]]
+    start += total
+
+  count = len(vertices)
+  attributes = [("POSITION", "VEC3", 12), ("NORMAL", "VEC3", 12)]
+  attributes += [("TEXCOORD_" + str(i), "VEC2", 8) for i in range(len(uvs))]
+  if colors is not None:
+    attributes.append(("COLOR_0", "VEC4", 16))
+  index_size = 2 if count < 65536 else 4
+
+  accessors = []
+  views = []
+  offset = 0
+  for semantic, accessor_type, size in attributes:
+    views.append({"buffer": 0, "byteLength": count * size, "byteOffset": offset, "target": 34962})
+    accessor = {"bufferView": len(views) - 1, "componentType": 5126, "count": count, "type": accessor_type}
+    if semantic == "POSITION":
+      accessor["max"] = [1.0, 1.0, 1.0]
+      accessor["min"] = [-1.0, -1.0, -1.0]
+    accessors.append(accessor)
+    offset += _align4(count * size)
+  views.append({"buffer": 0, "byteLength": len(triangles) * index_size, "byteOffset": offset, "target": 34963})
+  accessors.append({"bufferView": len(views) - 1, "componentType": 5123 if index_size == 2 else 5125,
+                    "count": len(triangles), "type": "SCALAR"})
+  offset += _align4(len(triangles) * index_size)
+
+  document = {
+    "asset": {"generator": "Khronos glTF Blender I/O v3.6.27", "version": "2.0"},
+    "scene": 0,
+    "scenes": [{"name": "Scene", "nodes": [0]}],
+    "nodes": [{"mesh": 0, "name": name}],
+    "meshes": [{"name": name, "primitives": [{
+      "attributes": {semantic: i for i, (semantic, accessor_type, size) in enumerate(attributes)},
+      "indices": len(accessors) - 1,
+    }]}],
+    "accessors": accessors,
+    "bufferViews": views,
+    "buffers": [{"byteLength": offset}],
+  }
+  json_size = _align4(len(json.dumps(document, separators=(",", ":"))))
+  return 12 + 8 + json_size + 8 + offset
+
+MESHES = [
+  ("smooth", dict(size=8)),
+  ("flat", dict(size=8, smooth=False)),
+  ("islands", dict(size=12, uv_islands=True)),
+  ("point_colors", dict(size=16, colors="point")),
+  ("face_colors", dict(size=16, colors="face", smooth=False)),
+  ("large", dict(size=48, colors="face")),
+  ("large_flat", dict(size=64, smooth=False, uv_islands=True)),
+]
+
+def _prediction(mesh, name="1_Test"):
+  return cw_size.raw_object_size(_Object(name, mesh))
+
+@pytest.mark.parametrize("name, options", MESHES, ids=[name for name, options in MESHES])
+def test_prediction_error(name, options):
+  mesh = generate_grid(**options)
+  actual = reference_glb_size("1_" + name, mesh)
+  predicted = _prediction(mesh, "1_" + name)
+  assert abs(predicted - actual) / actual < MAX_ERROR
+
+def test_vertex_splitting():
+  # Smooth normals and continuous UVs keep the grid vertices shared, flat normals split every corner
+  size = 10
+  corners = size * size * 4
+  shared = cw_size.mesh_size(generate_grid(size))
+  split = cw_size.mesh_size(generate_grid(size, smooth=False))
+  stride = cw_size.POSITION_SIZE + cw_size.NORMAL_SIZE + cw_size.TEXCOORD_SIZE
+  assert split - shared == cw_size._align4(corners * stride) - cw_size._align4((size + 1) ** 2 * stride)
+
+def test_index_size():
+  # More than 65535 exported vertices need 32 bit indices
+  small = generate_grid(127, smooth=False)
+  large = generate_grid(128, smooth=False)
+  small_indices = 127 * 127 * 6
+  large_indices = 128 * 128 * 6
+  stride = cw_size.POSITION_SIZE + cw_size.NORMAL_SIZE + cw_size.TEXCOORD_SIZE
+  assert cw_size.mesh_size(small) - cw_size._align4(127 * 127 * 4 * stride) - cw_size._align4(small_indices * 2) == \
+         cw_size.mesh_size(large) - cw_size._align4(128 * 128 * 4 * stride) - cw_size._align4(large_indices * 4)
+
+def test_calibration_reduces_error():
+  scene = {}
+  predictor = cw_size.SizePredictor(scene)
+  samples = [generate_grid(**options, seed=seed) for seed in range(3) for name, options in MESHES]
+  for mesh in samples[:len(MESHES)]:
+    predictor.calibrate(_prediction(mesh), reference_glb_size("1_Test", mesh))
+  assert scene[cw_size.CALIBRATION_PROPERTY] == predictor.factor
+
+  for mesh in samples[len(MESHES):]:
+    actual = reference_glb_size("1_Test", mesh)
+    assert abs(predictor.predict_raw(_Object("1_Test", mesh)) * predictor.factor - actual) / actual < \
+           MAX_CALIBRATED_ERROR
+
+def test_over_budget_margin():
+  predictor = cw_size.SizePredictor({})
+  assert not predictor.is_over_budget(cw_size.MAX_GLB_SIZE)
+  assert predictor.is_over_budget(cw_size.MAX_GLB_SIZE * cw_size.PREFLIGHT_MARGIN + 1)
@@ -0,0 +1,221 @@
+# Benchmark of the strip cache of the topology gradient (external/VertexColorTools/internal/topology_gradient.py).
+#
+# A modal topology gradient repaints on every mouse move. The walk along the face strip is kept in one
+# TopologyStripCache for the whole session, this compares it with a new cache per repaint, which walks the
+# strip again every time like the gradient did before the cache. The edit-mesh is a long strip of quads
+# built from stand-ins for the BMesh elements, with just the links the walk follows. Runs without Blender:
+#
+#   python -m pytest tests
+
+import importlib
+import math
+import os
+import sys
+import time
+import types
+
+import pytest
+
+INTERNAL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "external", "VertexColorTools", "internal")
+
+# Quads of the strip
+STRIP_LENGTH = 2000
+# Repaints of one modal session, at growing distances along the strip
+REPAINTS = 40
+
+class _StubModule(types.ModuleType):
+  """
+  Module whose missing attributes are placeholder classes, enough for the type annotations of the add-on
+  """
+
+  def __getattr__(self, name):
+    if name.startswith("__"):
+      raise AttributeError(name)
+    value = type(name, (), {"__init__": lambda self, *args, **kwargs: None})
+    setattr(self, name, value)
+    return value
+
+class Vector(tuple):
+  """
+  The parts of mathutils.Vector the walk uses
+  """
+
+  def __new__(cls, values=(0.0, 0.0, 0.0)):
+    return super().__new__(cls, (float(value) for value in values))
+
+  def __sub__(self, other):
+    return Vector(a - b for a, b in zip(self, other))
+
+  def __neg__(self):
+    return Vector(-a for a in self)
+
+  def dot(self, other):
+    return sum(a * b for a, b in zip(self, other))
+
+  @property
+  def length_squared(self):
+    return self.dot(self)
+
+  def normalized(self):
+    length = math.sqrt(self.length_squared)
+    return Vector(a / length for a in self)
+
+  def copy(self):
+    return Vector(self)
+
+class Matrix(tuple):
+  """
+  The parts of mathutils.Matrix color_utils uses at import time
+  """
+
+  def __matmul__(self, vector):
+    return Vector(Vector(row).dot(vector) for row in self)
+
+def _import_topology_gradient():
+  # Outside of Blender only the parts of the Blender modules used at import time are needed
+  bpy = sys.modules.setdefault("bpy", _StubModule("bpy"))
+  if "types" not in vars(bpy):
+    bpy.types = _StubModule("bpy.types")
+  if "app" not in vars(bpy):
+    bpy.app = types.ModuleType("bpy.app")
+    bpy.app.handlers = types.ModuleType("bpy.app.handlers")
+    bpy.app.handlers.persistent = lambda func: func
+    bpy.data = types.SimpleNamespace(objects=[])
+    sys.modules.update({"bpy.app": bpy.app, "bpy.app.handlers": bpy.app.handlers})
+  bmesh = sys.modules.setdefault("bmesh", _StubModule("bmesh"))
+  if "types" not in vars(bmesh):
+    bmesh.types = _StubModule("bmesh.types")
+  sys.modules.setdefault("bmesh.types", bmesh.types)
+  mathutils = sys.modules.setdefault("mathutils", _StubModule("mathutils"))
+  mathutils.Vector = Vector
+  mathutils.Matrix = Matrix
+  bl_math = sys.modules.setdefault("bl_math", _StubModule("bl_math"))
+  bl_math.clamp = lambda value, minimum=0.0, maximum=1.0: min(max(value, minimum), maximum)
+  # Imported as a package of its own, so the add-on's init (and its operators) isn't loaded
+  package = types.ModuleType("vertex_color_tools")
+  package.__path__ = [INTERNAL_DIR]
+  sys.modules.setdefault("vertex_color_tools", package)
+  return importlib.import_module("vertex_color_tools.topology_gradient")
+
+topology_gradient = _import_topology_gradient()
+
+class _Seq(list):
+
+  def index_update(self):
+    for index, elem in enumerate(self):
+      elem.index = index
+
+  def ensure_lookup_table(self):
+    pass
+
+class _Vert:
+
+  def __init__(self, co):
+    self.co = Vector(co)
+    self.index = -1
+
+class _Edge:
+
+  def __init__(self):
+    self.select = False
+    self.link_loops = []
+
+class _Loop:
+
+  def __init__(self, vert, face):
+    self.vert = vert
+    self.face = face
+    self.link_loop_next = None
+    self.link_loop_prev = None
+    # Boundary loops are their own radial neighbour, like in BMesh
+    self.link_loop_radial_next = self
+
+class _Face:
+
+  def __init__(self, verts):
+    self.verts = verts
+    self.index = -1
+    self.loops = [_Loop(vert, self) for vert in verts]
+    for i, loop in enumerate(self.loops):
+      loop.link_loop_next = self.loops[(i + 1) % len(verts)]
+      loop.link_loop_prev = self.loops[i - 1]
+
+class _BMesh:
+
+  def __init__(self, verts, edges, faces):
+    self.verts = _Seq(verts)
+    self.edges = _Seq(edges)
+    self.faces = _Seq(faces)
+
+def generate_quad_strip(length):
+  """
+  Strip of quads along x, with the edge at its start (x = 0) selected
+  """
+  bottom = [_Vert((x, 0, 0)) for x in range(length + 1)]
+  top = [_Vert((x, 1, 0)) for x in range(length + 1)]
+  faces = [_Face([bottom[x], bottom[x + 1], top[x + 1], top[x]]) for x in range(length)]
+
+  edges = {}
+  for face in faces:
+    for loop in face.loops:
+      key = frozenset((loop.vert, loop.link_loop_next.vert))
+      edge = edges.setdefault(key, _Edge())
+      if edge.link_loops:
+        other = edge.link_loops[0]
+        loop.link_loop_radial_next = other
+        other.link_loop_radial_next = loop
+      edge.link_loops.append(loop)
+  edges[frozenset((bottom[0], top[0]))].select = True
+
+  return _BMesh(bottom + top, list(edges.values()), faces)
+
+class _Batch:
+  """
+  Records the elements, factors and colors like ColorModifierBatch collects them
+  """
+
+  def __init__(self):
+    self.calls = []
+
+  def add(self, elem, factor, color):
+    self.calls.append((elem, factor, color))
+
+def _repaint(bm, strip_cache, distance):
+  batch = _Batch()
+  topology_gradient._paint_topology_gradient_for_edges(
+    bm, strip_cache, True, distance, (0.0, 1.0), (0.0, 1.0), batch,
+    lambda weight, start, end: start + weight * (end - start),
+    topology_gradient.TopologyExtentClampMode.MINIMUM, Vector((1, 0, 0)))
+  return batch.calls
+
+@pytest.fixture
+def bm(monkeypatch):
+  bm = generate_quad_strip(STRIP_LENGTH)
+  # The stand-in edit-mesh is passed where the cache expects the mesh
+  monkeypatch.setattr(topology_gradient.bmesh, "from_edit_mesh", lambda mesh: mesh, raising=False)
+  return bm
+
+def _distances():
+  return [(i + 1) * (STRIP_LENGTH - 1) / REPAINTS for i in range(REPAINTS)]
+
+def test_cached_walk_matches_uncached(bm):
+  strip_cache = topology_gradient.TopologyStripCache(bm)
+  for distance in _distances()[::8]:
+    assert _repaint(bm, strip_cache, distance) == _repaint(bm, topology_gradient.TopologyStripCache(bm), distance)
+
+def test_cached_walk_faster_than_uncached(bm):
+  start = time.perf_counter()
+  for distance in _distances():
+    _repaint(bm, topology_gradient.TopologyStripCache(bm), distance)
+  uncached_time = time.perf_counter() - start
+
+  start = time.perf_counter()
+  strip_cache = topology_gradient.TopologyStripCache(bm)
+  for distance in _distances():
+    _repaint(bm, strip_cache, distance)
+  cached_time = time.perf_counter() - start
+
+  print("\n%d quads, %d repaints: uncached %.1f ms, cached %.1f ms" %
+        (STRIP_LENGTH, REPAINTS, uncached_time * 1000, cached_time * 1000))
+  assert cached_time < uncached_time